@@ -0,0 +1,113 @@
+"""
+Archivage de l'historique : les vérifications plus anciennes que
+RETENTION_HISTORIQUE_J jours quittent les bases SQLite pour des fichiers
+Parquet compressés (zstd), partitionnés par mois :
+
+    archives/historique/mois=2025-01/historique_1-50000.parquet
+    archives/historique_eligibilite/mois=2025-01/...
+
+Les agrégats (agregats_historique, agregats_eligibilite) ne sont pas touchés :
+les tableaux de bord comptent toujours les vérifications archivées.
+Chaque lot est écrit puis supprimé de la base ; un fichier est nommé d'après
+les id qu'il contient, donc relancer après une interruption le réécrit à
+l'identique au lieu de le dupliquer.
+
+    python archivage.py               # rétention configurée
+    python archivage.py --jours 180
+"""
+import argparse
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+
+import config
+from mesures import chronometre, incrementer
+
+# table -> (chemin de la base, colonnes archivées)
+TABLES_ARCHIVEES = {
+    "historique": (lambda: config.CHEMIN_DB_HISTORIQUE,
+                   ["id", "adresse_saisie", "adresse_corrigee", "statut", "date_verif", "adresse_normalisee"]),
+    "historique_eligibilite": (lambda: config.CHEMIN_DB_TUNISIE,
+                               ["id", "gouvernorat", "ville", "adresse", "latitude", "longitude", "fibre_eligible",
+                                "g4_eligible", "g5_eligible", "operateur", "date_verif"]),
+}
+
+
+def _ecrire_partition(df, dossier, table, mois):
+    dossier_mois = os.path.join(dossier, table, f"mois={mois}")
+    os.makedirs(dossier_mois, exist_ok=True)
+    chemin = os.path.join(dossier_mois, f"{table}_{df['id'].min()}-{df['id'].max()}.parquet")
+    # Écriture atomique : un lecteur ne voit jamais de fichier partiel
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    df.to_parquet(temporaire, index=False, compression="zstd")
+    os.replace(temporaire, chemin)
+
+
+def archiver_table(table, limite, dossier=None, taille_lot=None):
+    """Déplace les lignes de `table` antérieures à `limite` (date ISO) vers le Parquet. Retourne leur nombre."""
+    from db import _verrou_db, connexion
+
+    dossier = dossier or config.DOSSIER_ARCHIVES
+    taille_lot = taille_lot or config.TAILLE_LOT_ARCHIVAGE
+    chemin_db, colonnes = TABLES_ARCHIVEES[table]
+    total = 0
+    while True:
+        with _verrou_db:
+            conn = connexion(chemin_db())
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,)).fetchone():
+                return total
+            # Ordre des id : le lot contient toutes les lignes à archiver d'id <= son id max
+            df = pd.read_sql_query(f"""
+                SELECT {', '.join(colonnes)} FROM {table}
+                WHERE date_verif < ? ORDER BY id LIMIT ?
+            """, conn, params=(limite, taille_lot))
+            if df.empty:
+                return total
+            with chronometre("archivage.lot", table=table):
+                for mois, df_mois in df.groupby(df["date_verif"].astype(str).str[:7]):
+                    _ecrire_partition(df_mois, dossier, table, mois)
+                with conn:
+                    conn.execute(f"DELETE FROM {table} WHERE id <= ? AND date_verif < ?",
+                                 (int(df["id"].max()), limite))
+        total += len(df)
+        incrementer("archivage.lignes", len(df), table=table)
+
+
+def archiver_historique(jours=None, dossier=None):
+    """Archive les deux historiques au-delà de `jours` jours. Retourne {table: nombre de lignes archivées}."""
+    from db import init_db
+    from operateurs import init_operateurs
+
+    # Agrégats créés (à partir du détail) avant toute suppression : l'archivage ne doit rien en retirer
+    init_db()
+    init_operateurs()
+    jours = config.RETENTION_HISTORIQUE_J if jours is None else jours
+    limite = (date.today() - timedelta(days=jours)).isoformat()
+    return {table: archiver_table(table, limite, dossier) for table in TABLES_ARCHIVEES}
+
+
+def charger_archives(table="historique", mois_debut=None, mois_fin=None, dossier=None):
+    """Relit les lignes archivées de `table` (mois au format AAAA-MM, bornes incluses)."""
+    chemin = os.path.join(dossier or config.DOSSIER_ARCHIVES, table)
+    colonnes = TABLES_ARCHIVEES[table][1]
+    if not os.path.isdir(chemin):
+        return pd.DataFrame(columns=colonnes)
+    filtres = []
+    if mois_debut:
+        filtres.append(("mois", ">=", mois_debut))
+    if mois_fin:
+        filtres.append(("mois", "<=", mois_fin))
+    df = pd.read_parquet(chemin, filters=filtres or None)
+    return df[colonnes].sort_values("id", ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archivage Parquet de l'historique des vérifications")
+    parser.add_argument("--jours", type=int, default=config.RETENTION_HISTORIQUE_J,
+                        help="Archiver les vérifications plus anciennes que ce nombre de jours")
+    parser.add_argument("--dossier", default=config.DOSSIER_ARCHIVES)
+    args = parser.parse_args()
+
+    for table, nombre in archiver_historique(args.jours, args.dossier).items():
+        print(f"{table} : {nombre} lignes archivées dans {os.path.join(args.dossier, table)}")
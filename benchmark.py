@@ -0,0 +1,474 @@
+"""
+Banc d'essai des chemins critiques : correction NLP, vérification (contre le
+stub local), persistance de l'historique, exports et reprise d'un fichier
+interrompu (contrôle de bout en bout : la suite échoue si l'historique contient
+des doublons). Les résultats sont écrits en JSON pour suivre les régressions
+d'une version à l'autre :
+
+    python benchmark.py                                   # toutes les suites
+    python benchmark.py --suites persistance,export --tailles 10000,100000,1000000
+    python benchmark.py --sortie benchmarks/v2.json --comparer benchmarks/v1.json
+
+Chaque suite travaille dans un dossier temporaire (bases SQLite, index, PDF) :
+les bases du projet ne sont jamais modifiées. Une suite dont une dépendance
+manque (modèle NLP, Chrome...) est notée « ignoree » avec la raison.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import config
+
+SUITES = ["correction", "verification", "persistance", "export", "reprise"]
+TYPES_VOIE = ["Rue", "Avenue", "Boulevard", "Impasse", "Place", "Chemin"]
+NOMS_VOIE = ["de la République", "Victor Hugo", "Jean Jaurès", "Pasteur", "de la Gare", "des Lilas",
+             "Nationale", "Saint-Germain", "du Moulin", "Habib Bourguiba", "de Carthage", "Ibn Khaldoun"]
+VILLES = ["Paris", "Lyon", "Lille", "Marseille", "Tunis", "Sfax", "Sousse", "Bizerte"]
+
+
+# ==================== UTILITAIRES ====================
+def chrono(fonction, *args, **kwargs):
+    """(durée en secondes, résultat) d'un appel."""
+    debut = time.perf_counter()
+    resultat = fonction(*args, **kwargs)
+    return round(time.perf_counter() - debut, 4), resultat
+
+
+def debit(nb, duree_s, decimales=2):
+    """Éléments par seconde ; None pour une durée nulle (trop courte pour l'horloge)."""
+    return round(nb / duree_s, decimales) if duree_s > 0 else None
+
+
+def percentiles(latences):
+    latences = np.asarray(latences, dtype=np.float64)
+    if not len(latences):
+        return {}
+    return {"p50_s": round(float(np.percentile(latences, 50)), 4),
+            "p95_s": round(float(np.percentile(latences, 95)), 4),
+            "max_s": round(float(latences.max()), 4)}
+
+
+def adresses_synthetiques(n, graine=0):
+    aleatoire = random.Random(graine)
+    return [f"{aleatoire.randint(1, 300)} {aleatoire.choice(TYPES_VOIE)} {aleatoire.choice(NOMS_VOIE)}, "
+            f"{aleatoire.choice(VILLES)} {i}" for i in range(n)]
+
+
+def variantes_bruitees(adresses, graine=0):
+    """Saisies réalistes : casse, accents et une faute de frappe sur une partie des adresses."""
+    aleatoire = random.Random(graine)
+    variantes = []
+    for adresse in adresses:
+        tirage = aleatoire.random()
+        if tirage < 0.3:
+            variantes.append(adresse.lower())
+        elif tirage < 0.7 and len(adresse) > 5:
+            i = aleatoire.randrange(1, len(adresse) - 1)
+            variantes.append(adresse[:i] + adresse[i + 1:])
+        else:
+            variantes.append(adresse)
+    return variantes
+
+
+def resultats_synthetiques(n, graine=0):
+    aleatoire = np.random.default_rng(graine)
+    statuts = np.array(["Éligible à la fibre (FTTH)", "Non éligible à la fibre", "❌ Impossible de vérifier"])
+    saisies = adresses_synthetiques(n, graine)
+    return pd.DataFrame({
+        "Adresse saisie": saisies,
+        "Adresse corrigée": saisies,
+        "Statut éligibilité": statuts[aleatoire.choice(3, size=n, p=[0.6, 0.3, 0.1])],
+    })
+
+
+def _commit_git():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+# ==================== SUITES ====================
+def suite_correction(args, dossier):
+    """corriger_adresse_ia (une par une) contre corriger_adresses_ia (en lot), selon la taille de la base."""
+    try:
+        import sentence_transformers  # noqa: F401
+    except ImportError:
+        return {"ignoree": "sentence_transformers non installé"}
+    import correctionIA
+    from index_adresses import IndexAdresses
+
+    resultats = {}
+    duree_modele, _ = chrono(correctionIA.obtenir_modele)
+    resultats["chargement_modele_s"] = duree_modele
+
+    tailles = [len(correctionIA.BASE_ADRESSES)] + [t for t in args.tailles_base if t > len(correctionIA.BASE_ADRESSES)]
+    for taille in tailles:
+        if taille == len(correctionIA.BASE_ADRESSES):
+            references = list(correctionIA.BASE_ADRESSES)
+            correctionIA.definir_index_adresses(None)
+            duree_index = 0.0
+        else:
+            references = adresses_synthetiques(taille, graine=taille)
+            duree_index, index = chrono(IndexAdresses.construire, references, correctionIA.obtenir_modele(),
+                                        os.path.join(dossier, f"index_{taille}"))
+            correctionIA.definir_index_adresses(index)
+        aleatoire = random.Random(taille)
+        requetes = variantes_bruitees([aleatoire.choice(references) for _ in range(args.nb_requetes)], graine=taille)
+
+        # Une par une (ancien chemin) sur un échantillon, en lot sur toutes les requêtes
+        echantillon = requetes[:args.nb_unitaires]
+        latences = []
+        for adresse in echantillon:
+            debut = time.perf_counter()
+            correctionIA.corriger_adresse_ia(adresse)
+            latences.append(time.perf_counter() - debut)
+        duree_lot, detail = chrono(correctionIA.corriger_adresses_detail, requetes)
+        duree_lot_bert, _ = chrono(correctionIA.corriger_adresses_detail, requetes, prefiltre=False)
+        resultats[f"base_{taille}"] = {
+            "construction_index_s": duree_index,
+            "unitaire": {"nb": len(echantillon), "adresses_par_seconde": debit(len(echantillon), sum(latences)),
+                         **percentiles(latences)},
+            "lot": {"nb": len(requetes), "duree_s": duree_lot,
+                    "adresses_par_seconde": debit(len(requetes), duree_lot), "par_etape": detail["nb_par_etape"]},
+            "lot_sans_prefiltre": {"nb": len(requetes), "duree_s": duree_lot_bert,
+                                   "adresses_par_seconde": debit(len(requetes), duree_lot_bert)},
+        }
+    correctionIA.definir_index_adresses(None)
+
+    # Backends d'inférence alternatifs : accélération de l'encodage et accord des décisions avec fp32.
+    # Validation écrite dans le dossier temporaire : le banc n'autorise aucun backend en production.
+    for backend in args.backends_nlp:
+        try:
+            rapport = correctionIA.comparer_backends(correctionIA.jeu_de_test(), backend,
+                                                     dossier_validation=os.path.join(dossier, "validations"))
+            rapport["ecarts"] = rapport["ecarts"][:20]
+            resultats[f"backend_{backend}"] = rapport
+        except Exception as e:
+            resultats[f"backend_{backend}"] = {"ignoree": f"{type(e).__name__}: {e}"}
+    return resultats
+
+
+@contextlib.contextmanager
+def _latences_requetes():
+    """
+    Durée de chaque requête (fin - début, mesurées par le fournisseur autour de
+    la requête elle-même, hors attente d'une place libre) : copie de ce que les
+    fournisseurs transmettent à observer("verification.adresse").
+    """
+    import http_orange
+    import scraping
+
+    latences = []
+    originaux = {module: module.observer for module in (http_orange, scraping)}
+
+    def observer(nom, duree_s, **etiquettes):
+        if nom == "verification.adresse":
+            latences.append(duree_s)
+        originaux[http_orange](nom, duree_s, **etiquettes)
+
+    for module in originaux:
+        module.observer = observer
+    try:
+        yield latences
+    finally:
+        for module, fonction in originaux.items():
+            module.observer = fonction
+
+
+def _mesurer_fournisseur(fournisseur, adresses):
+    """Débit global, délai du premier résultat et latence par requête (début -> fin de chaque requête)."""
+    from scraping import MESSAGE_ECHEC
+
+    arrivees = []
+    with _latences_requetes() as latences:
+        debut = time.perf_counter()
+        resultats, stats = fournisseur.verifier(adresses, lambda i, adresse, statut: arrivees.append(time.perf_counter()))
+        duree = time.perf_counter() - debut
+    return {"nb": len(adresses), "duree_s": round(duree, 4), "adresses_par_seconde": debit(len(adresses), duree),
+            "premier_resultat_s": round(min(arrivees) - debut, 4) if arrivees else None,
+            "echecs": sum(statut == MESSAGE_ECHEC for _, statut in resultats),
+            **percentiles(latences)}
+
+
+def suite_verification(args, dossier):
+    """Backends HTTP et Selenium contre le stub local (adresses enregistrées, rejouées en boucle)."""
+    from fournisseurs import FournisseurSelenium
+    from http_orange import FournisseurHTTPOrange
+    from stub_orange import CHEMIN_PAGE, charger_enregistrements, demarrer_stub
+
+    connues = [enr["params"]["q"] for enr in charger_enregistrements()
+               if enr["chemin"] == "/api/eligibilite/adresses" and enr.get("params", {}).get("q")]
+    adresses = [connues[i % len(connues)] for i in range(args.nb_verifications)]
+    serveur, url_base = demarrer_stub()
+    resultats = {}
+    try:
+        # Latence : une requête à la fois ; débit : concurrence configurée
+        http = {"url_adresses": f"{url_base}/api/eligibilite/adresses",
+                "url_eligibilite": f"{url_base}/api/eligibilite/test"}
+        resultats["http_latence"] = _mesurer_fournisseur(FournisseurHTTPOrange(concurrence=1, **http), adresses)
+        resultats["http_debit"] = _mesurer_fournisseur(FournisseurHTTPOrange(**http), adresses)
+
+        try:
+            import selenium  # noqa: F401
+        except ImportError:
+            resultats["selenium"] = {"ignoree": "selenium non installé"}
+            return resultats
+        url_page = config.URL_ELIGIBILITE_ORANGE
+        config.URL_ELIGIBILITE_ORANGE = f"{url_base}{CHEMIN_PAGE}"
+        try:
+            adresses_selenium = adresses[:args.nb_verifications_selenium]
+            resultats["selenium_latence"] = _mesurer_fournisseur(FournisseurSelenium(1), adresses_selenium)
+            resultats["selenium_debit"] = _mesurer_fournisseur(FournisseurSelenium(args.nb_workers), adresses_selenium)
+        except Exception as e:
+            resultats["selenium"] = {"ignoree": f"{type(e).__name__}: {e}"}
+        finally:
+            config.URL_ELIGIBILITE_ORANGE = url_page
+    finally:
+        serveur.shutdown()
+    return resultats
+
+
+def suite_persistance(args, dossier):
+    """sauvegarder_resultats / lecture de l'historique, sur une base neuve par taille."""
+    import db
+
+    resultats = {}
+    chemin_initial = config.CHEMIN_DB_HISTORIQUE
+    try:
+        for taille in args.tailles:
+            config.CHEMIN_DB_HISTORIQUE = os.path.join(dossier, f"historique_{taille}.db")
+            db.init_db()
+            df = resultats_synthetiques(taille)
+            duree_ecriture, _ = chrono(db.sauvegarder_resultats, df)
+            duree_lecture, _ = chrono(db.charger_historique)
+            duree_compte, _ = chrono(db.compter_historique)
+            duree_recherche, _ = chrono(db.charger_page_historique, 100, None, recherche="Victor Hugo")
+
+            # 10 pages successives par curseur (coût constant attendu quelle que soit la profondeur)
+            curseur, debut = None, time.perf_counter()
+            for _ in range(10):
+                _, curseur = db.charger_page_historique(100, curseur)
+            duree_pages = round(time.perf_counter() - debut, 4)
+
+            resultats[f"lignes_{taille}"] = {
+                "sauvegarder_resultats_s": duree_ecriture,
+                "lignes_par_seconde": debit(taille, duree_ecriture, 1),
+                "charger_historique_s": duree_lecture,
+                "compter_historique_s": duree_compte,
+                "recherche_s": duree_recherche,
+                "dix_pages_s": duree_pages,
+                "taille_base_mo": round(sum(os.path.getsize(f) for f in (config.CHEMIN_DB_HISTORIQUE, config.CHEMIN_DB_HISTORIQUE + "-wal")
+                                            if os.path.exists(f)) / 1e6, 1),
+            }
+    finally:
+        config.CHEMIN_DB_HISTORIQUE = chemin_initial
+    return resultats
+
+
+def suite_export(args, dossier):
+    """Classification, exports Excel / CSV / Parquet et rapport PDF."""
+    from classification import classifier_statuts, statistiques
+    from export_resultats import exporter, formats_disponibles
+
+    resultats = {}
+    for taille in args.tailles:
+        df = resultats_synthetiques(taille)
+        duree_classement, classes = chrono(classifier_statuts, df["Statut éligibilité"])
+        df["Éligible ?"] = classes["Éligible ?"]
+        df["Technologie"] = classes["Technologie"]
+        mesures = {"classification_s": duree_classement}
+        for format_export in formats_disponibles(taille):
+            duree, (contenu, _, _) = chrono(exporter, df, format_export)
+            mesures[f"{format_export.lower()}_s"] = duree
+            mesures[f"{format_export.lower()}_mo"] = round(len(contenu) / 1e6, 2)
+
+        try:
+            import plotly.express as px
+            from rapport_pdf import exporter_pdf
+        except ImportError as e:
+            mesures["pdf"] = {"ignoree": str(e)}
+        else:
+            fig = px.pie(statistiques(df), values="Nombre", names="Statut")
+            chemin = os.path.join(dossier, f"rapport_{taille}.pdf")
+            mesures["pdf_resume_s"], _ = chrono(exporter_pdf, df, fig, chemin, resume_seul=True)
+            if taille <= args.max_lignes_pdf:
+                mesures["pdf_detail_s"], _ = chrono(exporter_pdf, df, fig, chemin)
+                mesures["pdf_detail_mo"] = round(os.path.getsize(chemin) / 1e6, 2)
+        resultats[f"lignes_{taille}"] = mesures
+    return resultats
+
+
+# ==================== COMPARAISON ====================
+def _durees(noeud, prefixe=""):
+    """Aplatit les mesures de durée (clés en _s) : {"suite.cas.mesure_s": valeur}."""
+    if isinstance(noeud, dict):
+        plats = {}
+        for cle, valeur in noeud.items():
+            plats.update(_durees(valeur, f"{prefixe}{cle}."))
+        return plats
+    if prefixe.endswith("_s.") and isinstance(noeud, (int, float)):
+        return {prefixe[:-1]: noeud}
+    return {}
+
+
+def comparer(nouveau, ancien, seuil=1.2):
+    """Affiche les durées qui ont augmenté de plus de `seuil` (x1.2 par défaut). Retourne leur nombre."""
+    avant, apres = _durees(ancien["suites"]), _durees(nouveau["suites"])
+    regressions = 0
+    for cle in sorted(set(avant) & set(apres)):
+        if avant[cle] <= 0:
+            continue
+        rapport = apres[cle] / avant[cle]
+        marque = ""
+        if rapport > seuil:
+            marque = "  <-- régression"
+            regressions += 1
+        print(f"{cle:70s} {avant[cle]:>10.4f} -> {apres[cle]:>10.4f}  x{rapport:.2f}{marque}")
+    return regressions
+
+
+class _VerificateurFactice:
+    """Vérificateur sans réseau ; `crash_a_l_appel` simule un arrêt en plein bloc."""
+
+    nom = "factice"
+
+    def __init__(self, crash_a_l_appel=None):
+        self.crash_a_l_appel = crash_a_l_appel
+        self.nb_appels = 0
+        self.nb_adresses = 0
+
+    def verifier(self, liste_adresses, sur_resultat=None):
+        self.nb_appels += 1
+        resultats = [(adresse, "Éligible à la fibre (FTTH)") for adresse in liste_adresses]
+        for i, (adresse, statut) in enumerate(resultats):
+            if self.nb_appels == self.crash_a_l_appel and i == len(resultats) // 2:
+                raise RuntimeError("arrêt simulé")
+            if sur_resultat is not None:
+                sur_resultat(i, adresse, statut)
+        self.nb_adresses += len(liste_adresses)
+        return resultats, []
+
+
+def suite_reprise(args, dossier):
+    """Fichier interrompu au 2e bloc puis relancé : chaque ligne doit figurer une seule fois dans l'historique."""
+    try:
+        import sentence_transformers  # noqa: F401
+    except ImportError:
+        return {"ignoree": "sentence_transformers non installé"}
+    import db
+    from pipeline import traiter_fichier
+    from reprise import init_reprise
+
+    taille_bloc = 500
+    adresses = adresses_synthetiques(3 * taille_bloc + 100)
+    entree = os.path.join(dossier, "reprise.csv")
+    sortie = os.path.join(dossier, "reprise_resultats.csv")
+    pd.DataFrame({"adresse": adresses}).to_csv(entree, index=False)
+
+    chemin_initial = config.CHEMIN_DB_HISTORIQUE
+    config.CHEMIN_DB_HISTORIQUE = os.path.join(dossier, "historique_reprise.db")
+    try:
+        db.init_db()
+        init_reprise()
+        try:
+            traiter_fichier(entree, _VerificateurFactice(crash_a_l_appel=2), sortie=sortie, taille_bloc=taille_bloc)
+            raise AssertionError("l'arrêt simulé n'a pas eu lieu")
+        except RuntimeError:
+            pass
+        verificateur = _VerificateurFactice()
+        duree, bilan = chrono(traiter_fichier, entree, verificateur, sortie=sortie, taille_bloc=taille_bloc)
+        with db._verrou_db:
+            nb_historique = db.connexion().execute("SELECT COUNT(*) FROM historique").fetchone()[0]
+            nb_lots = db.connexion().execute("SELECT COUNT(*) FROM lots").fetchone()[0]
+        nb_sortie = len(pd.read_csv(sortie))
+    finally:
+        config.CHEMIN_DB_HISTORIQUE = chemin_initial
+
+    resultats = {"lignes": len(adresses), "blocs": bilan["blocs"], "blocs_repris": bilan["blocs_repris"],
+                 "lignes_historique": nb_historique, "lignes_sortie": nb_sortie,
+                 "adresses_reverifiees": verificateur.nb_adresses, "relance_s": duree}
+    if nb_historique != len(adresses) or nb_sortie != len(adresses) or nb_lots or bilan["blocs_repris"] != 1:
+        raise AssertionError(f"reprise incohérente : {resultats}")
+    return resultats
+
+
+# ==================== POINT D'ENTRÉE ====================
+def _entiers(texte):
+    return [int(t) for t in texte.split(",") if t.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai des chemins critiques")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"Parmi : {', '.join(SUITES)}")
+    parser.add_argument("--tailles", type=_entiers, default=[10_000, 100_000],
+                        help="Nombres de lignes pour la persistance et les exports (ex. 10000,100000,1000000)")
+    parser.add_argument("--tailles-base", type=_entiers, default=[1_000, 10_000],
+                        help="Tailles de la base de référence pour la correction")
+    parser.add_argument("--backends-nlp", type=lambda t: [b for b in t.split(",") if b.strip()], default=[],
+                        help="Backends NLP à comparer au fp32 (ex. int8,onnx,onnx-int8)")
+    parser.add_argument("--nb-requetes", type=int, default=1000, help="Adresses corrigées en lot")
+    parser.add_argument("--nb-unitaires", type=int, default=50, help="Adresses corrigées une par une")
+    parser.add_argument("--nb-verifications", type=int, default=500, help="Adresses vérifiées par backend HTTP")
+    parser.add_argument("--nb-verifications-selenium", type=int, default=50)
+    parser.add_argument("--nb-workers", type=int, default=None, help="Sessions Selenium (défaut : automatique)")
+    parser.add_argument("--max-lignes-pdf", type=int, default=50_000, help="Au-delà : rapport PDF résumé seulement")
+    parser.add_argument("--sortie", default=None, help="Fichier JSON (défaut : benchmarks/benchmark_<date>.json)")
+    parser.add_argument("--comparer", default=None, help="JSON d'une exécution précédente à comparer")
+    args = parser.parse_args(argv)
+    # Le banc chronomètre lui-même : pas de vidage des mesures internes dans la base du projet
+    config.MESURES_ACTIVES = False
+
+    fonctions = {"correction": suite_correction, "verification": suite_verification,
+                 "persistance": suite_persistance, "export": suite_export, "reprise": suite_reprise}
+    rapport = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_git(),
+        "python": sys.version.split()[0],
+        "plateforme": platform.platform(),
+        "nb_coeurs": os.cpu_count(),
+        "parametres": {cle: valeur for cle, valeur in vars(args).items() if cle not in ("sortie", "comparer")},
+        "suites": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="benchmark_elig_") as dossier:
+        for nom in [s.strip() for s in args.suites.split(",") if s.strip()]:
+            print(f"== {nom}")
+            debut = time.perf_counter()
+            try:
+                rapport["suites"][nom] = fonctions[nom](args, dossier)
+            except Exception as e:
+                traceback.print_exc()
+                rapport["suites"][nom] = {"erreur": f"{type(e).__name__}: {e}"}
+            print(json.dumps(rapport["suites"][nom], ensure_ascii=False, indent=2))
+            print(f"   ({time.perf_counter() - debut:.1f}s)")
+
+    sortie = args.sortie or os.path.join("benchmarks", f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(sortie) or ".", exist_ok=True)
+    with open(sortie, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, ensure_ascii=False, indent=2)
+    print(f"Résultats écrits dans {sortie}")
+
+    # Suite en erreur (dont un contrôle de cohérence en échec) : code de retour non nul
+    en_erreur = any("erreur" in resultat for resultat in rapport["suites"].values())
+    if args.comparer:
+        with open(args.comparer, encoding="utf-8") as f:
+            regressions = comparer(rapport, json.load(f))
+        return 1 if regressions or en_erreur else 0
+    return 1 if en_erreur else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import config
+from db import statuts_recents
+from fournisseurs import FournisseurEligibilite
+from mesures import incrementer
+from normalisation import normaliser_adresse
+from scraping import MESSAGE_ECHEC
+
+
+# ==================== CACHE À DEUX NIVEAUX ====================
+class CacheEligibilite:
+    """
+    Cache des statuts d'éligibilité indexé sur l'adresse corrigée normalisée.
+    Niveau 1 : LRU en mémoire (partagé par toutes les sessions du process).
+    Niveau 2 : table `historique` SQLite (résultats déjà sauvegardés).
+    Une entrée n'est valide que si elle a moins de `ttl_s` secondes ;
+    les échecs de vérification ne sont jamais mis en cache.
+    """
+
+    def __init__(self, ttl_s=None, taille_lru=None):
+        self.ttl_s = ttl_s if ttl_s is not None else config.CACHE_TTL_S
+        self.taille_lru = taille_lru or config.CACHE_TAILLE_LRU
+        self._lru = OrderedDict()
+        self._verrou = threading.Lock()
+        self.hits_lru = 0
+        self.hits_sqlite = 0
+        self.misses = 0
+
+    def _lire_lru(self, cle):
+        entree = self._lru.get(cle)
+        if entree is None:
+            return None
+        statut, horodatage = entree
+        if time.time() - horodatage > self.ttl_s:
+            del self._lru[cle]
+            return None
+        self._lru.move_to_end(cle)
+        return statut
+
+    def _ecrire_lru(self, cle, statut, horodatage=None):
+        self._lru[cle] = (statut, horodatage or time.time())
+        self._lru.move_to_end(cle)
+        while len(self._lru) > self.taille_lru:
+            self._lru.popitem(last=False)
+
+    def lire(self, adresses):
+        """
+        Cherche les statuts en cache pour une liste d'adresses corrigées.
+        Retourne {index: statut} pour les adresses trouvées.
+        """
+        trouves = {}
+        manquants = {}
+        with self._verrou:
+            for i, adresse in enumerate(adresses):
+                cle = normaliser_adresse(adresse)
+                statut = self._lire_lru(cle)
+                if statut is not None:
+                    trouves[i] = statut
+                    self.hits_lru += 1
+                else:
+                    manquants.setdefault(cle, []).append(i)
+
+        if manquants:
+            depuis = (datetime.now() - timedelta(seconds=self.ttl_s)).isoformat()
+            en_base = statuts_recents(manquants.keys(), depuis, MESSAGE_ECHEC)
+            with self._verrou:
+                for cle, indices in manquants.items():
+                    if cle in en_base:
+                        statut, date_verif = en_base[cle]
+                        self._ecrire_lru(cle, statut, datetime.fromisoformat(date_verif).timestamp())
+                        for i in indices:
+                            trouves[i] = statut
+                        self.hits_sqlite += len(indices)
+                    else:
+                        self.misses += len(indices)
+        return trouves
+
+    def ecrire(self, resultats):
+        """Enregistre [(adresse, statut), ...] dans le LRU (hors échecs)."""
+        with self._verrou:
+            for adresse, statut in resultats:
+                if statut != MESSAGE_ECHEC:
+                    self._ecrire_lru(normaliser_adresse(adresse), statut)
+
+    def vider(self):
+        with self._verrou:
+            self._lru.clear()
+
+    def compteurs(self):
+        with self._verrou:
+            total = self.hits_lru + self.hits_sqlite + self.misses
+            return {
+                "hits_lru": self.hits_lru,
+                "hits_sqlite": self.hits_sqlite,
+                "misses": self.misses,
+                "taux_hit": round((self.hits_lru + self.hits_sqlite) / total, 3) if total else 0.0,
+                "entrees_lru": len(self._lru),
+            }
+
+
+_cache_partage = None
+_verrou_cache = threading.Lock()
+
+def cache_partage():
+    """Instance unique du cache pour tout le process (survit aux reruns Streamlit)."""
+    global _cache_partage
+    with _verrou_cache:
+        if _cache_partage is None:
+            _cache_partage = CacheEligibilite()
+        return _cache_partage
+
+
+# ==================== FOURNISSEUR AVEC CACHE ====================
+class FournisseurAvecCache(FournisseurEligibilite):
+    """
+    Place le cache devant un fournisseur : seules les adresses absentes du cache
+    (ou toutes si forcer=True) sont envoyées au navigateur / à l'API.
+    """
+
+    def __init__(self, fournisseur, cache=None, forcer=False):
+        self.fournisseur = fournisseur
+        self.cache = cache or cache_partage()
+        self.forcer = forcer
+        self.nom = f"cache+{fournisseur.nom}"
+
+    def verifier(self, liste_adresses, sur_resultat=None):
+        liste_adresses = list(liste_adresses)
+        trouves = {} if self.forcer else self.cache.lire(liste_adresses)
+
+        indices_a_verifier = [i for i in range(len(liste_adresses)) if i not in trouves]
+        incrementer("cache.adresses", len(trouves), resultat="present")
+        incrementer("cache.adresses", len(indices_a_verifier), resultat="absent")
+        resultats = [(adresse, trouves.get(i)) for i, adresse in enumerate(liste_adresses)]
+        if sur_resultat is not None:
+            for i, statut in trouves.items():
+                sur_resultat(i, liste_adresses[i], statut)
+        stats = []
+        if indices_a_verifier:
+            def rappel(j, adresse, statut):
+                sur_resultat(indices_a_verifier[j], adresse, statut)
+            nouveaux, stats = self.fournisseur.verifier([liste_adresses[i] for i in indices_a_verifier],
+                                                        rappel if sur_resultat is not None else None)
+            self.cache.ecrire(nouveaux)
+            for i, resultat in zip(indices_a_verifier, nouveaux):
+                resultats[i] = resultat
+
+        stats = stats + [{"fournisseur": "cache", "adresses": len(liste_adresses),
+                          "servies_par_cache": len(trouves), **self.cache.compteurs()}]
+        return resultats, stats
@@ -0,0 +1,67 @@
+"""
+Classification des statuts d'éligibilité bruts (texte du site Orange / de l'API).
+
+Les règles ne sont évaluées que sur les statuts distincts (quelques dizaines au
+plus, même pour des centaines de milliers de lignes), puis le résultat est
+redistribué aux lignes par leurs codes : colonnes catégorielles compactes.
+"""
+import numpy as np
+import pandas as pd
+
+from normalisation import sans_accents
+
+ELIGIBLE = "Éligible"
+NON_ELIGIBLE = "Non éligible"
+INDETERMINE = "Indéterminé"
+CATEGORIES_ELIGIBILITE = [ELIGIBLE, NON_ELIGIBLE, INDETERMINE]
+
+# (motif sur le texte en minuscules sans accents, résultat) : la première règle qui correspond l'emporte
+REGLES_ELIGIBILITE = [
+    (r"impossible de verifier|erreur|introuvable|aucune adresse|indisponible", INDETERMINE),
+    (r"\bnon[\s-]*eligible|\bineligible|\bpas eligible|n'est pas eligible|\bnon raccordable", NON_ELIGIBLE),
+    (r"eligible|raccordable", ELIGIBLE),
+]
+
+TECHNOLOGIE_INCONNUE = "Inconnue"
+REGLES_TECHNOLOGIE = [
+    (r"ftto", "FTTO"),
+    (r"ftth|fibre", "FTTH"),
+    (r"vdsl|adsl|cuivre", "xDSL"),
+    (r"\b[45]g\b", "4G/5G"),
+]
+CATEGORIES_TECHNOLOGIE = [t for _, t in REGLES_TECHNOLOGIE] + [TECHNOLOGIE_INCONNUE]
+
+
+def _appliquer_regles(textes, regles, defaut, categories):
+    """Indice de catégorie de chaque texte (première règle satisfaite, sinon `defaut`)."""
+    indices = np.full(len(textes), categories.index(defaut), dtype=np.int8)
+    deja_classes = np.zeros(len(textes), dtype=bool)
+    for motif, valeur in regles:
+        correspond = textes.str.contains(motif, regex=True).to_numpy() & ~deja_classes
+        indices[correspond] = categories.index(valeur)
+        deja_classes |= correspond
+    return indices
+
+
+def classifier_statuts(statuts):
+    """
+    Classe une Series de statuts bruts. Retourne un DataFrame (même index) avec
+    les colonnes catégorielles « Éligible ? » et « Technologie ».
+    """
+    codes, distincts = pd.factorize(statuts.fillna("").astype(str), sort=False)
+    textes = pd.Series([sans_accents(s).lower() for s in distincts], dtype=object)
+    eligibilite = _appliquer_regles(textes, REGLES_ELIGIBILITE, INDETERMINE, CATEGORIES_ELIGIBILITE)
+    technologie = _appliquer_regles(textes, REGLES_TECHNOLOGIE, TECHNOLOGIE_INCONNUE, CATEGORIES_TECHNOLOGIE)
+    # Une adresse non éligible n'a pas de technologie
+    technologie[eligibilite != CATEGORIES_ELIGIBILITE.index(ELIGIBLE)] = CATEGORIES_TECHNOLOGIE.index(TECHNOLOGIE_INCONNUE)
+    return pd.DataFrame({
+        "Éligible ?": pd.Categorical.from_codes(eligibilite[codes], CATEGORIES_ELIGIBILITE),
+        "Technologie": pd.Categorical.from_codes(technologie[codes], CATEGORIES_TECHNOLOGIE),
+    }, index=statuts.index)
+
+
+def statistiques(df, colonne="Éligible ?"):
+    """Effectifs par catégorie (groupby sur la colonne catégorielle), catégories vides exclues."""
+    stats = df.groupby(colonne, observed=True).size().reset_index()
+    stats.columns = ["Statut", "Nombre"]
+    return stats
@@ -0,0 +1,91 @@
+"""
+Vérification d'un fichier d'adresses en ligne de commande, sans Streamlit
+(traitements de nuit, machines sans interface) :
+
+    python cli.py adresses.csv -o resultats.csv
+    python cli.py adresses.xlsx -o resultats.parquet --fournisseur http --concurrence-http 20
+    python cli.py adresses.csv --workers 4 --taille-bloc 2000 --bilan bilan.json
+    python cli.py adresses.csv --fournisseur http --operateurs orange_http
+
+Le fichier est lu en flux ; chaque bloc est corrigé, vérifié, enregistré dans
+l'historique puis écrit dans le fichier de sortie avant de lire le suivant.
+Relancer la même commande après une interruption rejoue les blocs déjà
+enregistrés (points de reprise) sans les revérifier ni les ajouter une
+seconde fois à l'historique ; le fichier de sortie est réécrit en entier.
+"""
+import argparse
+import json
+import sys
+
+import config
+
+
+def afficher_progression(df_bloc, bilan):
+    print(f"[bloc {bilan['blocs']}] {bilan['lignes']} lignes en {bilan['duree_s']}s "
+          f"({bilan['lignes_par_s']} lignes/s)", flush=True)
+
+
+def afficher_bilan(bilan):
+    print(f"\n{bilan['lignes']} lignes traitées en {bilan['duree_s']}s ({bilan['lignes_par_s']} lignes/s)")
+    print(f"{bilan['adresses_verifiees']} adresses distinctes vérifiées "
+          f"({bilan['taux_dedoublonnage']:.0%} de doublons évités)")
+    if bilan.get("blocs_repris"):
+        print(f"{bilan['blocs_repris']} bloc(s) déjà enregistrés lors d'une exécution interrompue, rejoués")
+    for statut, nombre in sorted(bilan["statuts"].items()):
+        print(f"  {statut} : {nombre}")
+    if bilan.get("lignes_operateurs"):
+        print(f"{bilan['lignes_operateurs']} résultats opérateur enregistrés dans {config.CHEMIN_DB_TUNISIE}")
+    lignes_cache = [s for s in bilan["stats"] if s.get("fournisseur") == "cache"]
+    nb_demandees = sum(s["adresses"] for s in lignes_cache)
+    if nb_demandees:
+        nb_servies = sum(s["servies_par_cache"] for s in lignes_cache)
+        print(f"Cache : {nb_servies} / {nb_demandees} adresses servies sans revérification")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vérification d'éligibilité d'un fichier d'adresses, sans interface")
+    parser.add_argument("entree", help="Fichier CSV ou Excel contenant une colonne « adresse »")
+    parser.add_argument("-o", "--sortie", default=None, help="Fichier de résultats (.csv, .parquet ou .xlsx)")
+    parser.add_argument("--fournisseur", choices=["selenium", "http"], default=config.FOURNISSEUR)
+    parser.add_argument("--workers", type=int, default=None, help="Sessions navigateur (défaut : automatique)")
+    parser.add_argument("--concurrence-http", type=int, default=None, help="Requêtes simultanées du backend HTTP")
+    parser.add_argument("--taille-bloc", type=int, default=None, help=f"Lignes par bloc (défaut : {config.TAILLE_BLOC_IMPORT})")
+    parser.add_argument("--forcer", action="store_true", help="Ignorer le cache des résultats")
+    parser.add_argument("--sans-reprise", action="store_true", help="Ne pas enregistrer de points de reprise")
+    parser.add_argument("--operateurs", default=None,
+                        help="Enregistrer aussi les résultats par opérateur pour ces backends (ex. orange_http ; "
+                             "les statuts Orange déjà obtenus sont réutilisés), "
+                             "résultats dans la base Tunisie")
+    parser.add_argument("--bilan", default=None, help="Écrire le bilan (débit, statuts, stats) en JSON")
+    args = parser.parse_args(argv)
+
+    if args.concurrence_http:
+        config.HTTP_CONCURRENCE = args.concurrence_http
+
+    from db import init_db
+    from mesures import init_mesures
+    from pipeline import construire_verificateur, traiter_fichier
+    from reprise import init_reprise
+
+    init_db()
+    init_reprise()
+    init_mesures()
+    verificateur = construire_verificateur(args.fournisseur, args.workers, forcer=args.forcer)
+    try:
+        bilan = traiter_fichier(args.entree, verificateur, sortie=args.sortie, taille_bloc=args.taille_bloc,
+                                reprise=not args.sans_reprise, sur_bloc=afficher_progression, operateurs=args.operateurs)
+    except (OSError, ValueError) as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return 2
+
+    afficher_bilan(bilan)
+    if args.sortie:
+        print(f"Résultats écrits dans {args.sortie}")
+    if args.bilan:
+        with open(args.bilan, "w", encoding="utf-8") as f:
+            json.dump(bilan, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import os
+
+# ==================== CONFIGURATION ====================
+# Toutes les valeurs peuvent être surchargées par variable d'environnement.
+
+# ==================== SCRAPING ORANGE ====================
+URL_ELIGIBILITE_ORANGE = os.environ.get("ELIG_URL_ORANGE", "https://boutique.orange.fr/internet/eligibilite")
+DELAI_ATTENTE = int(os.environ.get("ELIG_DELAI_ATTENTE", "12"))
+
+# Pool de sessions Chrome (0 = dimensionnement automatique cœurs/RAM)
+NB_WORKERS = int(os.environ.get("ELIG_NB_WORKERS", "0"))
+NB_WORKERS_MAX = int(os.environ.get("ELIG_NB_WORKERS_MAX", "8"))
+RAM_PAR_SESSION_MO = int(os.environ.get("ELIG_RAM_PAR_SESSION_MO", "400"))
+NB_REESSAIS_APRES_CRASH = int(os.environ.get("ELIG_NB_REESSAIS_APRES_CRASH", "2"))
+DELAI_COOKIES = int(os.environ.get("ELIG_DELAI_COOKIES", "3"))
+
+# Limiteur de débit adaptatif (requêtes/seconde, tous workers confondus)
+DEBIT_INITIAL = float(os.environ.get("ELIG_DEBIT_INITIAL", "1.0"))
+DEBIT_MIN = float(os.environ.get("ELIG_DEBIT_MIN", "0.2"))
+DEBIT_MAX = float(os.environ.get("ELIG_DEBIT_MAX", "5.0"))
+PAS_DEBIT = float(os.environ.get("ELIG_PAS_DEBIT", "0.1"))
+CAPACITE_RAFALE = int(os.environ.get("ELIG_CAPACITE_RAFALE", "2"))
+LATENCE_CIBLE_S = float(os.environ.get("ELIG_LATENCE_CIBLE_S", "4.0"))
+
+# ==================== FOURNISSEUR D'ÉLIGIBILITÉ ====================
+# "selenium" (navigateur) ou "http" (API directe, repli Selenium en cas d'échec)
+FOURNISSEUR = os.environ.get("ELIG_FOURNISSEUR", "selenium")
+
+# Backend HTTP : endpoints JSON de recherche d'adresse puis d'éligibilité
+URL_API_ADRESSES = os.environ.get("ELIG_URL_API_ADRESSES", "https://boutique.orange.fr/api/eligibilite/adresses")
+URL_API_ELIGIBILITE = os.environ.get("ELIG_URL_API_ELIGIBILITE", "https://boutique.orange.fr/api/eligibilite/test")
+HTTP_CONCURRENCE = int(os.environ.get("ELIG_HTTP_CONCURRENCE", "10"))
+HTTP_TIMEOUT_S = float(os.environ.get("ELIG_HTTP_TIMEOUT_S", "15"))
+HTTP_NB_ESSAIS = int(os.environ.get("ELIG_HTTP_NB_ESSAIS", "4"))
+HTTP_BACKOFF_S = float(os.environ.get("ELIG_HTTP_BACKOFF_S", "0.5"))
+
+# ==================== IMPORT DE FICHIERS ====================
+# Lignes lues (puis corrigées / vérifiées / enregistrées) à la fois
+TAILLE_BLOC_IMPORT = int(os.environ.get("ELIG_TAILLE_BLOC_IMPORT", "5000"))
+TAILLE_ECHANTILLON_ENCODAGE = int(os.environ.get("ELIG_TAILLE_ECHANTILLON_ENCODAGE", str(64 * 1024)))
+# Adresses distinctes dont le résultat est gardé d'un bloc à l'autre (les plus anciennes sortent en premier)
+MAX_ADRESSES_CONNUES_FLUX = int(os.environ.get("ELIG_MAX_ADRESSES_CONNUES_FLUX", "100000"))
+
+# ==================== RAPPORT PDF ====================
+# Images des graphiques déjà rendues (par empreinte du contenu)
+DOSSIER_CACHE_RAPPORTS = os.environ.get("ELIG_DOSSIER_CACHE_RAPPORTS", "cache_rapports")
+LIGNES_PAR_SECTION_PDF = int(os.environ.get("ELIG_LIGNES_PAR_SECTION_PDF", "1000"))
+
+# ==================== BASE HISTORIQUE ====================
+CHEMIN_DB_HISTORIQUE = os.environ.get("ELIG_DB_HISTORIQUE", "historique_eligibilite.db")
+# Un lot interrompu (crash, onglet fermé) peut être repris pendant ce délai
+REPRISE_TTL_S = int(os.environ.get("ELIG_REPRISE_TTL_S", str(24 * 3600)))
+
+# ==================== CACHE DES RÉSULTATS ====================
+CACHE_TTL_S = int(os.environ.get("ELIG_CACHE_TTL_S", str(24 * 3600)))
+CACHE_TAILLE_LRU = int(os.environ.get("ELIG_CACHE_TAILLE_LRU", "10000"))
+
+# ==================== CORRECTION NLP ====================
+NOM_MODELE_NLP = os.environ.get("ELIG_MODELE_NLP", "paraphrase-multilingual-MiniLM-L12-v2")
+SEUIL_CORRECTION = float(os.environ.get("ELIG_SEUIL_CORRECTION", "0.75"))
+TAILLE_LOT_NLP = int(os.environ.get("ELIG_TAILLE_LOT_NLP", "64"))
+# Backend d'inférence CPU : "torch" (fp32), "int8" (quantification dynamique PyTorch),
+# "onnx" (ONNX Runtime) ou "onnx-int8" (modèle ONNX quantifié, fichier ci-dessous)
+BACKEND_NLP = os.environ.get("ELIG_BACKEND_NLP", "torch")
+FICHIER_ONNX_INT8 = os.environ.get("ELIG_FICHIER_ONNX_INT8", "onnx/model_qint8_avx2.onnx")
+# Un backend autre que "torch" n'est chargé qu'après validation (python correctionIA.py --backend ...)
+# avec au moins cette part de décisions de correction identiques à torch
+ACCORD_MIN_BACKEND_NLP = float(os.environ.get("ELIG_ACCORD_MIN_BACKEND_NLP", "0.99"))
+# Threads d'inférence par process (0 = défaut de la bibliothèque) : à réduire
+# quand plusieurs workers partagent la machine
+NB_THREADS_NLP = int(os.environ.get("ELIG_NB_THREADS_NLP", "0"))
+# Longueur max des séquences en tokens pour les backends accélérés (une adresse en
+# compte rarement plus de 40) ; le backend de référence "torch" n'est pas tronqué
+LONGUEUR_MAX_NLP = int(os.environ.get("ELIG_LONGUEUR_MAX_NLP", "64"))
+# Nombre de lignes de la matrice de similarité calculées par multiplication
+TAILLE_BLOC_SIMILARITE = int(os.environ.get("ELIG_TAILLE_BLOC_SIMILARITE", "8192"))
+
+# Index vectoriel (IVF) d'une grande base de référence, utilisé s'il a été construit
+DOSSIER_INDEX_ADRESSES = os.environ.get("ELIG_DOSSIER_INDEX_ADRESSES", "index_adresses")
+TOP_K_CANDIDATS = int(os.environ.get("ELIG_TOP_K_CANDIDATS", "5"))
+NPROBE_INDEX = int(os.environ.get("ELIG_NPROBE_INDEX", "16"))
+
+# Embeddings précalculés de la base de référence (versionnés, lus en mmap)
+DOSSIER_EMBEDDINGS = os.environ.get("ELIG_DOSSIER_EMBEDDINGS", "cache_embeddings")
+
+# Pré-filtre lexical (exact + trigrammes / distance d'édition) avant BERT
+PREFILTRE_LEXICAL = os.environ.get("ELIG_PREFILTRE_LEXICAL", "1") == "1"
+SEUIL_LEXICAL = float(os.environ.get("ELIG_SEUIL_LEXICAL", "0.9"))
+MARGE_LEXICALE = float(os.environ.get("ELIG_MARGE_LEXICALE", "0.03"))
+NB_CANDIDATS_LEXICAUX = int(os.environ.get("ELIG_NB_CANDIDATS_LEXICAUX", "20"))
+PART_MAX_TRIGRAMME = float(os.environ.get("ELIG_PART_MAX_TRIGRAMME", "0.1"))
+# Plafond absolu des listes de trigrammes parcourues par requête
+MAX_POSTINGS_TRIGRAMME = int(os.environ.get("ELIG_MAX_POSTINGS_TRIGRAMME", "2000"))
+# Au-delà (grande base indexée), correspondance exacte seulement : pas d'index de trigrammes en mémoire
+MAX_ADRESSES_TRIGRAMMES = int(os.environ.get("ELIG_MAX_ADRESSES_TRIGRAMMES", "200000"))
+
+# ==================== COUVERTURE TUNISIE ====================
+CHEMIN_DB_TUNISIE = os.environ.get("ELIG_DB_TUNISIE", "eligibilite_tunisie.db")
+# Taille des cellules de la grille spatiale (degrés, ~5,5 km en latitude)
+TAILLE_CELLULE_DEG = float(os.environ.get("ELIG_TAILLE_CELLULE_DEG", "0.05"))
+# Distance max entre une adresse et une zone pour la considérer couverte
+RAYON_COUVERTURE_KM = float(os.environ.get("ELIG_RAYON_COUVERTURE_KM", "1.0"))
+
+# Vérification multi-opérateurs : backends interrogés en parallèle pour chaque adresse
+# (noms du registre d'operateurs.py), et durée max d'un appel à un backend.
+# zones_couverture ne s'applique qu'aux adresses géolocalisées (latitude / longitude)
+BACKENDS_OPERATEURS = os.environ.get("ELIG_BACKENDS_OPERATEURS", "orange_http")
+TIMEOUT_OPERATEUR_S = float(os.environ.get("ELIG_TIMEOUT_OPERATEUR_S", "30"))
+
+# ==================== FILE DE JOBS ====================
+# Nombre d'adresses traitées (et enregistrées) à la fois par le worker
+TAILLE_LOT_JOB = int(os.environ.get("ELIG_TAILLE_LOT_JOB", "25"))
+INTERVALLE_SONDAGE_JOBS_S = float(os.environ.get("ELIG_INTERVALLE_SONDAGE_JOBS_S", "2"))
+# Fréquence à laquelle un worker libre récupère les jobs orphelins (worker disparu)
+INTERVALLE_ORPHELINS_S = float(os.environ.get("ELIG_INTERVALLE_ORPHELINS_S", "60"))
+# Soumission sans nouveau bloc inséré depuis ce délai (interface arrêtée en cours d'envoi) : supprimée
+DELAI_CREATION_JOB_S = float(os.environ.get("ELIG_DELAI_CREATION_JOB_S", "3600"))
+
+# ==================== MESURES DE PERFORMANCE ====================
+# Chronomètres / compteurs des étapes critiques, enregistrés dans la base historique
+MESURES_ACTIVES = os.environ.get("ELIG_MESURES", "1") == "1"
+MESURES_RETENTION_J = int(os.environ.get("ELIG_MESURES_RETENTION_J", "30"))
+
+# ==================== ARCHIVAGE DE L'HISTORIQUE ====================
+# Les vérifications plus anciennes que RETENTION_HISTORIQUE_J jours quittent les bases
+# pour des fichiers Parquet compressés (python archivage.py) ; les agrégats restent en base
+RETENTION_HISTORIQUE_J = int(os.environ.get("ELIG_RETENTION_HISTORIQUE_J", "365"))
+DOSSIER_ARCHIVES = os.environ.get("ELIG_DOSSIER_ARCHIVES", "archives")
+TAILLE_LOT_ARCHIVAGE = int(os.environ.get("ELIG_TAILLE_LOT_ARCHIVAGE", "50000"))
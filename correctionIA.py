@@ -1,8 +1,83 @@
-from sentence_transformers import SentenceTransformer, util
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
 import numpy as np
 
-# Charger un modèle NLP multilingue léger
-modele_bert = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+import config
+from mesures import incrementer, observer
+from index_adresses import charger_index_si_present
+from magasin_embeddings import embeddings_references
+from prefiltre_lexical import IndexLexical
+
+_modeles = {}
+_verrou_modele = threading.Lock()
+
+BACKENDS_NLP = ("torch", "int8", "onnx", "onnx-int8")
+
+def _charger_modele(nom_modele, backend):
+    """SentenceTransformer pour le backend d'inférence CPU demandé (voir config.BACKEND_NLP)."""
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in BACKENDS_NLP:
+        raise ValueError(f"Backend NLP inconnu : {backend} (attendu : {', '.join(BACKENDS_NLP)})")
+    if backend.startswith("onnx"):
+        # ONNX Runtime (sentence-transformers >= 3.2, extra [onnx])
+        model_kwargs = {"provider": "CPUExecutionProvider"}
+        if backend == "onnx-int8":
+            model_kwargs["file_name"] = config.FICHIER_ONNX_INT8
+        if config.NB_THREADS_NLP:
+            import onnxruntime
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = config.NB_THREADS_NLP
+            model_kwargs["session_options"] = options
+        modele = SentenceTransformer(nom_modele, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+    else:
+        if config.NB_THREADS_NLP or backend == "int8":
+            import torch
+            if config.NB_THREADS_NLP:
+                torch.set_num_threads(config.NB_THREADS_NLP)
+        modele = SentenceTransformer(nom_modele)
+        if backend == "int8":
+            # Poids des couches linéaires en int8, activations quantifiées à la volée
+            modele = torch.ao.quantization.quantize_dynamic(modele, {torch.nn.Linear}, dtype=torch.qint8)
+    if backend != "torch" and config.LONGUEUR_MAX_NLP:
+        # Référence torch intacte : ses embeddings et l'index IVF restent ceux du modèle complet
+        modele.max_seq_length = min(modele.max_seq_length, config.LONGUEUR_MAX_NLP)
+    return modele
+
+def obtenir_modele(nom_modele=None, backend=None):
+    """
+    Modèle NLP multilingue léger, chargé une seule fois par process et par
+    backend (partagé par toutes les sessions et tous les reruns Streamlit).
+    Le backend configuré (backend=None), s'il n'est pas "torch", doit avoir été
+    validé contre torch (voir comparer_backends) ; un backend explicite sert à
+    cette validation et n'est pas contrôlé.
+    """
+    nom_modele = nom_modele or config.NOM_MODELE_NLP
+    backend_configure = backend is None
+    backend = backend or config.BACKEND_NLP
+    with _verrou_modele:
+        if (nom_modele, backend) not in _modeles:
+            if backend_configure and backend != "torch":
+                _verifier_validation(backend)
+            _modeles[nom_modele, backend] = _charger_modele(nom_modele, backend)
+        return _modeles[nom_modele, backend]
+
+def identifiant_modele(backend=None):
+    """
+    Nom du modèle complété du backend et de la longueur max des séquences : les
+    embeddings de référence mis en cache (et la validation) sont propres à chaque
+    backend et à chaque troncature (ceux du backend "torch", jamais tronqué,
+    gardent le nom seul).
+    """
+    backend = backend or config.BACKEND_NLP
+    if backend == "torch":
+        return config.NOM_MODELE_NLP
+    longueur = f":{config.LONGUEUR_MAX_NLP}" if config.LONGUEUR_MAX_NLP else ""
+    return f"{config.NOM_MODELE_NLP}@{backend}{longueur}"
 
 # Base interne d’adresses de référence
 BASE_ADRESSES = [
@@ -13,23 +88,279 @@ BASE_ADRESSES = [
     "3 Rue Nationale, Lille"
 ]
 
-# Encoder une seule fois les adresses de référence
-embeddings_base = modele_bert.encode(BASE_ADRESSES)
+def _encoder(adresses, taille_lot=None, backend=None):
+    return obtenir_modele(backend=backend).encode(list(adresses), batch_size=taille_lot or config.TAILLE_LOT_NLP,
+                                   convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+
+_base_adresses = np.array(BASE_ADRESSES, dtype=object)
+
+# Ressources de référence chargées à la première utilisation et non à l'import :
+# les pages qui ne corrigent rien ne paient ni la lecture des embeddings ni,
+# au tout premier lancement, le chargement du modèle.
+_embeddings_base = None
+_index_adresses = None
+_index_cherche = False
+_verrou_ressources = threading.Lock()
+
+def obtenir_embeddings_base():
+    """
+    Embeddings des adresses de référence (vecteurs normalisés : le produit scalaire
+    donne directement la similarité cosinus). Calculés une fois puis relus en mmap.
+    """
+    global _embeddings_base
+    with _verrou_ressources:
+        if _embeddings_base is None:
+            _embeddings_base, _ = embeddings_references(BASE_ADRESSES, _encoder, identifiant_modele())
+        return _embeddings_base
+
+def obtenir_index_adresses():
+    """Grande base de référence (index IVF sur disque) si elle a été construite, sinon None."""
+    global _index_adresses, _index_cherche
+    with _verrou_ressources:
+        if not _index_cherche:
+            _index_adresses = charger_index_si_present()
+            _index_cherche = True
+        return _index_adresses
+
+def definir_index_adresses(index):
+    """Remplace la base de référence (index reconstruit, banc d'essai) ; None = BASE_ADRESSES."""
+    global _index_adresses, _index_cherche, _index_lexical
+    with _verrou_ressources:
+        _index_adresses = index
+        _index_cherche = True
+    with _verrou_modele:
+        _index_lexical = None
+
+def _meilleures_correspondances(emb_adresses, embeddings_base=None):
+    """
+    Adresse de référence la plus proche et son score, pour chaque embedding.
+    L'index IVF (construit une fois, en fp32) sert quel que soit le backend des requêtes.
+    """
+    index_adresses = obtenir_index_adresses()
+    if index_adresses is not None:
+        ids, scores = index_adresses.rechercher(emb_adresses, k=1)
+        meilleures = np.array([index_adresses.adresse(i) if i >= 0 else "" for i in ids[:, 0]], dtype=object)
+        return meilleures, scores[:, 0]
+
+    # Base en mémoire : recherche exacte par blocs de lignes pour borner la mémoire
+    embeddings_base = obtenir_embeddings_base() if embeddings_base is None else embeddings_base
+    best_idx = np.empty(len(emb_adresses), dtype=np.int64)
+    best_scores = np.empty(len(emb_adresses), dtype=np.float32)
+    for debut in range(0, len(emb_adresses), config.TAILLE_BLOC_SIMILARITE):
+        bloc = slice(debut, debut + config.TAILLE_BLOC_SIMILARITE)
+        scores = emb_adresses[bloc] @ embeddings_base.T
+        best_idx[bloc] = scores.argmax(axis=1)
+        best_scores[bloc] = scores[np.arange(scores.shape[0]), best_idx[bloc]]
+    return _base_adresses[best_idx], best_scores
+
+_index_lexical = None
+
+def obtenir_index_lexical():
+    """Index lexical de la base de référence, construit à la première utilisation."""
+    global _index_lexical
+    index_adresses = obtenir_index_adresses()
+    with _verrou_modele:
+        if _index_lexical is None:
+            if index_adresses is not None:
+                references = [a for segment in index_adresses.segments for a in segment["adresses"]]
+            else:
+                references = BASE_ADRESSES
+            _index_lexical = IndexLexical(references,
+                                          avec_trigrammes=len(references) <= config.MAX_ADRESSES_TRIGRAMMES)
+        return _index_lexical
+
+def corriger_adresses_detail(adresses, taille_lot=None, prefiltre=None):
+    """
+    Correction en deux étages :
+    1. pré-filtre lexical (forme normalisée exacte, puis trigrammes + distance
+       d'édition) qui règle les cas sûrs sans passer par le modèle ;
+    2. BERT par lots pour les adresses restantes (similarité cosinus avec la base
+       par multiplication matricielle, ou index IVF pour une grande base).
+    Retourne un dict : corrigees, scores, etapes ("exact" / "lexical" / "bert"),
+    durees (secondes par étage) et nb_par_etape.
+    """
+    prefiltre = config.PREFILTRE_LEXICAL if prefiltre is None else prefiltre
+    adresses = np.array(list(adresses), dtype=object)
+    corrigees = adresses.copy()
+    scores = np.zeros(len(adresses), dtype=np.float32)
+    etapes = np.full(len(adresses), "bert", dtype=object)
+    durees = {"lexical_s": 0.0, "bert_s": 0.0}
+
+    a_encoder = np.arange(len(adresses))
+    if prefiltre and len(adresses):
+        debut = time.perf_counter()
+        index_lexical = obtenir_index_lexical()
+        restants = []
+        for i, adresse in enumerate(adresses):
+            idx, score, confiant = index_lexical.rechercher(adresse)
+            if confiant:
+                corrigees[i] = index_lexical.adresses[idx]
+                scores[i] = score
+                etapes[i] = "exact" if score == 1.0 else "lexical"
+            else:
+                restants.append(i)
+        a_encoder = np.array(restants, dtype=np.int64)
+        durees["lexical_s"] = time.perf_counter() - debut
+
+    if len(a_encoder):
+        debut = time.perf_counter()
+        # Encoder les adresses ambiguës par lots
+        emb_adresses = _encoder(adresses[a_encoder], taille_lot)
+        meilleures, best_scores = _meilleures_correspondances(emb_adresses)
+        # Seuil de confiance : en dessous, on garde l'adresse saisie
+        corrigees[a_encoder] = np.where(best_scores > config.SEUIL_CORRECTION, meilleures, adresses[a_encoder])
+        scores[a_encoder] = best_scores
+        durees["bert_s"] = time.perf_counter() - debut
+
+    valeurs, nombres = np.unique(etapes, return_counts=True) if len(etapes) else ([], [])
+    if prefiltre and len(adresses):
+        observer("correction.lexical", durees["lexical_s"])
+    if len(a_encoder):
+        observer("correction.bert", durees["bert_s"])
+    for etape, nombre in zip(valeurs, nombres):
+        incrementer("correction.adresses", int(nombre), etape=str(etape))
+    return {
+        "corrigees": corrigees,
+        "scores": scores,
+        "etapes": etapes,
+        "durees": {cle: round(val, 4) for cle, val in durees.items()},
+        "nb_par_etape": {str(v): int(n) for v, n in zip(valeurs, nombres)},
+    }
+
+def corriger_adresses_ia(adresses, taille_lot=None):
+    """
+    Corrige une liste d'adresses en une passe (voir corriger_adresses_detail).
+    Retourne (adresses_corrigees, scores) sous forme de tableaux numpy.
+    """
+    detail = corriger_adresses_detail(adresses, taille_lot)
+    return detail["corrigees"], detail["scores"]
 
 def corriger_adresse_ia(adresse):
     """
     Corrige une adresse en cherchant la correspondance la plus proche dans la base via BERT.
     """
-    # Encoder l’adresse saisie
-    emb_adresse = modele_bert.encode([adresse])[0]
-    
-    # Calculer la similarité cosinus avec toutes les adresses de référence
-    scores = util.cos_sim(emb_adresse, embeddings_base)[0].cpu().numpy()
-    
-    best_idx = np.argmax(scores)
-    best_score = scores[best_idx]
-    
-    if best_score > 0.75:  # Seuil de confiance
-        return BASE_ADRESSES[best_idx], best_score
+    corrigees, scores = corriger_adresses_ia([adresse])
+    return corrigees[0], scores[0]
+
+def rechercher_candidats(adresses, k=None):
+    """
+    Top-k adresses de référence pour chaque adresse saisie.
+    Retourne une liste de listes [(adresse_reference, score), ...].
+    """
+    k = k or config.TOP_K_CANDIDATS
+    emb_adresses = _encoder(adresses)
+    index_adresses = obtenir_index_adresses()
+    if index_adresses is not None:
+        ids, scores = index_adresses.rechercher(emb_adresses, k=k)
+        return [[(index_adresses.adresse(i), float(s)) for i, s in zip(ligne_ids, ligne_scores) if i >= 0]
+                for ligne_ids, ligne_scores in zip(ids, scores)]
+    scores = emb_adresses @ obtenir_embeddings_base().T
+    meilleurs = np.argsort(-scores, axis=1)[:, :k]
+    return [[(BASE_ADRESSES[j], float(scores[i, j])) for j in ligne] for i, ligne in enumerate(meilleurs)]
+
+# ==================== VALIDATION D'UN BACKEND ====================
+def _chemin_validation(backend, dossier=None):
+    return os.path.join(dossier or config.DOSSIER_EMBEDDINGS, f"validation_{backend}.json")
+
+def _verifier_validation(backend):
+    """Refuse un backend sans validation réussie pour ce modèle et le seuil d'accord configuré."""
+    try:
+        with open(_chemin_validation(backend), encoding="utf-8") as f:
+            validation = json.load(f)
+    except (OSError, ValueError):
+        validation = {}
+    if (validation.get("modele") != identifiant_modele(backend) or validation.get("reference") != "torch"
+            or validation.get("accord", 0.0) < config.ACCORD_MIN_BACKEND_NLP):
+        raise RuntimeError(f"Backend NLP {backend} non validé (accord minimal {config.ACCORD_MIN_BACKEND_NLP:.0%} "
+                           f"avec torch) : lancez `python correctionIA.py --backend {backend}`")
+
+def _decisions_bert(adresses, backend, taille_lot=None):
+    """Décisions de l'étage BERT seul (sans pré-filtre) avec un backend donné, et durée d'encodage."""
+    adresses = np.array(list(adresses), dtype=object)
+    embeddings_base = None
+    if obtenir_index_adresses() is None:
+        embeddings_base, _ = embeddings_references(BASE_ADRESSES, lambda a: _encoder(a, backend=backend),
+                                                   identifiant_modele(backend))
+    obtenir_modele(backend=backend)
+    debut = time.perf_counter()
+    emb_adresses = _encoder(adresses, taille_lot, backend)
+    duree = time.perf_counter() - debut
+    meilleures, scores = _meilleures_correspondances(emb_adresses, embeddings_base)
+    return np.where(scores > config.SEUIL_CORRECTION, meilleures, adresses), scores, duree
+
+def comparer_backends(adresses, backend, reference="torch", taille_lot=None, accord_min=None, dossier_validation=None):
+    """
+    Compare les décisions de correction d'un backend à celles du backend de
+    référence (même adresse retenue, ou adresse saisie conservée dans les deux cas).
+    Retourne un dict : nb, accord (part de décisions identiques), ecarts, durées
+    d'encodage et accélération. Lève ValueError si l'accord est inférieur à
+    accord_min (défaut : ACCORD_MIN_BACKEND_NLP) ; sinon, contre torch, la
+    validation est enregistrée dans dossier_validation (défaut : DOSSIER_EMBEDDINGS,
+    où elle autorise le backend configuré).
+    """
+    accord_min = config.ACCORD_MIN_BACKEND_NLP if accord_min is None else accord_min
+    adresses = list(adresses)
+    corrigees_ref, scores_ref, duree_ref = _decisions_bert(adresses, reference, taille_lot)
+    corrigees, scores, duree = _decisions_bert(adresses, backend, taille_lot)
+    differentes = np.flatnonzero(corrigees_ref != corrigees)
+    rapport = {
+        "nb": len(adresses),
+        "accord": 1 - len(differentes) / len(adresses) if adresses else 1.0,
+        "ecarts": [{"adresse": adresses[i], reference: corrigees_ref[i], backend: corrigees[i],
+                    f"score_{reference}": round(float(scores_ref[i]), 4), f"score_{backend}": round(float(scores[i]), 4)}
+                   for i in differentes],
+        "ecart_score_max": round(float(np.abs(scores_ref - scores).max()), 4) if adresses else 0.0,
+        f"encodage_{reference}_s": round(duree_ref, 4),
+        f"encodage_{backend}_s": round(duree, 4),
+        "acceleration": round(duree_ref / duree, 2) if duree > 0 else None,
+        "accord_min": accord_min,
+    }
+    if rapport["accord"] < accord_min:
+        raise ValueError(f"Backend {backend} : {rapport['accord']:.2%} de décisions identiques à {reference} "
+                         f"(minimum {accord_min:.0%}, {len(differentes)} écarts sur {len(adresses)})")
+    if reference == "torch" and backend != "torch":
+        chemin = _chemin_validation(backend, dossier_validation)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        with open(chemin, "w", encoding="utf-8") as f:
+            json.dump({"backend": backend, "reference": reference, "modele": identifiant_modele(backend),
+                       "date": datetime.now().isoformat(timespec="seconds"),
+                       **{cle: valeur for cle, valeur in rapport.items() if cle != "ecarts"}},
+                      f, ensure_ascii=False, indent=2)
+    return rapport
+
+def jeu_de_test(nb_max=1000):
+    """Saisies réalistes dérivées des adresses de référence : minuscules, sans accents, sans virgule, tronquées."""
+    from normalisation import sans_accents
+
+    references = obtenir_index_lexical().adresses[:nb_max]
+    variantes = []
+    for adresse in references:
+        variantes += [adresse, adresse.lower(), sans_accents(adresse), adresse.replace(",", ""), adresse[:-2]]
+    return variantes
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Valide un backend NLP contre le backend de référence")
+    parser.add_argument("--backend", default=config.BACKEND_NLP, choices=BACKENDS_NLP)
+    parser.add_argument("--reference", default="torch", choices=BACKENDS_NLP)
+    parser.add_argument("--fichier", default=None, help="Jeu de test : une adresse par ligne (défaut : variantes de la base)")
+    parser.add_argument("--accord-min", type=float, default=config.ACCORD_MIN_BACKEND_NLP,
+                        help="Part minimale de décisions identiques")
+    args = parser.parse_args()
+
+    if args.fichier:
+        with open(args.fichier, encoding="utf-8") as f:
+            adresses_test = [ligne.strip() for ligne in f if ligne.strip()]
     else:
-        return adresse, best_score
+        adresses_test = jeu_de_test()
+    try:
+        rapport = comparer_backends(adresses_test, args.backend, args.reference, accord_min=args.accord_min)
+    except ValueError as e:
+        print("Validation refusée :", e)
+        raise SystemExit(1)
+    for ecart in rapport["ecarts"][:20]:
+        print("Écart :", ecart)
+    print({cle: valeur for cle, valeur in rapport.items() if cle != "ecarts"})
+    print(f"Validation enregistrée dans {_chemin_validation(args.backend)}")
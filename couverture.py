@@ -0,0 +1,213 @@
+"""
+Moteur de couverture local : la table `zones_couverture` d'eligibilite_tunisie.db
+est chargée en mémoire dans une grille spatiale (cellules de TAILLE_CELLULE_DEG
+degrés) pour répondre sans scraping à « quelle est la zone couverte la plus
+proche / quelle couverture à lat, lon ».
+"""
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+import config
+
+RAYON_TERRE_KM = 6371.0
+TECHNOLOGIES = ("fibre", "g4", "g5")
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Distance haversine, vectorisée (scalaires ou tableaux numpy diffusables)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class MoteurCouverture:
+
+    def __init__(self, zones, taille_cellule=None):
+        """`zones` : DataFrame avec les colonnes de la table zones_couverture."""
+        self.taille_cellule = taille_cellule or config.TAILLE_CELLULE_DEG
+        self.zones = zones.dropna(subset=["latitude", "longitude"]).reset_index(drop=True)
+        self.lat = self.zones["latitude"].to_numpy(dtype=np.float64)
+        self.lon = self.zones["longitude"].to_numpy(dtype=np.float64)
+        self.couvertures = {
+            techno: self.zones[f"{techno}_coverage"].fillna(0).to_numpy(dtype=bool) for techno in TECHNOLOGIES
+        }
+        self.operateurs = self.zones["operateur"].fillna("").to_numpy(dtype=object)
+        self._enregistrements = self.zones.to_dict("records")
+        self._masques = {}
+
+        # Grille : cellule (i, j) -> indices des zones qu'elle contient
+        cellules_i, cellules_j = self._cellules(self.lat, self.lon)
+        self.grille = {}
+        for idx, cle in enumerate(zip(cellules_i.tolist(), cellules_j.tolist())):
+            self.grille.setdefault(cle, []).append(idx)
+        self.grille = {cle: np.array(ids, dtype=np.int64) for cle, ids in self.grille.items()}
+        if self.grille:
+            cles = np.array(list(self.grille.keys()))
+            self._bornes = (cles[:, 0].min(), cles[:, 0].max(), cles[:, 1].min(), cles[:, 1].max())
+        else:
+            self._bornes = None
+
+    @classmethod
+    def charger(cls, chemin_db=None):
+        conn = sqlite3.connect(chemin_db or config.CHEMIN_DB_TUNISIE)
+        zones = pd.read_sql_query("SELECT * FROM zones_couverture", conn)
+        conn.close()
+        return cls(zones)
+
+    def __len__(self):
+        return len(self.zones)
+
+    def _cellules(self, lat, lon):
+        return (np.floor(np.asarray(lat) / self.taille_cellule).astype(np.int64),
+                np.floor(np.asarray(lon) / self.taille_cellule).astype(np.int64))
+
+    def _largeur_cellule_km(self, lat):
+        """Plus petit côté d'une cellule en km (la longitude rétrécit avec la latitude)."""
+        return self.taille_cellule * 111.32 * max(float(np.cos(np.radians(np.max(np.abs(lat))))), 0.01)
+
+    def _masque(self, operateur=None, technologie=None):
+        cle = (operateur, technologie)
+        if cle not in self._masques:
+            masque = np.ones(len(self.zones), dtype=bool)
+            if operateur:
+                masque &= self.operateurs == operateur
+            if technologie:
+                masque &= self.couvertures[technologie]
+            self._masques[cle] = masque
+        return self._masques[cle]
+
+    def _anneau(self, ci, cj, rayon):
+        """Zones des cellules situées exactement à `rayon` cellules de (ci, cj)."""
+        if rayon == 0:
+            cellules = [(ci, cj)]
+        else:
+            cellules = [(ci + d, cj + c) for d in (-rayon, rayon) for c in range(-rayon, rayon + 1)]
+            cellules += [(ci + d, cj + c) for c in (-rayon, rayon) for d in range(-rayon + 1, rayon)]
+        ids = [self.grille[cle] for cle in cellules if cle in self.grille]
+        return np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+
+    def zone_la_plus_proche(self, lat, lon, operateur=None, technologie=None, rayon_max_km=None):
+        """
+        Zone (filtrée par opérateur / technologie couverte) la plus proche de (lat, lon).
+        Retourne un dict (colonnes de la zone + distance_km) ou None.
+        """
+        if not self.grille:
+            return None
+        masque = self._masque(operateur, technologie)
+        ci, cj = (int(c) for c in self._cellules(lat, lon))
+        largeur_km = self._largeur_cellule_km(lat)
+        # Au-delà de ce rayon (en cellules), il n'y a plus aucune cellule occupée
+        imin, imax, jmin, jmax = self._bornes
+        rayon_max = int(max(abs(ci - imin), abs(ci - imax), abs(cj - jmin), abs(cj - jmax)))
+
+        meilleur, meilleure_distance = None, np.inf
+        for rayon in range(rayon_max + 1):
+            # Toute zone de l'anneau `rayon` est à plus de (rayon - 1) largeurs de cellule
+            borne_km = (rayon - 1) * largeur_km
+            if borne_km > meilleure_distance or (rayon_max_km is not None and borne_km > rayon_max_km):
+                break
+            ids = self._anneau(ci, cj, rayon)
+            ids = ids[masque[ids]]
+            if len(ids):
+                distances = distance_km(lat, lon, self.lat[ids], self.lon[ids])
+                k = int(distances.argmin())
+                if distances[k] < meilleure_distance:
+                    meilleur, meilleure_distance = int(ids[k]), float(distances[k])
+
+        if meilleur is None or (rayon_max_km is not None and meilleure_distance > rayon_max_km):
+            return None
+        zone = dict(self._enregistrements[meilleur])
+        zone["distance_km"] = meilleure_distance
+        return zone
+
+    def couverture_a(self, lat, lon, rayon_km=None, operateur=None):
+        """
+        Couverture au point (lat, lon) : une technologie est disponible si une zone
+        qui la couvre est à moins de `rayon_km`. Retourne un dict par technologie.
+        """
+        rayon_km = rayon_km or config.RAYON_COUVERTURE_KM
+        resultat = {}
+        for techno in TECHNOLOGIES:
+            zone = self.zone_la_plus_proche(lat, lon, operateur=operateur, technologie=techno, rayon_max_km=rayon_km)
+            resultat[techno] = zone is not None
+            resultat[f"{techno}_operateur"] = zone["operateur"] if zone else None
+            resultat[f"{techno}_distance_km"] = zone["distance_km"] if zone else None
+        return resultat
+
+    def couverture_dataframe(self, df, col_lat="latitude", col_lon="longitude", rayon_km=None, operateur=None):
+        """
+        Requête en masse : pour chaque ligne géocodée de `df`, zone la plus proche
+        et couverture fibre / 4G / 5G dans `rayon_km`. Les points sont regroupés
+        par cellule et chaque groupe est comparé en une opération matricielle aux
+        zones des cellules voisines couvrant `rayon_km` ; seuls les points sans zone
+        dans ce voisinage sont comparés (par blocs) à l'ensemble des zones.
+        """
+        rayon_km = rayon_km or config.RAYON_COUVERTURE_KM
+        n = len(df)
+        lat = df[col_lat].to_numpy(dtype=np.float64)
+        lon = df[col_lon].to_numpy(dtype=np.float64)
+        zone_proche = np.full(n, -1, dtype=np.int64)
+        distance = np.full(n, np.inf)
+        couvert = {techno: np.zeros(n, dtype=bool) for techno in TECHNOLOGIES}
+
+        valides = ~(np.isnan(lat) | np.isnan(lon))
+        masque_operateur = self._masque(operateur)
+        if self.grille and valides.any():
+            idx_valides = np.flatnonzero(valides)
+            # Voisinage (en cellules) qui contient à coup sûr tout le disque de rayon_km
+            largeur_km = self._largeur_cellule_km(lat[idx_valides])
+            voisinage = max(1, int(np.ceil(rayon_km / largeur_km)))
+            ci, cj = self._cellules(lat[idx_valides], lon[idx_valides])
+            cellules, groupes = np.unique(np.stack([ci, cj], axis=1), axis=0, return_inverse=True)
+            groupes = groupes.reshape(-1)
+            ordre = np.argsort(groupes, kind="stable")
+            bornes = np.searchsorted(groupes[ordre], np.arange(len(cellules) + 1))
+            for g, (gi, gj) in enumerate(cellules.tolist()):
+                points = idx_valides[ordre[bornes[g]:bornes[g + 1]]]
+                candidats = np.concatenate([self._anneau(gi, gj, r) for r in range(voisinage + 1)])
+                candidats = candidats[masque_operateur[candidats]]
+                if not len(candidats):
+                    continue
+                d = distance_km(lat[points, None], lon[points, None], self.lat[candidats], self.lon[candidats])
+                k = d.argmin(axis=1)
+                zone_proche[points] = candidats[k]
+                distance[points] = d[np.arange(len(points)), k]
+                proches = d <= rayon_km
+                for techno in TECHNOLOGIES:
+                    couvert[techno][points] = (proches & self.couvertures[techno][candidats]).any(axis=1)
+
+            # Zone la plus proche hors voisinage : comparaison à toutes les zones, par blocs
+            a_completer = idx_valides[distance[idx_valides] > voisinage * largeur_km]
+            candidats = np.flatnonzero(masque_operateur)
+            if len(a_completer) and len(candidats):
+                taille_bloc = max(1, 5_000_000 // len(candidats))
+                for debut in range(0, len(a_completer), taille_bloc):
+                    points = a_completer[debut:debut + taille_bloc]
+                    d = distance_km(lat[points, None], lon[points, None], self.lat[candidats], self.lon[candidats])
+                    k = d.argmin(axis=1)
+                    zone_proche[points] = candidats[k]
+                    distance[points] = d[np.arange(len(points)), k]
+
+        resultat = pd.DataFrame(index=df.index)
+        resultat["zone_id"] = self.zones["id"].to_numpy()[zone_proche] if len(self.zones) else -1
+        resultat.loc[zone_proche < 0, "zone_id"] = -1
+        resultat["distance_km"] = np.where(np.isfinite(distance), distance, np.nan)
+        for techno in TECHNOLOGIES:
+            resultat[f"{techno}_couvert"] = couvert[techno]
+        return resultat
+
+
+_moteur = None
+_verrou_moteur = threading.Lock()
+
+def moteur_couverture(recharger=False):
+    """Moteur partagé par tout le process (chargé une fois depuis la base Tunisie)."""
+    global _moteur
+    with _verrou_moteur:
+        if _moteur is None or recharger:
+            _moteur = MoteurCouverture.charger()
+        return _moteur
@@ -1,31 +1,295 @@
 import sqlite3
+import threading
+from collections import Counter
 from datetime import datetime
 
-def init_db():
-    conn = sqlite3.connect("historique_eligibilite.db")
-    cur = conn.cursor()
+import pandas as pd
+
+import config
+from mesures import chronometre, incrementer
+from normalisation import normaliser_adresse
+
+# Connexions SQLite longue durée, une par fichier, partagées par tout le process.
+# sqlite3 n'est pas sûr en accès concurrent sur une même connexion : tout accès
+# passe par _verrou_db.
+_connexions = {}
+_verrou_db = threading.RLock()
+# Recherche plein texte FTS5 (tokenizer trigramme) disponible dans ce SQLite ?
+_fts_disponible = False
+
+# Colonnes d'un DataFrame de résultats de vérification
+COLONNES_RESULTATS = ["Adresse saisie", "Adresse corrigée", "Statut éligibilité"]
+
+def connexion(chemin=None):
+    """Connexion réutilisée entre les appels, en mode WAL (lectures non bloquées par les écritures)."""
+    chemin = chemin or config.CHEMIN_DB_HISTORIQUE
+    with _verrou_db:
+        if chemin not in _connexions:
+            conn = sqlite3.connect(chemin, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Plusieurs process (UI, workers) écrivent dans la même base
+            conn.execute("PRAGMA busy_timeout=10000")
+            _connexions[chemin] = conn
+        return _connexions[chemin]
+
+def _init_fts(cur):
+    """
+    Index FTS5 trigramme sur les adresses (recherche de sous-chaîne indexée).
+    Les suppressions / modifications sont suivies par triggers ; les insertions
+    sont indexées en masse par _indexer_fts (un trigger par ligne coûte ~5x plus
+    cher sur un gros lot). Retourne False si ce SQLite ne le supporte pas.
+    """
+    existe = cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'historique_fts'").fetchone()
+    try:
+        cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS historique_fts USING fts5(
+            adresse_saisie, adresse_corrigee,
+            content='historique', content_rowid='id', tokenize='trigram'
+        )
+        """)
+    except sqlite3.OperationalError:
+        return False
+    cur.executescript("""
+    CREATE TRIGGER IF NOT EXISTS historique_fts_ad AFTER DELETE ON historique BEGIN
+        INSERT INTO historique_fts(historique_fts, rowid, adresse_saisie, adresse_corrigee)
+        VALUES ('delete', old.id, old.adresse_saisie, old.adresse_corrigee);
+    END;
+    CREATE TRIGGER IF NOT EXISTS historique_fts_au AFTER UPDATE OF adresse_saisie, adresse_corrigee ON historique BEGIN
+        INSERT INTO historique_fts(historique_fts, rowid, adresse_saisie, adresse_corrigee)
+        VALUES ('delete', old.id, old.adresse_saisie, old.adresse_corrigee);
+        INSERT INTO historique_fts(rowid, adresse_saisie, adresse_corrigee)
+        VALUES (new.id, new.adresse_saisie, new.adresse_corrigee);
+    END;
+    """)
+    if not existe:
+        # Première création : indexer les lignes déjà présentes
+        cur.execute("INSERT INTO historique_fts(historique_fts) VALUES ('rebuild')")
+    return True
+
+def _indexer_fts(conn, apres_id):
+    """Ajoute à l'index plein texte les lignes d'historique d'id > apres_id."""
+    if _fts_disponible:
+        conn.execute("""
+            INSERT INTO historique_fts(rowid, adresse_saisie, adresse_corrigee)
+            SELECT id, adresse_saisie, adresse_corrigee FROM historique WHERE id > ?
+        """, (apres_id,))
+
+def _init_agregats(cur):
+    """
+    Agrégat matérialisé : nombre de vérifications par jour et par statut.
+    Tenu à jour par inserer_historique dans la même transaction, il n'est jamais
+    décrémenté : les lignes archivées (archivage.py) restent comptées.
+    """
+    existe = cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'agregats_historique'").fetchone()
     cur.execute("""
-    CREATE TABLE IF NOT EXISTS historique (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        adresse_saisie TEXT,
-        adresse_corrigee TEXT,
+    CREATE TABLE IF NOT EXISTS agregats_historique (
+        jour TEXT,
         statut TEXT,
-        date_verif TEXT
-    )
+        nombre INTEGER NOT NULL,
+        PRIMARY KEY (jour, statut)
+    ) WITHOUT ROWID
     """)
-    conn.commit()
-    conn.close()
+    if not existe:
+        # Première création : agréger l'historique déjà présent
+        cur.execute("""
+            INSERT INTO agregats_historique (jour, statut, nombre)
+            SELECT substr(date_verif, 1, 10), statut, COUNT(*) FROM historique GROUP BY 1, 2
+        """)
+
+def init_db():
+    global _fts_disponible
+    with _verrou_db:
+        conn = connexion()
+        cur = conn.cursor()
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS historique (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            adresse_saisie TEXT,
+            adresse_corrigee TEXT,
+            statut TEXT,
+            date_verif TEXT,
+            adresse_normalisee TEXT
+        )
+        """)
+
+        # Migration : clé d'adresse normalisée pour le cache des résultats
+        colonnes = [ligne[1] for ligne in cur.execute("PRAGMA table_info(historique)")]
+        if "adresse_normalisee" not in colonnes:
+            cur.execute("ALTER TABLE historique ADD COLUMN adresse_normalisee TEXT")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_historique_normalisee ON historique (adresse_normalisee, date_verif)")
+        lignes = cur.execute("SELECT id, adresse_corrigee FROM historique WHERE adresse_normalisee IS NULL").fetchall()
+        cur.executemany("UPDATE historique SET adresse_normalisee = ? WHERE id = ?",
+                        [(normaliser_adresse(adresse or ""), id_) for id_, adresse in lignes])
+
+        # Index pour le tri chronologique et la recherche par adresse
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_historique_date ON historique (date_verif)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_historique_saisie ON historique (adresse_saisie)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_historique_corrigee ON historique (adresse_corrigee)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_historique_statut ON historique (statut, date_verif)")
+        _fts_disponible = _init_fts(cur)
+        _init_agregats(cur)
+
+        conn.commit()
+
+def inserer_historique(conn, df):
+    """
+    Insère les résultats de `df` dans la transaction en cours de `conn`
+    (executemany sur les colonnes du DataFrame, sans itérer ligne à ligne).
+    L'appelant gère le verrou et le commit.
+    """
+    if len(df) == 0:
+        return
+    saisies = df['Adresse saisie'].astype(str).tolist()
+    corrigees = df['Adresse corrigée'].astype(str).tolist()
+    statuts = df['Statut éligibilité'].astype(str).tolist()
+    normalisees = [normaliser_adresse(a) for a in corrigees]
+    date_verif = datetime.now().isoformat()
+
+    dernier_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM historique").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO historique (adresse_saisie, adresse_corrigee, statut, date_verif, adresse_normalisee) VALUES (?, ?, ?, ?, ?)",
+        zip(saisies, corrigees, statuts, [date_verif] * len(saisies), normalisees))
+    _indexer_fts(conn, dernier_id)
+    conn.executemany("""
+        INSERT INTO agregats_historique (jour, statut, nombre) VALUES (?, ?, ?)
+        ON CONFLICT (jour, statut) DO UPDATE SET nombre = nombre + excluded.nombre
+    """, [(date_verif[:10], statut, nombre) for statut, nombre in Counter(statuts).items()])
 
 def sauvegarder_resultats(df):
-    conn = sqlite3.connect("historique_eligibilite.db")
-    for _, row in df.iterrows():
-        conn.execute("INSERT INTO historique (adresse_saisie, adresse_corrigee, statut, date_verif) VALUES (?, ?, ?, ?)", 
-                     (row['Adresse saisie'], row['Adresse corrigée'], row['Statut éligibilité'], datetime.now().isoformat()))
-    conn.commit()
-    conn.close()
+    """Insère tous les résultats en une seule transaction."""
+    if len(df) == 0:
+        return
+    with chronometre("db.sauvegarde"), _verrou_db:
+        conn = connexion()
+        with conn:
+            inserer_historique(conn, df)
+    incrementer("db.lignes_sauvegardees", len(df))
+
+def _filtres_historique(date_debut=None, date_fin=None, statuts=None, recherche=None):
+    """Clauses WHERE (et paramètres) communes à la pagination et aux agrégats."""
+    clauses, params = [], []
+    if date_debut:
+        clauses.append("date_verif >= ?")
+        params.append(str(date_debut))
+    if date_fin:
+        # Date seule : inclure toute la journée
+        clauses.append("date_verif < ?")
+        params.append(f"{date_fin}\uffff" if len(str(date_fin)) == 10 else str(date_fin))
+    if statuts:
+        clauses.append(f"statut IN ({','.join('?' * len(statuts))})")
+        params.extend(statuts)
+    if recherche:
+        recherche = recherche.strip()
+        if _fts_disponible and len(recherche) >= 3:
+            clauses.append("id IN (SELECT rowid FROM historique_fts WHERE historique_fts MATCH ?)")
+            params.append('"' + recherche.replace('"', '""') + '"')
+        else:
+            clauses.append("(adresse_saisie LIKE ? OR adresse_corrigee LIKE ?)")
+            params.extend([f"%{recherche}%"] * 2)
+    return clauses, params
+
+def charger_page_historique(limite=100, curseur=None, date_debut=None, date_fin=None, statuts=None, recherche=None):
+    """
+    Une page de l'historique, du plus récent au plus ancien, par pagination
+    « keyset » : `curseur` = (date_verif, id) de la dernière ligne de la page
+    précédente, ce qui évite les OFFSET coûteux sur une grande table.
+    Retourne (df_page, curseur_suivant) ; curseur_suivant vaut None en fin d'historique.
+    """
+    clauses, params = _filtres_historique(date_debut, date_fin, statuts, recherche)
+    if curseur is not None:
+        clauses.append("(date_verif, id) < (?, ?)")
+        params.extend(curseur)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    requete = f"""
+        SELECT id, adresse_saisie, adresse_corrigee, statut, date_verif FROM historique
+        {where} ORDER BY date_verif DESC, id DESC LIMIT ?
+    """
+    with _verrou_db:
+        df_page = pd.read_sql_query(requete, connexion(), params=(*params, limite + 1))
+    suivant = None
+    if len(df_page) > limite:
+        df_page = df_page.iloc[:limite]
+        derniere = df_page.iloc[-1]
+        suivant = (derniere["date_verif"], int(derniere["id"]))
+    return df_page, suivant
+
+def _filtres_agregats(date_debut=None, date_fin=None, statuts=None):
+    """Clauses WHERE sur agregats_historique (bornes de dates au jour près)."""
+    clauses, params = [], []
+    if date_debut:
+        clauses.append("jour >= ?")
+        params.append(str(date_debut)[:10])
+    if date_fin:
+        clauses.append("jour <= ?")
+        params.append(str(date_fin)[:10])
+    if statuts:
+        clauses.append(f"statut IN ({','.join('?' * len(statuts))})")
+        params.extend(statuts)
+    return clauses, params
+
+def _agregats_suffisent(date_debut=None, date_fin=None, recherche=None):
+    """Les agrégats par jour répondent seuls si le filtre ne porte ni sur l'adresse ni sur une heure."""
+    return not recherche and all(d is None or len(str(d)) == 10 for d in (date_debut, date_fin))
+
+def compter_historique(date_debut=None, date_fin=None, statuts=None, recherche=None):
+    """
+    Nombre de vérifications par statut, pour les filtres donnés : lu dans les
+    agrégats (historique archivé compris) sauf recherche par adresse ou filtre
+    à l'heure près, calculés sur les lignes encore en base.
+    """
+    if _agregats_suffisent(date_debut, date_fin, recherche):
+        clauses, params = _filtres_agregats(date_debut, date_fin, statuts)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with _verrou_db:
+            return pd.read_sql_query(f"""
+                SELECT statut AS Statut, SUM(nombre) AS Nombre FROM agregats_historique
+                {where} GROUP BY statut ORDER BY Nombre DESC
+            """, connexion(), params=params)
+    clauses, params = _filtres_historique(date_debut, date_fin, statuts, recherche)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with _verrou_db:
+        return pd.read_sql_query(f"""
+            SELECT statut AS Statut, COUNT(*) AS Nombre FROM historique
+            {where} GROUP BY statut ORDER BY Nombre DESC
+        """, connexion(), params=params)
+
+def evolution_historique(date_debut=None, date_fin=None, statuts=None):
+    """Nombre de vérifications par jour et par statut, lu dans les agrégats."""
+    clauses, params = _filtres_agregats(date_debut, date_fin, statuts)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with _verrou_db:
+        return pd.read_sql_query(f"""
+            SELECT jour AS Jour, statut AS Statut, nombre AS Nombre FROM agregats_historique
+            {where} ORDER BY jour
+        """, connexion(), params=params)
+
+def statuts_distincts():
+    with _verrou_db:
+        return [ligne[0] for ligne in connexion().execute("SELECT DISTINCT statut FROM agregats_historique ORDER BY statut")]
 
 def charger_historique():
-    conn = sqlite3.connect("historique_eligibilite.db")
-    df_hist = pd.read_sql_query("SELECT * FROM historique ORDER BY date_verif DESC LIMIT 100", conn)
-    conn.close()
-    return df_hist
+    return charger_page_historique(limite=100)[0]
+
+def statuts_recents(cles, depuis, exclure_statut):
+    """
+    Dernier statut connu pour chaque adresse normalisée vérifiée après `depuis`
+    (date ISO). Retourne {cle: (statut, date_verif)}.
+    """
+    trouves = {}
+    cles = list(cles)
+    with _verrou_db:
+        conn = connexion()
+        # Requêtes par paquets pour rester sous la limite de paramètres SQLite
+        for i in range(0, len(cles), 500):
+            paquet = cles[i:i + 500]
+            marqueurs = ",".join("?" * len(paquet))
+            lignes = conn.execute(f"""
+                SELECT adresse_normalisee, statut, date_verif FROM historique
+                WHERE adresse_normalisee IN ({marqueurs}) AND date_verif >= ? AND statut != ?
+                ORDER BY date_verif
+            """, (*paquet, depuis, exclure_statut)).fetchall()
+            # Tri croissant : la dernière ligne lue pour une clé est la plus récente
+            for cle, statut, date_verif in lignes:
+                trouves[cle] = (statut, date_verif)
+    return trouves
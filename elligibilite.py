@@ -1,24 +1,28 @@
 import streamlit as st
 import pandas as pd
-import os
-import tempfile
-from datetime import datetime
-import sqlite3
-import plotly.io as pio
-
-# NLP
-from sentence_transformers import SentenceTransformer, util
-import numpy as np
-
-# Graphiques
-import plotly.express as px
-
-# PDF
-from fpdf import FPDF
-import plotly.io as pio
-
-# Optional: For encoding detection
-import chardet
+from datetime import datetime, timedelta
+import time
+from contextlib import contextmanager
+
+import config
+from mesures import observer
+
+# ==================== TEMPS DE CHARGEMENT ====================
+# Chaque interaction réexécute tout le script : on mesure ce que coûte chaque étape.
+# Les modules lourds (NLP, plotly, PDF, import de fichiers) ne sont importés que
+# par les pages qui s'en servent, et une seule fois par process.
+_debut_rerun = time.perf_counter()
+temps_chargement = {}
+
+@contextmanager
+def chronometrer(etape):
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        duree = time.perf_counter() - debut
+        temps_chargement[etape] = temps_chargement.get(etape, 0.0) + duree
+        observer("interface", duree, etape=etape)
 
 # ==================== CONFIG STREAMLIT ====================
 st.set_page_config(page_title="📡 Vérification Éligibilité FTTH ", layout="wide")
@@ -26,214 +30,150 @@ st.set_page_config(page_title="📡 Vérification Éligibilité FTTH ", layout="
 st.title("📡 Vérification automatique d'éligibilité FTTH- Orange")
 
 # ==================== DB SQLITE ====================
-def init_db():
-    conn = sqlite3.connect("historique_eligibilite.db")
-    cur = conn.cursor()
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS historique (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        adresse_saisie TEXT,
-        adresse_corrigee TEXT,
-        statut TEXT,
-        date_verif TEXT
-    )
-    """)
-    conn.commit()
-    conn.close()
-
-def sauvegarder_resultats(df):
-    conn = sqlite3.connect("historique_eligibilite.db")
-    for _, row in df.iterrows():
-        conn.execute("INSERT INTO historique (adresse_saisie, adresse_corrigee, statut, date_verif) VALUES (?, ?, ?, ?)", 
-                     (row['Adresse saisie'], row['Adresse corrigée'], row['Statut éligibilité'], datetime.now().isoformat()))
-    conn.commit()
-    conn.close()
-
-def charger_historique():
-    conn = sqlite3.connect("historique_eligibilite.db")
-    df_hist = pd.read_sql_query("SELECT * FROM historique ORDER BY date_verif DESC LIMIT 100", conn)
-    conn.close()
-    return df_hist
+with chronometrer("import base / jobs"):
+    from db import (init_db, charger_page_historique, compter_historique, statuts_distincts,
+                    evolution_historique, COLONNES_RESULTATS)
+    from jobs import (init_jobs, soumettre_job, lister_jobs, etat_job, resultats_job, annuler_job, reprendre_job,
+                      EN_ATTENTE, EN_COURS, ANNULE, ERREUR)
+    from reprise import cloturer_lot, identifiant_lot, init_reprise, lot_sauvegarde, sauvegarder_lot
+    from mesures import init_mesures
+    from operateurs import couverture_agregee
+
+@st.cache_resource
+def initialiser_bases():
+    """
+    Création / migration des tables : une fois par process, pas à chaque rerun.
+    La base Tunisie n'est pas touchée : l'interface ne fait qu'y lire les agrégats,
+    créés par les traitements qui y écrivent (cli.py --operateurs, archivage.py).
+    """
+    init_db()
+    init_jobs()
+    init_reprise()
+    init_mesures()
+    return True
 
 # Init DB
-init_db()
-
-# ==================== BASE ADRESSES DE RÉFÉRENCE ====================
-BASE_ADRESSES = [
-    "12 Rue de la République, Paris",
-    "5 Avenue des Champs-Élysées, Paris",
-    "8 Rue Victor Hugo, Lyon",
-    "10 Boulevard Saint-Germain, Paris",
-    "3 Rue Nationale, Lille"
-]
+with chronometrer("init base"):
+    initialiser_bases()
 
 # ==================== IA NLP POUR CORRECTION ====================
-st.sidebar.write("⏳ Chargement du modèle NLP...")
-modele_bert = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-embeddings_base = modele_bert.encode(BASE_ADRESSES)
-
-def corriger_adresse_ia(adresse):
-    emb_adresse = modele_bert.encode([adresse])[0]
-    scores = util.cos_sim(emb_adresse, embeddings_base)[0].cpu().numpy()
-    best_idx = np.argmax(scores)
-    best_score = scores[best_idx]
-    if best_score > 0.75:
-        return BASE_ADRESSES[best_idx], best_score
-    else:
-        return adresse, best_score
+def afficher_stats_correction(detail):
+    nb = detail["nb_par_etape"]
+    st.caption(f"🧠 Correction : {nb.get('exact', 0)} exactes, {nb.get('lexical', 0)} lexicales, "
+               f"{nb.get('bert', 0)} via BERT — {detail['durees']['lexical_s']}s pré-filtre, "
+               f"{detail['durees']['bert_s']}s BERT")
 
 # ==================== SELENIUM POUR ORANGE ====================
-def verifier_liste_eligibilite_orange(liste_adresses):
-    from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.common.keys import Keys
-    from selenium.webdriver.chrome.options import Options
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    import time
-    
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    
-    driver = webdriver.Chrome(options=options)
-    wait = WebDriverWait(driver, 12)
-    results = []
-    
-    try:
-        driver.get("https://boutique.orange.fr/internet/eligibilite")
-        time.sleep(3)
-        
-        # Accepter cookies si présent
-        try:
-            btn_cookie = wait.until(EC.element_to_be_clickable((By.ID, "didomi-notice-agree-button")))
-            btn_cookie.click()
-            time.sleep(1)
-        except:
-            pass
-        
-        # Vérification en boucle
-        for adresse in liste_adresses:
-            try:
-                champ = wait.until(EC.presence_of_element_located((By.NAME, "elig_address")))
-                champ.clear()
-                champ.send_keys(adresse)
-                time.sleep(1)
-                champ.send_keys(Keys.RETURN)
-                
-                resultat_elem = wait.until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.eligibility-result"))
-                )
-                texte_resultat = resultat_elem.text.strip()
-                
-                results.append((adresse, texte_resultat))
-                
-                # Retour page accueil
-                driver.get("https://boutique.orange.fr/internet/eligibilite")
-                time.sleep(2)
-            
-            except Exception as e:
-                print(f"Erreur pour {adresse} :", e)
-                results.append((adresse, "❌ Impossible de vérifier"))
-                driver.get("https://boutique.orange.fr/internet/eligibilite")
-                time.sleep(2)
-        
-        return results
-    
-    finally:
-        driver.quit()
+from scraping import nb_workers_par_defaut
+
+def afficher_stats_workers(stats_workers):
+    from pipeline import taux_dedoublonnage
+
+    nb_lignes, nb_verifiees, taux = taux_dedoublonnage(stats_workers)
+    if nb_lignes:
+        st.caption(f"🧹 Dédoublonnage : {nb_lignes} lignes -> {nb_verifiees} adresses distinctes vérifiées "
+                   f"({taux:.0%} de doublons évités)")
+    nb_reprises = sum(s["deja_verifiees"] for s in stats_workers if s.get("fournisseur") == "reprise")
+    if nb_reprises:
+        st.info(f"♻️ Reprise d'une vérification interrompue : {nb_reprises} adresse(s) "
+                "déjà vérifiée(s) n'ont pas été relancées.")
+    with st.expander("⚙️ Débit par session / backend"):
+        st.dataframe(pd.DataFrame(stats_workers))
+
+# ==================== EXPORT DES RÉSULTATS ====================
+def afficher_telechargement(df_resultats, cle, exports):
+    """
+    Fichier construit en mémoire pour cette session, dans le format choisi.
+    `exports` garde les fichiers déjà construits pour cette vérification : un
+    rerun (changement de format, rapport PDF...) ne reconstruit rien.
+    """
+    from export_resultats import exporter, formats_disponibles
+
+    format_export = st.radio("Format d'export", formats_disponibles(len(df_resultats)), horizontal=True,
+                             key=f"format_export_{cle}")
+    if format_export not in exports:
+        exports[format_export] = exporter(df_resultats, format_export)
+    contenu, extension, mime = exports[format_export]
+    st.download_button(f"⬇️ Télécharger les résultats {format_export}", contenu, f"eligibilite.{extension}",
+                       mime=mime, key=f"telecharger_{cle}")
 
 # ==================== ANALYSE DES RÉSULTATS ====================
 def analyser_resultats(df):
-    df['Éligible ?'] = df['Statut éligibilité'].apply(
-        lambda x: "Éligible" if "éligible" in x.lower() else "Non éligible"
-    )
-    stats = df['Éligible ?'].value_counts().reset_index()
-    stats.columns = ["Statut", "Nombre"]
+    import plotly.express as px
+    from classification import classifier_statuts, statistiques
+
+    classes = classifier_statuts(df['Statut éligibilité'])
+    df['Éligible ?'] = classes['Éligible ?']
+    df['Technologie'] = classes['Technologie']
+    stats = statistiques(df)
     
     fig = px.pie(stats, values='Nombre', names='Statut', 
                  color='Statut',
-                 color_discrete_map={"Éligible":"green", "Non éligible":"red"},
+                 color_discrete_map={"Éligible":"green", "Non éligible":"red", "Indéterminé":"grey"},
                  title="Répartition des adresses éligibles / non éligibles")
     return df, stats, fig
 
-# ==================== EXPORT PDF PRO ====================
-import tempfile, os
-pio.kaleido.scope.default_format = "png"
-
-
-def exporter_pdf(df, fig_pie, nom_pdf="rapport_eligibilite.pdf", auteur="Entreprise XYZ", logo_path="logo_orange.png"):
-    temp_dir = tempfile.mkdtemp()
-    graph_path = os.path.join(temp_dir, "graph.png")
-
-    # ✅ Essayer de sauver le graphique
-    try:
-        fig_pie.write_image(graph_path, format="png")
-    except Exception as e:
-        print("Erreur en sauvegardant le graphique :", e)
-        graph_path = None
-    
-    total = len(df)
-    nb_eligibles = len(df[df['Éligible ?']=="Éligible"])
-    nb_non = total - nb_eligibles
-    date_rapport = datetime.now().strftime("%d/%m/%Y %H:%M")
-
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-
-    # ✅ PAGE 1
-    pdf.add_page()
-
-    # ✅ Logo (si disponible)
-    if os.path.exists(logo_path):
-        pdf.image(logo_path, x=10, y=8, w=30)
-
-    pdf.set_font("Arial", "B", 18)
-    pdf.cell(0, 15, "Rapport d'éligibilité FTTH/FTTO", ln=True, align="C")
-    pdf.ln(5)
-
-    pdf.set_font("Arial", "I", 10)
-    pdf.cell(0, 10, f"Généré par : {auteur}", ln=True, align="R")
-    pdf.cell(0, 10, f"Date du rapport : {date_rapport}", ln=True, align="R")
-    pdf.ln(10)
-
-    pdf.set_font("Arial", "", 12)
-    pdf.multi_cell(0, 10, f"""
-✅ Nombre total d'adresses vérifiées : {total}
-✅ Nombre d'adresses éligibles : {nb_eligibles}
-❌ Nombre d'adresses non éligibles : {nb_non}
-""")
-
-    pdf.ln(10)
-    if graph_path:
-        pdf.cell(0, 10, "Graphique de répartition :", ln=True)
-        pdf.image(graph_path, x=30, w=150)
+# ==================== RÉSULTATS DE LA DERNIÈRE VÉRIFICATION ====================
+def memoriser_verification(mode, df_resultats, stats, fig_pie, stats_workers, detail_correction=None, message=None):
+    """Résultats conservés dans la session, réaffichés à chaque rerun jusqu'à la vérification suivante."""
+    st.session_state.verification = {"mode": mode, "df": df_resultats, "stats": stats, "fig": fig_pie,
+                                     "stats_workers": stats_workers, "detail_correction": detail_correction,
+                                     "message": message, "exports": {}}
+    # Un rapport en cours concerne la vérification précédente
+    st.session_state.pop("rapport_pdf", None)
+
+def afficher_verification(verification):
+    df_resultats, fig_pie, cle = verification["df"], verification["fig"], verification["mode"]
+    if verification["message"]:
+        st.write(verification["message"])
+    if verification["detail_correction"] is not None:
+        afficher_stats_correction(verification["detail_correction"])
+    st.dataframe(df_resultats)
+    afficher_stats_workers(verification["stats_workers"])
+
+    # ✅ Analyse Dashboard
+    st.subheader("📊 Dashboard Éligibilité")
+    st.write(f"**Total d’adresses vérifiées : {len(df_resultats)}**")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("### Statistiques")
+        st.dataframe(verification["stats"])
+    with col2:
+        st.write("### Graphique de répartition")
+        st.plotly_chart(fig_pie, use_container_width=True)
+
+    # ✅ Export Excel / CSV / Parquet
+    afficher_telechargement(df_resultats, cle, verification["exports"])
+
+    # ✅ Export PDF
+    afficher_rapport_pdf(df_resultats, fig_pie, cle)
+
+def afficher_rapport_pdf(df_resultats, fig_pie, cle):
+    """Rapport généré dans un thread d'arrière-plan ; seul son statut se réactualise jusqu'à ce qu'il soit prêt."""
+    resume_pdf = st.checkbox("Rapport PDF : synthèse uniquement (sans le détail ligne à ligne)",
+                             value=len(df_resultats) > config.LIGNES_PAR_SECTION_PDF, key=f"resume_pdf_{cle}")
+    if st.button("📄 Générer un rapport PDF professionnel", key=f"generer_pdf_{cle}"):
+        from rapport_pdf import soumettre_rapport
+        st.session_state.rapport_pdf = soumettre_rapport(df_resultats, fig_pie, auteur="Ton Entreprise",
+                                                         logo_path="logo_orange.png", resume_seul=resume_pdf)
+    rapport = st.session_state.get("rapport_pdf")
+    if rapport is None:
+        return
+    if not rapport.done():
+        suivre_rapport_pdf()
+    elif rapport.exception() is not None:
+        st.error(f"Échec de la génération du rapport PDF : {rapport.exception()}")
     else:
-        pdf.cell(0, 10, "⚠️ Graphique non disponible (problème de génération).", ln=True)
-
-    # ✅ PAGE 2 (détails)
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "Détail des résultats", ln=True)
-    pdf.ln(5)
-
-    pdf.set_font("Arial", "B", 10)
-    pdf.cell(60, 8, "Adresse saisie", 1)
-    pdf.cell(60, 8, "Adresse corrigée", 1)
-    pdf.cell(70, 8, "Statut", 1)
-    pdf.ln(8)
-
-    pdf.set_font("Arial", "", 9)
-    for _, row in df.iterrows():
-        pdf.cell(60, 8, row['Adresse saisie'][:35], 1)
-        pdf.cell(60, 8, row['Adresse corrigée'][:35], 1)
-        pdf.cell(70, 8, row['Statut éligibilité'][:40], 1)
-        pdf.ln(8)
-
-    pdf.output(nom_pdf)
-    return nom_pdf
+        st.download_button("⬇️ Télécharger le rapport PDF", rapport.result(), "rapport_eligibilite.pdf",
+                           mime="application/pdf", key=f"telecharger_pdf_{cle}")
 
+@st.fragment(run_every=config.INTERVALLE_SONDAGE_JOBS_S)
+def suivre_rapport_pdf():
+    """Seul ce fragment est réexécuté pendant la génération ; la page l'est une fois, quand le rapport est prêt."""
+    rapport = st.session_state.get("rapport_pdf")
+    if rapport is None or rapport.done():
+        st.rerun()
+    st.info("⏳ Rapport PDF en cours de génération...")
 
 # ==================== CHATBOT GUIDE ====================
 import random
@@ -243,7 +183,7 @@ faq_reponses = {
     "bonjour": "👋 Bonjour ! Je suis votre guide pour l'outil d'éligibilité FTTH/FTTO. Comment puis-je vous aider ?",
     "comment ça marche": "👉 Cet outil corrige vos adresses avec une IA NLP, vérifie l’éligibilité via Orange, et vous donne un rapport (Excel/PDF).",
     "importer": "📂 Vous pouvez importer un fichier CSV ou Excel contenant une colonne 'adresse'.",
-    "historique": "📜 L’onglet Historique affiche les 100 dernières vérifications enregistrées dans la base SQLite.",
+    "historique": "📜 L’onglet Historique affiche toutes les vérifications enregistrées dans la base SQLite, page par page, avec filtres par date, statut et adresse, ainsi qu'un tableau de bord par jour et par opérateur.",
     "pdf": "📄 Après vérification, vous pouvez générer un rapport PDF professionnel avec logo, auteur et date.",
     "excel": "📊 Oui, vous pouvez exporter les résultats au format Excel.",
     "aide": "✅ Vous pouvez me demander :\n- Comment corriger une adresse\n- Comment importer un fichier\n- Comment générer un PDF\n- Comment voir l’historique"
@@ -299,10 +239,37 @@ def afficher_chatbot():
 
 
 # ==================== INTERFACE STREAMLIT ====================
-menu = st.sidebar.radio("Navigation", ["Vérification", "Historique", "Guide Chatbot"])
+menu = st.sidebar.radio("Navigation", ["Vérification", "Jobs", "Historique", "Performance", "Guide Chatbot"])
+NB_SESSIONS_MAX = 16
+nb_sessions = st.sidebar.number_input("Sessions navigateur parallèles", min_value=1, max_value=NB_SESSIONS_MAX,
+                                      value=max(1, min(nb_workers_par_defaut(), NB_SESSIONS_MAX)))
+choix_fournisseurs = ["selenium", "http"]
+# ELIG_FOURNISSEUR hors des choix proposés (faute de frappe, casse) : premier choix
+index_fournisseur = choix_fournisseurs.index(config.FOURNISSEUR) if config.FOURNISSEUR in choix_fournisseurs else 0
+nom_fournisseur = st.sidebar.selectbox("Moteur de vérification", choix_fournisseurs,
+                                       index=index_fournisseur,
+                                       format_func=lambda n: {"selenium": "Navigateur (Selenium)", "http": "API HTTP (repli Selenium)"}[n])
+forcer_verification = st.sidebar.checkbox("Forcer la revérification (ignorer le cache)", value=False)
+
+def obtenir_verificateur():
+    from pipeline import construire_verificateur
+    return construire_verificateur(nom_fournisseur, nb_sessions, forcer=forcer_verification)
+
+def soumettre_et_afficher_job(liste_adresses):
+    job_id = soumettre_job(liste_adresses, nom_fournisseur, nb_sessions, forcer=forcer_verification)
+    st.success(f"✅ Job n°{job_id} soumis ({etat_job(job_id)['nb_total']} adresses). "
+               "Suivez sa progression dans l'onglet « Jobs » (worker : `python worker.py`).")
+
+_debut_page = time.perf_counter()
 
 if menu == "Vérification":
+    with chronometrer("import NLP / vérification"):
+        from pipeline import traiter_fichier, verifier_adresses
+        from ingestion import COLONNE_ADRESSE, adresses_nettoyees, lire_blocs_adresses, reblocs
+
     mode = st.radio("Mode d'entrée", ["Saisie manuelle", "Import CSV/Excel"])
+    en_arriere_plan = st.checkbox("Exécuter en arrière-plan (file de jobs)", value=False,
+                                  help="Conseillé pour les gros fichiers : le traitement continue même si l'onglet est fermé.")
     
     if mode == "Saisie manuelle":
         adresses_input = st.text_area("Entrez les adresses (une par ligne)")
@@ -312,110 +279,200 @@ if menu == "Vérification":
             else:
                 liste_adresses = [adr.strip() for adr in adresses_input.split("\n") if adr.strip()]
                 
-                # ✅ Correction IA NLP
-                adresses_corrigees = []
-                for adr in liste_adresses:
-                    adr_corrigee, score = corriger_adresse_ia(adr)
-                    adresses_corrigees.append(adr_corrigee)
-                
-                # ✅ Vérification Selenium
-                resultats_selenium = verifier_liste_eligibilite_orange(adresses_corrigees)
-                
-                # Fusion
-                final_results = []
-                for i, (adr_corr, res) in enumerate(resultats_selenium):
-                    final_results.append([liste_adresses[i], adr_corr, res])
-                
-                df_resultats = pd.DataFrame(final_results, columns=["Adresse saisie", "Adresse corrigée", "Statut éligibilité"])
-                st.dataframe(df_resultats)
-                
-                # ✅ Analyse Dashboard
+                if en_arriere_plan:
+                    soumettre_et_afficher_job(liste_adresses)
+                    st.stop()
+
+                # ✅ Correction IA NLP (pré-filtre lexical puis BERT en lot) + vérification
+                # Lot clôturé seulement après la sauvegarde : un échec entre les deux reste repris
+                lot_id = identifiant_lot(liste_adresses)
+                df_resultats, detail_correction, stats_workers = verifier_adresses(
+                    liste_adresses, obtenir_verificateur(), reprise=True, lot_id=lot_id, cloturer=False)
                 df_resultats, stats, fig_pie = analyser_resultats(df_resultats)
-                
-                st.subheader("📊 Dashboard Éligibilité")
-                st.write(f"**Total d’adresses vérifiées : {len(df_resultats)}**")
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write("### Statistiques")
-                    st.dataframe(stats)
-                with col2:
-                    st.write("### Graphique de répartition")
-                    st.plotly_chart(fig_pie, use_container_width=True)
-                
-                # ✅ Sauvegarde DB
-                sauvegarder_resultats(df_resultats)
-                
-                # ✅ Export Excel
-                df_resultats.to_excel("resultats_eligibilite.xlsx", index=False)
-                with open("resultats_eligibilite.xlsx", "rb") as f:
-                    st.download_button("⬇️ Télécharger les résultats Excel", f, "eligibilite.xlsx")
-                
-                # ✅ Export PDF
-                if st.button("📄 Générer un rapport PDF professionnel"):
-                    pdf_file = exporter_pdf(df_resultats, fig_pie, auteur="Ton Entreprise", logo_path="logo_orange.png")
-                    with open(pdf_file, "rb") as f:
-                        st.download_button("⬇️ Télécharger le rapport PDF", f, "rapport_eligibilite.pdf", mime="application/pdf")
+
+                # ✅ Sauvegarde DB (une seule fois, même si la liste est relancée après un crash)
+                if not lot_sauvegarde(lot_id):
+                    sauvegarder_lot(lot_id, df_resultats)
+                cloturer_lot(lot_id)
+                memoriser_verification("manuel", df_resultats, stats, fig_pie, stats_workers,
+                                       detail_correction=detail_correction)
 
     else:
         fichier = st.file_uploader("Chargez un fichier CSV/Excel contenant une colonne 'adresse'")
         if fichier:
             try:
-                df = pd.read_excel(fichier) if fichier.name.endswith("xlsx") else pd.read_csv(fichier, encoding='ISO-8859-1')
-                st.write("Aperçu du fichier :", df.head())
-                
-                if 'adresse' not in df.columns:
-                    st.error("Le fichier doit contenir une colonne nommée 'adresse'")
-                else:
-                    if st.button("Vérifier"):
-                        liste_adresses = df['adresse'].dropna().tolist()
-                        
-                        # Correction IA
-                        adresses_corrigees = [corriger_adresse_ia(adr)[0] for adr in liste_adresses]
-                        
-                        # Vérif Selenium
-                        resultats_selenium = verifier_liste_eligibilite_orange(adresses_corrigees)
-                        
-                        # Fusion
-                        final_results = []
-                        for i, (adr_corr, res) in enumerate(resultats_selenium):
-                            final_results.append([liste_adresses[i], adr_corr, res])
-                        
-                        df_resultats = pd.DataFrame(final_results, columns=["Adresse saisie", "Adresse corrigée", "Statut éligibilité"])
-                        st.dataframe(df_resultats)
-                        
-                        # Dashboard
-                        df_resultats, stats, fig_pie = analyser_resultats(df_resultats)
-                        
-                        st.subheader("📊 Dashboard Éligibilité")
-                        st.plotly_chart(fig_pie)
-                        
-                        sauvegarder_resultats(df_resultats)
-                        
-                        df_resultats.to_excel("resultats_eligibilite.xlsx", index=False)
-                        with open("resultats_eligibilite.xlsx", "rb") as f:
-                            st.download_button("⬇️ Télécharger les résultats Excel", f, "eligibilite.xlsx")
-            except UnicodeDecodeError:
-                st.error("Erreur de lecture du fichier CSV. Le fichier contient des caractères non compatibles avec UTF-8. Essayez un encodage comme 'Windows-1252' ou vérifiez le fichier.")
-                # Optional: Uncomment the following to enable encoding detection with chardet
-                """
-                fichier.seek(0)  # Reset file pointer
-                raw_data = fichier.read()
-                encoding = chardet.detect(raw_data)['encoding']
-                fichier.seek(0)  # Reset file pointer again
-                try:
-                    df = pd.read_csv(fichier, encoding=encoding)
-                    st.write(f"Encodage détecté : {encoding}")
-                    st.write("Aperçu du fichier :", df.head())
-                except Exception as e:
-                    st.error(f"Erreur lors de la lecture avec l'encodage détecté ({encoding}) : {str(e)}")
-                """
+                # Lecture en flux : seul le premier bloc sert à l'aperçu
+                apercu = next(lire_blocs_adresses(fichier, fichier.name, taille_bloc=5), pd.Series(dtype=object))
+                fichier.seek(0)
+                st.write("Aperçu du fichier :", apercu.to_frame(COLONNE_ADRESSE))
+
+                if st.button("Vérifier"):
+                    if en_arriere_plan:
+                        flux_adresses = reblocs(adresses_nettoyees(lire_blocs_adresses(fichier, fichier.name)))
+                        soumettre_et_afficher_job(adresse for bloc in flux_adresses for adresse in bloc)
+                        st.stop()
+
+                    # Correction IA + vérification + sauvegarde, bloc par bloc (même moteur que cli.py)
+                    progression = st.empty()
+                    blocs_resultats = []
+                    def sur_bloc(df_bloc, bilan):
+                        blocs_resultats.append(df_bloc[COLONNES_RESULTATS])
+                        progression.write(f"⏳ {bilan['lignes']} lignes lues et vérifiées ({bilan['lignes_par_s']} lignes/s)...")
+                    bilan = traiter_fichier(fichier, obtenir_verificateur(), nom_fichier=fichier.name, sur_bloc=sur_bloc)
+                    progression.empty()
+                    df_resultats = (pd.concat(blocs_resultats, ignore_index=True) if blocs_resultats
+                                    else pd.DataFrame(columns=COLONNES_RESULTATS))
+                    df_resultats, stats, fig_pie = analyser_resultats(df_resultats)
+                    memoriser_verification("fichier", df_resultats, stats, fig_pie, bilan["stats"],
+                                           message=f"✅ {bilan['lignes']} lignes vérifiées en {bilan['duree_s']}s")
+            except ValueError as e:
+                st.error(str(e))
+
+    # Résultats affichés hors du bouton « Vérifier » : un clic sur un widget
+    # d'export relance le script sans les effacer
+    verification = st.session_state.get("verification")
+    if verification is not None and verification["mode"] == ("manuel" if mode == "Saisie manuelle" else "fichier"):
+        afficher_verification(verification)
+
+elif menu == "Jobs":
+    st.subheader("🗂️ Jobs de vérification en arrière-plan")
+    df_jobs = lister_jobs()
+    if df_jobs.empty:
+        st.info("Aucun job pour le moment. Cochez « Exécuter en arrière-plan » dans l'onglet Vérification.")
+    else:
+        st.dataframe(df_jobs)
+        job_id = st.selectbox("Job", df_jobs["id"].tolist(),
+                              format_func=lambda i: f"n°{i} — {df_jobs.set_index('id').loc[i, 'statut']}")
+        job = etat_job(job_id)
+        st.progress(job["nb_traites"] / job["nb_total"] if job["nb_total"] else 1.0,
+                    text=f"{job['nb_traites']} / {job['nb_total']} adresses — {job['statut']}")
+        if job["message"]:
+            st.warning(job["message"])
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("⏹️ Annuler", disabled=job["statut"] not in (EN_ATTENTE, EN_COURS)):
+                annuler_job(job_id)
+                st.rerun()
+        with col2:
+            if st.button("▶️ Reprendre", disabled=job["statut"] not in (ANNULE, ERREUR)):
+                reprendre_job(job_id)
+                st.rerun()
+        with col3:
+            suivi_auto = st.checkbox("Actualisation automatique", value=job["statut"] in (EN_ATTENTE, EN_COURS))
+
+        # Résultats partiels, au fil de l'eau
+        st.dataframe(resultats_job(job_id))
+
+        if suivi_auto and job["statut"] in (EN_ATTENTE, EN_COURS):
+            time.sleep(config.INTERVALLE_SONDAGE_JOBS_S)
+            st.rerun()
 
 elif menu == "Historique":
     st.subheader("📜 Historique des vérifications")
-    df_hist = charger_historique()
-    st.dataframe(df_hist)
+
+    # Filtres appliqués côté SQL
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        periode = st.date_input("Période", value=(), key="hist_periode")
+    with col2:
+        statuts_choisis = st.multiselect("Statut", statuts_distincts(), key="hist_statuts")
+    with col3:
+        recherche = st.text_input("Adresse contient", key="hist_recherche")
+    taille_page = st.selectbox("Lignes par page", [50, 100, 500], index=1, key="hist_taille_page")
+
+    periode = list(periode) if isinstance(periode, (list, tuple)) else [periode]
+    filtres = dict(
+        date_debut=periode[0].isoformat() if len(periode) >= 1 else None,
+        date_fin=periode[-1].isoformat() if len(periode) >= 1 else None,
+        statuts=statuts_choisis or None,
+        recherche=recherche.strip() or None,
+    )
+
+    # Pagination keyset : pile des curseurs des pages vues, remise à zéro si les filtres changent
+    cle_filtres = repr((filtres, taille_page))
+    if st.session_state.get("hist_filtres") != cle_filtres:
+        st.session_state.hist_filtres = cle_filtres
+        st.session_state.hist_curseurs = [None]
+    curseurs = st.session_state.hist_curseurs
+
+    df_page, curseur_suivant = charger_page_historique(taille_page, curseurs[-1], **filtres)
+    stats_hist = compter_historique(**filtres)
+
+    st.write(f"**{int(stats_hist['Nombre'].sum())} vérifications** — page {len(curseurs)}")
+    st.dataframe(stats_hist)
+    st.dataframe(df_page)
+
+    col_prec, col_suiv = st.columns(2)
+    with col_prec:
+        st.button("⬅️ Page précédente", disabled=len(curseurs) == 1, on_click=curseurs.pop)
+    with col_suiv:
+        st.button("Page suivante ➡️", disabled=curseur_suivant is None,
+                  on_click=curseurs.append, args=(curseur_suivant,))
+
+    # Tableau de bord lu dans les agrégats : instantané quelle que soit la taille de l'historique
+    st.write("### 📊 Tableau de bord")
+    evolution = evolution_historique(filtres["date_debut"], filtres["date_fin"], filtres["statuts"])
+    if evolution.empty:
+        st.caption("Aucune vérification sur la période.")
+    else:
+        from classification import classifier_statuts
+
+        evolution["Éligible ?"] = classifier_statuts(evolution["Statut"])["Éligible ?"]
+        st.bar_chart(evolution.pivot_table(index="Jour", columns="Éligible ?", values="Nombre",
+                                           aggfunc="sum", observed=True, fill_value=0))
+    couverture = couverture_agregee(filtres["date_debut"], filtres["date_fin"])
+    if not couverture.empty:
+        st.write("Éligibilité par gouvernorat, opérateur et technologie")
+        st.dataframe(couverture, hide_index=True)
+
+elif menu == "Performance":
+    from mesures import charger_mesures, enregistrer_mesures, tableau_durees, texte_prometheus, COMPTEUR
+
+    st.subheader("⏱️ Performance par étape")
+    if not config.MESURES_ACTIVES:
+        st.info("Mesures désactivées (ELIG_MESURES=0) : seules les mesures déjà enregistrées sont affichées.")
+    periodes = {"Dernière heure": timedelta(hours=1), "24 heures": timedelta(days=1),
+                "7 jours": timedelta(days=7), "Tout": None}
+    periode = st.selectbox("Période", list(periodes), index=1)
+    depuis = datetime.now() - periodes[periode] if periodes[periode] else None
+
+    # Les mesures encore en mémoire dans ce process rejoignent la base avant lecture
+    enregistrer_mesures()
+    df_mesures = charger_mesures(depuis)
+    if df_mesures.empty:
+        st.info("Aucune mesure sur la période. Lancez une vérification pour en collecter.")
+    else:
+        df_durees = tableau_durees(df_mesures)
+        st.write("### Durées")
+        st.dataframe(df_durees, hide_index=True)
+        st.bar_chart(df_durees.groupby("Étape")["Total (s)"].sum())
+
+        compteurs = df_mesures[df_mesures["type"] == COMPTEUR]
+        erreurs = compteurs[compteurs["nom"] == "erreurs"]
+        st.write("### Erreurs par type")
+        if erreurs.empty:
+            st.caption("Aucune erreur sur la période.")
+        else:
+            st.dataframe(pd.DataFrame({"Étape": [e.get("etape") for e in erreurs["etiquettes"]],
+                                       "Exception": [e.get("type") for e in erreurs["etiquettes"]],
+                                       "Nombre": erreurs["somme"].astype(int)}), hide_index=True)
+        st.write("### Compteurs")
+        autres = compteurs[compteurs["nom"] != "erreurs"]
+        st.dataframe(pd.DataFrame({"Compteur": autres["nom"],
+                                   "Détail": [", ".join(f"{c}={v}" for c, v in e.items()) for e in autres["etiquettes"]],
+                                   "Valeur": autres["somme"].astype(int)}), hide_index=True)
+
+        st.download_button("⬇️ Export Prometheus", texte_prometheus(df_mesures), "mesures_eligibilite.prom",
+                           mime="text/plain")
 
 elif menu == "Guide Chatbot":
     afficher_chatbot()
 
+# ==================== TEMPS DU RERUN ====================
+temps_chargement[f"page {menu}"] = time.perf_counter() - _debut_page
+temps_chargement["total"] = time.perf_counter() - _debut_rerun
+with st.sidebar.expander("⏱️ Temps de ce rerun"):
+    st.dataframe(pd.DataFrame({"Étape": list(temps_chargement),
+                               "Secondes": [round(v, 3) for v in temps_chargement.values()]}),
+                 hide_index=True)
@@ -0,0 +1,151 @@
+"""
+Export des résultats de vérification (Excel, CSV, Parquet).
+
+Les fichiers sont construits en mémoire pour chaque session : plus de fichier
+partagé dans le répertoire de travail, relu ensuite pour le téléchargement.
+L'Excel est écrit ligne à ligne par xlsxwriter en mode constant_memory.
+Pour les traitements sans interface, EcrivainResultats écrit directement
+dans un fichier, bloc par bloc.
+"""
+import importlib.util
+import io
+import os
+
+from mesures import chronometre
+
+# Limite d'une feuille Excel, en-tête compris
+NB_LIGNES_MAX_EXCEL = 1_048_576
+
+
+def _cellule(valeur):
+    if valeur is None or (isinstance(valeur, float) and valeur != valeur):
+        return ""
+    return valeur if isinstance(valeur, (int, float)) else str(valeur)
+
+
+def exporter_excel(df, nom_feuille="Résultats"):
+    """Classeur .xlsx en octets. Nécessite xlsxwriter (sinon : writer par défaut de pandas)."""
+    if len(df) + 1 > NB_LIGNES_MAX_EXCEL:
+        raise ValueError(f"{len(df)} lignes : au-delà de la limite Excel, utilisez l'export CSV ou Parquet")
+    tampon = io.BytesIO()
+    try:
+        import xlsxwriter
+    except ImportError:
+        df.to_excel(tampon, index=False, sheet_name=nom_feuille)
+        return tampon.getvalue()
+
+    # constant_memory : chaque ligne est vidée sur disque dès que la suivante commence
+    classeur = xlsxwriter.Workbook(tampon, {"constant_memory": True, "in_memory": False})
+    feuille = classeur.add_worksheet(nom_feuille[:31])
+    gras = classeur.add_format({"bold": True})
+    feuille.write_row(0, 0, [str(c) for c in df.columns], gras)
+    for i, ligne in enumerate(df.itertuples(index=False, name=None), start=1):
+        feuille.write_row(i, 0, [_cellule(v) for v in ligne])
+    feuille.set_column(0, max(len(df.columns) - 1, 0), 40)
+    classeur.close()
+    return tampon.getvalue()
+
+
+def exporter_csv(df):
+    """CSV UTF-8 avec BOM (ouvert correctement par Excel, accents compris)."""
+    return df.to_csv(index=False).encode("utf-8-sig")
+
+
+def parquet_disponible():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def exporter_parquet(df):
+    tampon = io.BytesIO()
+    df.to_parquet(tampon, index=False)
+    return tampon.getvalue()
+
+
+# format -> (fonction, extension, type MIME)
+FORMATS_EXPORT = {
+    "Excel": (exporter_excel, "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": (exporter_csv, "csv", "text/csv"),
+    "Parquet": (exporter_parquet, "parquet", "application/vnd.apache.parquet"),
+}
+
+
+def formats_disponibles(nb_lignes):
+    """Formats proposés pour un résultat de `nb_lignes` lignes."""
+    formats = []
+    if nb_lignes + 1 <= NB_LIGNES_MAX_EXCEL:
+        formats.append("Excel")
+    formats.append("CSV")
+    if parquet_disponible():
+        formats.append("Parquet")
+    return formats
+
+
+def exporter(df, format_export):
+    """Retourne (octets, extension, type MIME) du fichier d'export."""
+    fonction, extension, mime = FORMATS_EXPORT[format_export]
+    with chronometre("export", format=format_export):
+        return fonction(df), extension, mime
+
+
+# ==================== ÉCRITURE EN FLUX ====================
+class EcrivainResultats:
+    """
+    Fichier de résultats écrit bloc par bloc (traitements sans interface) :
+    seule la ligne en cours est en mémoire, quelle que soit la taille totale.
+    Format déduit de l'extension : .csv, .parquet ou .xlsx.
+    """
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.extension = os.path.splitext(chemin)[1].lower().lstrip(".")
+        if self.extension not in ("csv", "parquet", "xlsx"):
+            raise ValueError(f"Format de sortie non pris en charge : {chemin} (.csv, .parquet ou .xlsx)")
+        self.nb_lignes = 0
+        self._fichier = self._parquet = self._classeur = self._feuille = None
+
+    def ecrire(self, df):
+        if self.extension == "csv":
+            if self._fichier is None:
+                self._fichier = open(self.chemin, "w", encoding="utf-8-sig", newline="")
+            df.to_csv(self._fichier, index=False, header=self.nb_lignes == 0)
+        elif self.extension == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            # Catégories -> texte : même schéma pour tous les blocs
+            table = pa.Table.from_pandas(df.astype(str), preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.chemin, table.schema)
+            self._parquet.write_table(table)
+        else:
+            self._ecrire_excel(df)
+        self.nb_lignes += len(df)
+
+    def _ecrire_excel(self, df):
+        import xlsxwriter
+
+        if self.nb_lignes + len(df) + 1 > NB_LIGNES_MAX_EXCEL:
+            raise ValueError("Au-delà de la limite Excel : utilisez une sortie .csv ou .parquet")
+        if self._classeur is None:
+            self._classeur = xlsxwriter.Workbook(self.chemin, {"constant_memory": True})
+            self._feuille = self._classeur.add_worksheet("Résultats")
+            self._feuille.write_row(0, 0, [str(c) for c in df.columns], self._classeur.add_format({"bold": True}))
+            self._feuille.set_column(0, max(len(df.columns) - 1, 0), 40)
+        for i, ligne in enumerate(df.itertuples(index=False, name=None), start=self.nb_lignes + 1):
+            self._feuille.write_row(i, 0, [_cellule(v) for v in ligne])
+
+    def fermer(self):
+        if self._fichier is not None:
+            self._fichier.close()
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._classeur is not None:
+            self._classeur.close()
+        self._fichier = self._parquet = self._classeur = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+        return False
@@ -0,0 +1,78 @@
+import config
+from scraping import MESSAGE_ECHEC, verifier_avec_pool
+
+
+# ==================== INTERFACE FOURNISSEUR ====================
+class FournisseurEligibilite:
+    """
+    Interface commune des backends de vérification d'éligibilité.
+    verifier(liste_adresses) retourne (resultats, stats) avec
+    resultats = [(adresse, statut), ...] dans l'ordre d'entrée
+    et stats = liste de dicts (une ligne par worker / backend).
+    Le rappel optionnel sur_resultat(index, adresse, statut) reçoit chaque
+    résultat définitif dès qu'il est connu (index dans liste_adresses).
+    """
+
+    nom = "abstrait"
+
+    def verifier(self, liste_adresses, sur_resultat=None):
+        raise NotImplementedError
+
+
+class FournisseurSelenium(FournisseurEligibilite):
+    """Vérification via le site Orange piloté par un pool de Chrome headless."""
+
+    nom = "selenium"
+
+    def __init__(self, nb_workers=None):
+        self.nb_workers = nb_workers
+
+    def verifier(self, liste_adresses, sur_resultat=None):
+        resultats, stats_workers = verifier_avec_pool(liste_adresses, self.nb_workers, sur_resultat=sur_resultat)
+        for stats in stats_workers:
+            stats["fournisseur"] = self.nom
+        return resultats, stats_workers
+
+
+class FournisseurAvecRepli(FournisseurEligibilite):
+    """
+    Interroge d'abord le fournisseur principal, puis renvoie uniquement
+    les adresses en échec vers le fournisseur de repli.
+    """
+
+    def __init__(self, principal, repli):
+        self.principal = principal
+        self.repli = repli
+        self.nom = f"{principal.nom}+{repli.nom}"
+
+    def verifier(self, liste_adresses, sur_resultat=None):
+        # Les échecs du principal ne sont pas définitifs : seul le repli les signale
+        def rappel_principal(i, adresse, statut):
+            if statut != MESSAGE_ECHEC:
+                sur_resultat(i, adresse, statut)
+
+        def rappel_repli(j, adresse, statut):
+            sur_resultat(indices_echec[j], adresse, statut)
+
+        avec_rappel = sur_resultat is not None
+        resultats, stats = self.principal.verifier(liste_adresses, rappel_principal if avec_rappel else None)
+        indices_echec = [i for i, (_, statut) in enumerate(resultats) if statut == MESSAGE_ECHEC]
+        if indices_echec:
+            resultats_repli, stats_repli = self.repli.verifier([liste_adresses[i] for i in indices_echec],
+                                                               rappel_repli if avec_rappel else None)
+            for i, resultat in zip(indices_echec, resultats_repli):
+                resultats[i] = resultat
+            stats = stats + stats_repli
+        return resultats, stats
+
+
+# ==================== FABRIQUE ====================
+def obtenir_fournisseur(nom=None, nb_workers=None):
+    """Construit le fournisseur configuré ("selenium" ou "http")."""
+    nom = nom or config.FOURNISSEUR
+    if nom == "selenium":
+        return FournisseurSelenium(nb_workers)
+    if nom == "http":
+        from http_orange import FournisseurHTTPOrange
+        return FournisseurAvecRepli(FournisseurHTTPOrange(), FournisseurSelenium(nb_workers))
+    raise ValueError(f"Fournisseur inconnu : {nom}")
@@ -0,0 +1,119 @@
+import asyncio
+import random
+import time
+
+import config
+from fournisseurs import FournisseurEligibilite
+from mesures import erreur, incrementer, observer
+from scraping import MESSAGE_ECHEC
+
+# Codes HTTP pour lesquels une nouvelle tentative a un sens
+CODES_A_RETENTER = {429, 500, 502, 503, 504}
+
+
+class ErreurTransitoire(Exception):
+    pass
+
+
+def texte_statut(reponse):
+    """
+    Traduit la réponse JSON d'éligibilité en texte de statut,
+    au même format que celui lu sur la page par Selenium.
+    """
+    if reponse.get("message"):
+        return str(reponse["message"]).strip()
+    technologie = reponse.get("technologie") or "FTTH"
+    if reponse.get("eligible"):
+        return f"Éligible à la fibre ({technologie})"
+    return "Non éligible à la fibre"
+
+
+# ==================== BACKEND HTTP ====================
+class FournisseurHTTPOrange(FournisseurEligibilite):
+    """
+    Vérification directe des endpoints d'éligibilité, sans navigateur.
+    Un seul client aiohttp (connexions keep-alive poolées) est partagé par toutes
+    les requêtes ; la concurrence est bornée par un sémaphore et chaque appel est
+    retenté avec un backoff exponentiel sur les erreurs transitoires.
+
+    Pour tester hors ligne : lancer `python stub_orange.py` et pointer
+    ELIG_URL_API_ADRESSES / ELIG_URL_API_ELIGIBILITE sur le serveur local.
+    """
+
+    nom = "http"
+
+    def __init__(self, url_adresses=None, url_eligibilite=None, concurrence=None,
+                 timeout_s=None, nb_essais=None, backoff_s=None):
+        self.url_adresses = url_adresses or config.URL_API_ADRESSES
+        self.url_eligibilite = url_eligibilite or config.URL_API_ELIGIBILITE
+        self.concurrence = concurrence or config.HTTP_CONCURRENCE
+        self.timeout_s = timeout_s or config.HTTP_TIMEOUT_S
+        self.nb_essais = nb_essais or config.HTTP_NB_ESSAIS
+        self.backoff_s = backoff_s or config.HTTP_BACKOFF_S
+
+    async def _get_json(self, session, url, params):
+        import aiohttp
+
+        for essai in range(self.nb_essais):
+            try:
+                async with session.get(url, params=params) as reponse:
+                    if reponse.status in CODES_A_RETENTER:
+                        raise ErreurTransitoire(f"HTTP {reponse.status}")
+                    reponse.raise_for_status()
+                    return await reponse.json(content_type=None)
+            except (ErreurTransitoire, aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if essai == self.nb_essais - 1:
+                    raise
+                # Backoff exponentiel avec gigue
+                await asyncio.sleep(self.backoff_s * (2 ** essai) * (0.5 + random.random()))
+
+    async def _verifier_adresse(self, session, semaphore, index, adresse, stats, sur_resultat):
+        resultat = await self._interroger(session, semaphore, adresse, stats)
+        if sur_resultat is not None:
+            sur_resultat(index, *resultat)
+        return resultat
+
+    async def _interroger(self, session, semaphore, adresse, stats):
+        async with semaphore:
+            debut = time.perf_counter()
+            resultat = "echec"
+            try:
+                candidats = await self._get_json(session, self.url_adresses, {"q": adresse})
+                if isinstance(candidats, dict):
+                    candidats = candidats.get("adresses", [])
+                if not candidats:
+                    stats["erreurs"] += 1
+                    incrementer("erreurs", etape="http", type="AdresseIntrouvable")
+                    return adresse, MESSAGE_ECHEC
+                reponse = await self._get_json(session, self.url_eligibilite, {"id": candidats[0]["id"]})
+                resultat = "succes"
+                return adresse, texte_statut(reponse)
+            except Exception as e:
+                erreur("http", e)
+                stats["erreurs"] += 1
+                return adresse, MESSAGE_ECHEC
+            finally:
+                observer("verification.adresse", time.perf_counter() - debut, fournisseur="http", resultat=resultat)
+
+    async def _verifier_tout(self, liste_adresses, stats, sur_resultat):
+        import aiohttp
+
+        semaphore = asyncio.Semaphore(self.concurrence)
+        connecteur = aiohttp.TCPConnector(limit=self.concurrence, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=self.timeout_s)
+        async with aiohttp.ClientSession(connector=connecteur, timeout=timeout) as session:
+            taches = [self._verifier_adresse(session, semaphore, i, adresse, stats, sur_resultat)
+                      for i, adresse in enumerate(liste_adresses)]
+            return await asyncio.gather(*taches)
+
+    def verifier(self, liste_adresses, sur_resultat=None):
+        liste_adresses = list(liste_adresses)
+        stats = {"fournisseur": self.nom, "adresses": len(liste_adresses), "erreurs": 0}
+        if not liste_adresses:
+            return [], []
+        debut = time.perf_counter()
+        resultats = list(asyncio.run(self._verifier_tout(liste_adresses, stats, sur_resultat)))
+        duree = time.perf_counter() - debut
+        stats["duree_s"] = round(duree, 2)
+        stats["adresses_par_s"] = round(len(liste_adresses) / duree, 3) if duree > 0 else 0.0
+        return resultats, [stats]
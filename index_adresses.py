@@ -0,0 +1,245 @@
+"""
+Index vectoriel persistant pour une grande base d'adresses de référence.
+
+Structure IVF (inverted file) : les vecteurs normalisés sont répartis en
+`nb_listes` groupes par k-means sphérique ; une recherche ne compare la requête
+qu'aux vecteurs des `nprobe` groupes dont le centroïde est le plus proche.
+
+Sur disque (un dossier) :
+    manifeste.json            modèle, dimension, dtype, segments
+    centroides.npy            centroïdes (float32)
+    segment_XXX.npy           embeddings normalisés (float16/float32, lus en mmap)
+    segment_XXX_listes.npy    numéro de groupe de chaque vecteur
+    segment_XXX.txt           adresses, une par ligne
+
+Chaque ajout crée un nouveau segment : rien n'est réencodé ni réécrit.
+
+    python index_adresses.py construire adresses.txt --dossier index_adresses
+    python index_adresses.py ajouter nouvelles.txt --dossier index_adresses
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+import config
+
+VERSION_INDEX = 1
+
+
+def _normaliser(vecteurs):
+    vecteurs = np.asarray(vecteurs, dtype=np.float32)
+    normes = np.linalg.norm(vecteurs, axis=1, keepdims=True)
+    return vecteurs / np.maximum(normes, 1e-12)
+
+
+def _groupes_proches(vecteurs, centroides, taille_bloc=8192):
+    """Numéro du centroïde le plus proche pour chaque vecteur (par blocs)."""
+    groupes = np.empty(len(vecteurs), dtype=np.int32)
+    for debut in range(0, len(vecteurs), taille_bloc):
+        bloc = np.asarray(vecteurs[debut:debut + taille_bloc], dtype=np.float32)
+        groupes[debut:debut + taille_bloc] = (bloc @ centroides.T).argmax(axis=1)
+    return groupes
+
+
+def kmeans_spherique(vecteurs, nb_listes, nb_iterations=10, taille_echantillon=None, graine=0):
+    """k-means sur vecteurs normalisés (similarité cosinus), entraîné sur un échantillon."""
+    rng = np.random.default_rng(graine)
+    taille_echantillon = taille_echantillon or max(nb_listes * 64, 10000)
+    if len(vecteurs) > taille_echantillon:
+        echantillon = np.asarray(vecteurs[np.sort(rng.choice(len(vecteurs), taille_echantillon, replace=False))],
+                                 dtype=np.float32)
+    else:
+        echantillon = np.asarray(vecteurs, dtype=np.float32)
+
+    centroides = echantillon[rng.choice(len(echantillon), nb_listes, replace=False)].copy()
+    for _ in range(nb_iterations):
+        groupes = _groupes_proches(echantillon, centroides)
+        sommes = np.zeros_like(centroides)
+        np.add.at(sommes, groupes, echantillon)
+        vides = np.bincount(groupes, minlength=nb_listes) == 0
+        # Groupe vide : on le réensemence sur un point au hasard
+        sommes[vides] = echantillon[rng.choice(len(echantillon), int(vides.sum()))]
+        centroides = _normaliser(sommes)
+    return centroides
+
+
+def encoder(modele, adresses, taille_lot=None):
+    return modele.encode(list(adresses), batch_size=taille_lot or config.TAILLE_LOT_NLP,
+                         convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+
+
+# ==================== INDEX ====================
+class IndexAdresses:
+
+    def __init__(self, dossier, manifeste, centroides, segments):
+        self.dossier = dossier
+        self.manifeste = manifeste
+        self.centroides = centroides
+        # Chaque segment : dict(embeddings, listes, adresses, ordre, bornes, decalage)
+        self.segments = segments
+
+    def __len__(self):
+        return sum(len(seg["adresses"]) for seg in self.segments)
+
+    @property
+    def nb_listes(self):
+        return len(self.centroides)
+
+    # ---------- persistance ----------
+    @staticmethod
+    def _chemin(dossier, nom):
+        return os.path.join(dossier, nom)
+
+    @classmethod
+    def _charger_segment(cls, dossier, nom, nb_listes, decalage):
+        embeddings = np.load(cls._chemin(dossier, f"{nom}.npy"), mmap_mode="r")
+        listes = np.load(cls._chemin(dossier, f"{nom}_listes.npy"))
+        with open(cls._chemin(dossier, f"{nom}.txt"), encoding="utf-8") as f:
+            adresses = f.read().split("\n")[:len(listes)]
+        # Listes inversées : ids triés par groupe + bornes de chaque groupe
+        ordre = np.argsort(listes, kind="stable").astype(np.int64)
+        bornes = np.searchsorted(listes[ordre], np.arange(nb_listes + 1))
+        return {"nom": nom, "embeddings": embeddings, "listes": listes, "adresses": adresses,
+                "ordre": ordre, "bornes": bornes, "decalage": decalage}
+
+    @classmethod
+    def charger(cls, dossier):
+        """Recharge un index sans rien réencoder (embeddings en mémoire mappée)."""
+        with open(cls._chemin(dossier, "manifeste.json"), encoding="utf-8") as f:
+            manifeste = json.load(f)
+        if manifeste.get("version") != VERSION_INDEX:
+            raise ValueError(f"Version d'index incompatible : {manifeste.get('version')}")
+        centroides = np.load(cls._chemin(dossier, "centroides.npy"))
+        segments = []
+        decalage = 0
+        for nom in manifeste["segments"]:
+            segment = cls._charger_segment(dossier, nom, len(centroides), decalage)
+            segments.append(segment)
+            decalage += len(segment["adresses"])
+        return cls(dossier, manifeste, centroides, segments)
+
+    def _ecrire_segment(self, adresses, embeddings):
+        nom = f"segment_{len(self.segments):03d}"
+        listes = _groupes_proches(embeddings, self.centroides)
+        np.save(self._chemin(self.dossier, f"{nom}.npy"), embeddings.astype(self.manifeste["dtype"]))
+        np.save(self._chemin(self.dossier, f"{nom}_listes.npy"), listes)
+        with open(self._chemin(self.dossier, f"{nom}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(a.replace("\n", " ") for a in adresses))
+        self.manifeste["segments"].append(nom)
+        self.segments.append(self._charger_segment(self.dossier, nom, self.nb_listes, len(self)))
+        with open(self._chemin(self.dossier, "manifeste.json"), "w", encoding="utf-8") as f:
+            json.dump(self.manifeste, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def construire(cls, adresses, modele, dossier, nom_modele=None, nb_listes=None, dtype="float16"):
+        """Encode la base, entraîne les centroïdes et écrit l'index dans `dossier`."""
+        adresses = list(adresses)
+        os.makedirs(dossier, exist_ok=True)
+        embeddings = encoder(modele, adresses)
+        nb_listes = nb_listes or int(np.clip(4 * np.sqrt(len(adresses)), 1, 65536))
+        nb_listes = min(nb_listes, len(adresses))
+        centroides = kmeans_spherique(embeddings, nb_listes)
+        np.save(cls._chemin(dossier, "centroides.npy"), centroides)
+
+        manifeste = {"version": VERSION_INDEX, "nom_modele": nom_modele or config.NOM_MODELE_NLP,
+                     "dimension": int(embeddings.shape[1]), "dtype": dtype, "segments": []}
+        index = cls(dossier, manifeste, centroides, [])
+        index._ecrire_segment(adresses, embeddings)
+        return index
+
+    def ajouter(self, adresses, modele=None, embeddings=None):
+        """Ajout incrémental : nouveau segment rattaché aux centroïdes existants."""
+        adresses = list(adresses)
+        if not adresses:
+            return
+        if embeddings is None:
+            embeddings = encoder(modele, adresses)
+        self._ecrire_segment(adresses, _normaliser(embeddings))
+
+    # ---------- recherche ----------
+    def adresse(self, id_global):
+        for segment in self.segments:
+            if id_global < segment["decalage"] + len(segment["adresses"]):
+                return segment["adresses"][id_global - segment["decalage"]]
+        raise IndexError(id_global)
+
+    def rechercher(self, requetes, k=None, nprobe=None):
+        """
+        Top-k voisins (similarité cosinus) de chaque requête (embeddings normalisés).
+        Retourne (ids, scores) de forme (n, k) ; -1 / -inf si moins de k candidats.
+        """
+        k = k or config.TOP_K_CANDIDATS
+        nprobe = min(nprobe or config.NPROBE_INDEX, self.nb_listes)
+        requetes = np.asarray(requetes, dtype=np.float32)
+        ids = np.full((len(requetes), k), -1, dtype=np.int64)
+        scores = np.full((len(requetes), k), -np.inf, dtype=np.float32)
+
+        # Groupes à sonder pour chaque requête
+        sim_centroides = requetes @ self.centroides.T
+        if nprobe < self.nb_listes:
+            sondes = np.argpartition(-sim_centroides, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            sondes = np.tile(np.arange(self.nb_listes), (len(requetes), 1))
+
+        for i, requete in enumerate(requetes):
+            candidats_ids = []
+            candidats_scores = []
+            for segment in self.segments:
+                locaux = np.concatenate([segment["ordre"][segment["bornes"][g]:segment["bornes"][g + 1]]
+                                         for g in sondes[i]])
+                if len(locaux) == 0:
+                    continue
+                locaux.sort()  # accès séquentiel dans le fichier mappé
+                candidats_scores.append(np.asarray(segment["embeddings"][locaux], dtype=np.float32) @ requete)
+                candidats_ids.append(locaux + segment["decalage"])
+            if not candidats_ids:
+                continue
+            candidats_ids = np.concatenate(candidats_ids)
+            candidats_scores = np.concatenate(candidats_scores)
+            n = min(k, len(candidats_ids))
+            meilleurs = np.argpartition(-candidats_scores, n - 1)[:n]
+            meilleurs = meilleurs[np.argsort(-candidats_scores[meilleurs])]
+            ids[i, :n] = candidats_ids[meilleurs]
+            scores[i, :n] = candidats_scores[meilleurs]
+        return ids, scores
+
+
+def charger_index_si_present(dossier=None, nom_modele=None):
+    """Index configuré s'il a été construit, sinon None (recherche exacte sur BASE_ADRESSES)."""
+    dossier = dossier or config.DOSSIER_INDEX_ADRESSES
+    if not (dossier and os.path.exists(os.path.join(dossier, "manifeste.json"))):
+        return None
+    index = IndexAdresses.charger(dossier)
+    nom_modele = nom_modele or config.NOM_MODELE_NLP
+    if index.manifeste["nom_modele"] != nom_modele:
+        raise ValueError(f"L'index {dossier} a été construit avec {index.manifeste['nom_modele']}, "
+                         f"pas avec {nom_modele} : reconstruisez-le.")
+    return index
+
+
+def _lire_fichier_adresses(chemin):
+    with open(chemin, encoding="utf-8") as f:
+        return [ligne.strip() for ligne in f if ligne.strip()]
+
+
+if __name__ == "__main__":
+    from sentence_transformers import SentenceTransformer
+
+    parser = argparse.ArgumentParser(description="Index vectoriel des adresses de référence")
+    parser.add_argument("action", choices=["construire", "ajouter"])
+    parser.add_argument("fichier", help="Fichier texte, une adresse par ligne")
+    parser.add_argument("--dossier", default=config.DOSSIER_INDEX_ADRESSES)
+    parser.add_argument("--nb-listes", type=int, default=None)
+    parser.add_argument("--dtype", choices=["float16", "float32"], default="float16")
+    args = parser.parse_args()
+
+    modele = SentenceTransformer(config.NOM_MODELE_NLP)
+    adresses = _lire_fichier_adresses(args.fichier)
+    if args.action == "construire":
+        index = IndexAdresses.construire(adresses, modele, args.dossier, nb_listes=args.nb_listes, dtype=args.dtype)
+    else:
+        index = IndexAdresses.charger(args.dossier)
+        index.ajouter(adresses, modele)
+    print(f"Index {args.dossier} : {len(index)} adresses, {index.nb_listes} listes, {len(index.segments)} segment(s)")
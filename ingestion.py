@@ -0,0 +1,137 @@
+"""
+Import en flux des fichiers d'adresses (CSV / Excel).
+
+Le fichier n'est jamais chargé en entier : il est lu par blocs de
+TAILLE_BLOC_IMPORT lignes, seule la colonne « adresse » est conservée, et
+chaque bloc est corrigé puis vérifié avant de lire le suivant. Les doublons,
+dans un bloc comme d'un bloc à l'autre, ne sont corrigés et vérifiés qu'une fois.
+D'un bloc à l'autre, seules les MAX_ADRESSES_CONNUES_FLUX dernières adresses
+distinctes sont retenues : la mémoire reste bornée quelle que soit la taille du
+fichier ; un doublon plus lointain est recorrigé, et sa vérification est servie
+par le cache des résultats.
+"""
+import codecs
+import io
+from itertools import islice
+
+import chardet
+import pandas as pd
+
+import config
+from pipeline import verifier_adresses
+
+COLONNE_ADRESSE = "adresse"
+
+
+def detecter_encodage(fichier, taille_echantillon=None):
+    """
+    Encodage d'un CSV, déterminé sur un échantillon du début du fichier :
+    UTF-8 s'il se décode sans erreur, sinon la proposition de chardet.
+    """
+    taille_echantillon = taille_echantillon or config.TAILLE_ECHANTILLON_ENCODAGE
+    position = fichier.tell()
+    echantillon = fichier.read(taille_echantillon)
+    fichier.seek(position)
+    try:
+        # final=False : un caractère multi-octets coupé en fin d'échantillon n'est pas une erreur
+        codecs.getincrementaldecoder("utf-8")().decode(echantillon, final=False)
+        return "utf-8-sig" if echantillon.startswith(codecs.BOM_UTF8) else "utf-8"
+    except UnicodeDecodeError:
+        pass
+    encodage = chardet.detect(echantillon).get("encoding")
+    return encodage or "ISO-8859-1"
+
+
+def _blocs_csv(fichier, taille_bloc):
+    encodage = detecter_encodage(fichier)
+    lecteur = pd.read_csv(fichier, encoding=encodage,
+                          usecols=lambda c: str(c).strip().lower() == COLONNE_ADRESSE,
+                          dtype=str, chunksize=taille_bloc)
+    for bloc in lecteur:
+        if bloc.shape[1] == 0:
+            raise ValueError(f"Le fichier doit contenir une colonne nommée '{COLONNE_ADRESSE}'")
+        yield bloc.iloc[:, 0]
+
+
+def _blocs_excel(fichier, taille_bloc):
+    import openpyxl
+
+    # read_only : les lignes sont lues à la demande depuis le XML de la feuille
+    classeur = openpyxl.load_workbook(fichier, read_only=True, data_only=True)
+    try:
+        lignes = classeur.worksheets[0].iter_rows(values_only=True)
+        entete = next(lignes, ())
+        noms = [str(c).strip().lower() if c is not None else "" for c in entete]
+        if COLONNE_ADRESSE not in noms:
+            raise ValueError(f"Le fichier doit contenir une colonne nommée '{COLONNE_ADRESSE}'")
+        colonne = noms.index(COLONNE_ADRESSE)
+        bloc = []
+        for ligne in lignes:
+            bloc.append(ligne[colonne] if colonne < len(ligne) else None)
+            if len(bloc) >= taille_bloc:
+                yield pd.Series(bloc, dtype=object)
+                bloc = []
+        if bloc:
+            yield pd.Series(bloc, dtype=object)
+    finally:
+        classeur.close()
+
+
+def lire_blocs_adresses(fichier, nom_fichier=None, taille_bloc=None):
+    """Générateur de Series d'adresses brutes (colonne « adresse »), bloc par bloc."""
+    taille_bloc = taille_bloc or config.TAILLE_BLOC_IMPORT
+    nom_fichier = (nom_fichier or getattr(fichier, "name", "")).lower()
+    if isinstance(fichier, (bytes, bytearray)):
+        fichier = io.BytesIO(fichier)
+    if nom_fichier.endswith((".xlsx", ".xlsm")):
+        return _blocs_excel(fichier, taille_bloc)
+    return _blocs_csv(fichier, taille_bloc)
+
+
+def adresses_nettoyees(blocs, stats=None):
+    """
+    Retire les cellules vides et les espaces superflus, bloc par bloc.
+    `stats`, si fourni, reçoit le compteur de lignes lues.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("lignes", 0)
+    for bloc in blocs:
+        bloc = bloc.dropna().astype(str).str.strip()
+        bloc = bloc[bloc != ""]
+        stats["lignes"] += len(bloc)
+        if len(bloc):
+            yield bloc.tolist()
+
+
+def reblocs(listes, taille_bloc=None):
+    """Regroupe un flux de listes en blocs de taille fixe (le dernier peut être plus petit)."""
+    taille_bloc = taille_bloc or config.TAILLE_BLOC_IMPORT
+    tampon = []
+    for liste in listes:
+        tampon.extend(liste)
+        while len(tampon) >= taille_bloc:
+            yield tampon[:taille_bloc]
+            tampon = tampon[taille_bloc:]
+    if tampon:
+        yield tampon
+
+
+def verifier_flux(blocs_adresses, verificateur, reprise=True, nom_flux=""):
+    """
+    Corrige et vérifie un flux de blocs d'adresses, un bloc à la fois.
+    Les adresses déjà traitées dans un bloc précédent sont reprises telles
+    quelles (seule leur forme normalisée et leur résultat restent en mémoire,
+    pour au plus MAX_ADRESSES_CONNUES_FLUX adresses).
+    Avec reprise, chaque bloc est un lot (nom du flux + rang + contenu) laissé
+    ouvert : l'appelant l'enregistre puis le clôture (voir traiter_fichier).
+    Générateur de (df_resultats, detail_correction, stats) par bloc.
+    """
+    from reprise import identifiant_lot
+
+    connues = {}
+    for numero, bloc in enumerate(blocs_adresses):
+        lot_id = identifiant_lot([nom_flux, f"bloc {numero}", *bloc]) if reprise else None
+        yield verifier_adresses(bloc, verificateur, reprise=reprise, connues=connues, lot_id=lot_id, cloturer=False)
+        # Ordre d'insertion du dict : les adresses vues le plus tôt sortent en premier
+        for cle in list(islice(connues, max(0, len(connues) - config.MAX_ADRESSES_CONNUES_FLUX))):
+            del connues[cle]
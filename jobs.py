@@ -0,0 +1,269 @@
+"""
+File de jobs de vérification persistée dans la base historique.
+
+L'interface soumet un job (liste d'adresses) ; un ou plusieurs process
+`python worker.py` le réservent et le traitent par lots. Chaque lot est
+enregistré (résultats du job + historique) dans une seule transaction, ce qui
+permet de suivre la progression, de lire les résultats partiels, et
+d'annuler / reprendre un job sans perdre ce qui a déjà été vérifié.
+"""
+import os
+from datetime import datetime, timedelta
+from itertools import islice
+
+import pandas as pd
+
+import config
+from db import COLONNES_RESULTATS, _verrou_db, connexion, inserer_historique
+
+CREATION = "creation"
+EN_ATTENTE = "en_attente"
+EN_COURS = "en_cours"
+TERMINE = "termine"
+ANNULE = "annule"
+ERREUR = "erreur"
+
+
+def init_jobs():
+    with _verrou_db:
+        conn = connexion()
+        conn.executescript("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            statut TEXT NOT NULL,
+            fournisseur TEXT,
+            nb_workers INTEGER,
+            forcer INTEGER DEFAULT 0,
+            nb_total INTEGER NOT NULL,
+            nb_traites INTEGER NOT NULL DEFAULT 0,
+            date_creation TEXT,
+            date_maj TEXT,
+            worker_pid INTEGER,
+            message TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_statut ON jobs (statut, id);
+        CREATE TABLE IF NOT EXISTS job_adresses (
+            job_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            adresse_saisie TEXT,
+            adresse_corrigee TEXT,
+            statut TEXT,
+            date_verif TEXT,
+            PRIMARY KEY (job_id, position)
+        );
+        """)
+        conn.commit()
+
+
+# ==================== CÔTÉ INTERFACE ====================
+def soumettre_job(adresses, fournisseur=None, nb_workers=None, forcer=False):
+    """
+    Enregistre un job en attente et retourne son id. `adresses` peut être un
+    générateur (import en flux) : il est consommé sans être matérialisé.
+    Le fichier est lu hors du verrou de la base, qui n'est pris que le temps
+    d'insérer chaque bloc ; chaque bloc rafraîchit date_maj, ce qui distingue une
+    soumission en cours d'une soumission abandonnée (supprimer_soumissions_abandonnees).
+    """
+    maintenant = datetime.now().isoformat()
+    with _verrou_db:
+        conn = connexion()
+        with conn:
+            # Job invisible pour les workers (statut provisoire) tant que toutes les adresses ne sont pas insérées
+            cur = conn.execute("""
+                INSERT INTO jobs (statut, fournisseur, nb_workers, forcer, nb_total, date_creation, date_maj)
+                VALUES (?, ?, ?, ?, 0, ?, ?)
+            """, (CREATION, fournisseur or config.FOURNISSEUR, nb_workers, int(forcer), maintenant, maintenant))
+            job_id = cur.lastrowid
+
+    nb_total = 0
+    lignes = ((job_id, i, str(adresse)) for i, adresse in enumerate(adresses))
+    try:
+        while True:
+            bloc = list(islice(lignes, config.TAILLE_BLOC_IMPORT))
+            if not bloc:
+                break
+            with _verrou_db:
+                conn = connexion()
+                with conn:
+                    cur = conn.execute("UPDATE jobs SET date_maj = ? WHERE id = ? AND statut = ?",
+                                       (datetime.now().isoformat(), job_id, CREATION))
+                    if cur.rowcount == 0:
+                        raise RuntimeError(f"Soumission du job {job_id} abandonnée depuis plus de "
+                                           f"{config.DELAI_CREATION_JOB_S:.0f}s : job supprimé")
+                    conn.executemany("INSERT INTO job_adresses (job_id, position, adresse_saisie) VALUES (?, ?, ?)", bloc)
+            nb_total += len(bloc)
+    except BaseException:
+        # Lecture interrompue : pas de job provisoire orphelin
+        with _verrou_db:
+            conn = connexion()
+            with conn:
+                conn.execute("DELETE FROM job_adresses WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        raise
+
+    with _verrou_db:
+        conn = connexion()
+        with conn:
+            conn.execute("UPDATE jobs SET statut = ?, nb_total = ? WHERE id = ?", (EN_ATTENTE, nb_total, job_id))
+    return job_id
+
+
+def lister_jobs(limite=50):
+    with _verrou_db:
+        return pd.read_sql_query("""
+            SELECT id, statut, nb_traites, nb_total, fournisseur, date_creation, date_maj, message
+            FROM jobs ORDER BY id DESC LIMIT ?
+        """, connexion(), params=(limite,))
+
+
+def etat_job(job_id):
+    with _verrou_db:
+        conn = connexion()
+        ligne = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if ligne is None:
+            return None
+        colonnes = [c[0] for c in conn.execute("SELECT * FROM jobs LIMIT 0").description]
+    return dict(zip(colonnes, ligne))
+
+
+def resultats_job(job_id, seulement_traites=True):
+    """Résultats (éventuellement partiels) d'un job, dans l'ordre de soumission."""
+    condition = "AND statut IS NOT NULL" if seulement_traites else ""
+    with _verrou_db:
+        df = pd.read_sql_query(f"""
+            SELECT adresse_saisie, adresse_corrigee, statut FROM job_adresses
+            WHERE job_id = ? {condition} ORDER BY position
+        """, connexion(), params=(job_id,))
+    df.columns = COLONNES_RESULTATS
+    return df
+
+
+def _changer_statut(job_id, nouveau, depuis, message=None):
+    with _verrou_db:
+        conn = connexion()
+        with conn:
+            cur = conn.execute(f"""
+                UPDATE jobs SET statut = ?, date_maj = ?, message = COALESCE(?, message)
+                WHERE id = ? AND statut IN ({','.join('?' * len(depuis))})
+            """, (nouveau, datetime.now().isoformat(), message, job_id, *depuis))
+            return cur.rowcount > 0
+
+
+def annuler_job(job_id):
+    """Le worker s'arrête à la fin du lot en cours ; les résultats déjà obtenus sont conservés."""
+    return _changer_statut(job_id, ANNULE, (EN_ATTENTE, EN_COURS))
+
+
+def reprendre_job(job_id):
+    """Remet en file un job annulé ou en erreur : seules les adresses non traitées seront vérifiées."""
+    return _changer_statut(job_id, EN_ATTENTE, (ANNULE, ERREUR), message="")
+
+
+# ==================== CÔTÉ WORKER ====================
+def _process_vivant(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def liberer_jobs_orphelins():
+    """Remet en attente les jobs « en cours » dont le worker a disparu (crash, arrêt machine)."""
+    with _verrou_db:
+        conn = connexion()
+        orphelins = [job_id for job_id, pid in conn.execute("SELECT id, worker_pid FROM jobs WHERE statut = ?", (EN_COURS,))
+                     if pid is None or not _process_vivant(pid)]
+    for job_id in orphelins:
+        _changer_statut(job_id, EN_ATTENTE, (EN_COURS,))
+    return orphelins
+
+
+def supprimer_soumissions_abandonnees(delai_s=None):
+    """
+    Supprime les jobs restés « en création » (interface arrêtée pendant
+    soumettre_job) sans nouveau bloc depuis `delai_s` secondes. Retourne leurs id.
+    """
+    delai_s = config.DELAI_CREATION_JOB_S if delai_s is None else delai_s
+    limite = (datetime.now() - timedelta(seconds=delai_s)).isoformat()
+    with _verrou_db:
+        conn = connexion()
+        with conn:
+            abandonnes = [job_id for job_id, in conn.execute("SELECT id FROM jobs WHERE statut = ? AND date_maj < ?",
+                                                             (CREATION, limite))]
+            for job_id in abandonnes:
+                conn.execute("DELETE FROM job_adresses WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ? AND statut = ?", (job_id, CREATION))
+    return abandonnes
+
+
+def reserver_job():
+    """Réserve atomiquement le plus ancien job en attente pour ce process. Retourne son état ou None."""
+    with _verrou_db:
+        conn = connexion()
+        with conn:
+            ligne = conn.execute("""
+                UPDATE jobs SET statut = ?, worker_pid = ?, date_maj = ?
+                WHERE id = (SELECT id FROM jobs WHERE statut = ? ORDER BY id LIMIT 1) AND statut = ?
+                RETURNING id
+            """, (EN_COURS, os.getpid(), datetime.now().isoformat(), EN_ATTENTE, EN_ATTENTE)).fetchone()
+    return etat_job(ligne[0]) if ligne else None
+
+
+def _lot_suivant(job_id, taille):
+    with _verrou_db:
+        return connexion().execute("""
+            SELECT position, adresse_saisie FROM job_adresses
+            WHERE job_id = ? AND statut IS NULL ORDER BY position LIMIT ?
+        """, (job_id, taille)).fetchall()
+
+
+def _enregistrer_lot(job_id, positions, df_resultats):
+    """Résultats du lot + historique + progression, dans une seule transaction."""
+    maintenant = datetime.now().isoformat()
+    with _verrou_db:
+        conn = connexion()
+        with conn:
+            conn.executemany("""
+                UPDATE job_adresses SET adresse_corrigee = ?, statut = ?, date_verif = ?
+                WHERE job_id = ? AND position = ?
+            """, zip(df_resultats["Adresse corrigée"].astype(str), df_resultats["Statut éligibilité"].astype(str),
+                     [maintenant] * len(positions), [job_id] * len(positions), positions))
+            inserer_historique(conn, df_resultats)
+            conn.execute("UPDATE jobs SET nb_traites = nb_traites + ?, date_maj = ? WHERE id = ?",
+                         (len(positions), maintenant, job_id))
+
+
+def traiter_job(job, taille_lot=None):
+    """Traite un job réservé, lot par lot, jusqu'à la fin ou une annulation. Retourne son statut final."""
+    # Import ici : l'interface (onglet Jobs) n'a pas besoin de la chaîne NLP / navigateur
+    from normalisation import normaliser_adresse
+    from pipeline import construire_verificateur, verifier_adresses
+    from scraping import MESSAGE_ECHEC
+
+    job_id = job["id"]
+    verificateur = construire_verificateur(job["fournisseur"], job["nb_workers"], bool(job["forcer"]))
+    taille_lot = taille_lot or config.TAILLE_LOT_JOB
+    # Résultats déjà obtenus dans ce job : les doublons des lots suivants ne sont pas revérifiés.
+    # Comme dans CacheEligibilite, seuls les succès sont gardés : un échec est retenté au lot suivant.
+    connues = {}
+    while True:
+        statut = etat_job(job_id)["statut"]
+        if statut != EN_COURS:
+            return statut
+        lot = _lot_suivant(job_id, taille_lot)
+        if not lot:
+            _changer_statut(job_id, TERMINE, (EN_COURS,))
+            return TERMINE
+        positions = [position for position, _ in lot]
+        df_resultats, _, _ = verifier_adresses([adresse for _, adresse in lot], verificateur, connues=connues)
+        _enregistrer_lot(job_id, positions, df_resultats)
+        echecs = df_resultats.loc[df_resultats["Statut éligibilité"] == MESSAGE_ECHEC, "Adresse saisie"]
+        for adresse in echecs:
+            connues.pop(normaliser_adresse(adresse), None)
+
+
+def marquer_erreur(job_id, message):
+    _changer_statut(job_id, ERREUR, (EN_COURS,), message=message)
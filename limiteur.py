@@ -0,0 +1,75 @@
+import threading
+import time
+
+import config
+
+
+# ==================== LIMITEUR DE DÉBIT ADAPTATIF ====================
+class LimiteurAdaptatif:
+    """
+    Seau à jetons partagé entre les workers : chaque requête consomme un jeton,
+    les jetons se rechargent au débit courant (requêtes/seconde).
+    Le débit s'adapte à ce que le site supporte :
+    - réponse rapide et sans erreur -> hausse additive du débit
+    - réponse lente (au-delà de la latence cible) -> baisse modérée
+    - erreur -> débit divisé par deux
+    """
+
+    def __init__(self, debit_initial=None, debit_min=None, debit_max=None,
+                 latence_cible=None, capacite=None):
+        self.debit = debit_initial or config.DEBIT_INITIAL
+        self.debit_min = debit_min or config.DEBIT_MIN
+        self.debit_max = debit_max or config.DEBIT_MAX
+        self.latence_cible = latence_cible or config.LATENCE_CIBLE_S
+        self.capacite = capacite or config.CAPACITE_RAFALE
+        self.jetons = float(self.capacite)
+        self.latence_moyenne = None
+        self.nb_succes = 0
+        self.nb_erreurs = 0
+        self._dernier_remplissage = time.monotonic()
+        self._verrou = threading.Lock()
+
+    def _remplir(self):
+        maintenant = time.monotonic()
+        ecoule = maintenant - self._dernier_remplissage
+        self.jetons = min(self.capacite, self.jetons + ecoule * self.debit)
+        self._dernier_remplissage = maintenant
+
+    def acquerir(self):
+        """Bloque jusqu'à obtenir un jeton."""
+        while True:
+            with self._verrou:
+                self._remplir()
+                if self.jetons >= 1:
+                    self.jetons -= 1
+                    return
+                attente = (1 - self.jetons) / self.debit
+            time.sleep(attente)
+
+    def signaler(self, latence, succes=True):
+        """Ajuste le débit selon la latence observée et le succès de la requête."""
+        with self._verrou:
+            self._remplir()
+            if self.latence_moyenne is None:
+                self.latence_moyenne = latence
+            else:
+                self.latence_moyenne = 0.8 * self.latence_moyenne + 0.2 * latence
+
+            if not succes:
+                self.nb_erreurs += 1
+                self.debit = max(self.debit_min, self.debit / 2)
+            elif self.latence_moyenne > self.latence_cible:
+                self.nb_succes += 1
+                self.debit = max(self.debit_min, self.debit * 0.8)
+            else:
+                self.nb_succes += 1
+                self.debit = min(self.debit_max, self.debit + config.PAS_DEBIT)
+
+    def etat(self):
+        with self._verrou:
+            return {
+                "debit_req_s": round(self.debit, 3),
+                "latence_moyenne_s": round(self.latence_moyenne or 0.0, 3),
+                "succes": self.nb_succes,
+                "erreurs": self.nb_erreurs,
+            }
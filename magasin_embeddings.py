@@ -0,0 +1,63 @@
+"""
+Magasin sur disque des embeddings de la base de référence.
+
+Le fichier est nommé d'après une empreinte SHA-256 du nom du modèle et de la
+liste d'adresses : si l'un ou l'autre change, une nouvelle version est calculée,
+sinon le fichier existant est simplement mappé en mémoire au démarrage.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import config
+
+VERSION_MAGASIN = 1
+
+
+def empreinte(adresses, nom_modele):
+    h = hashlib.sha256()
+    h.update(f"v{VERSION_MAGASIN}\0{nom_modele}\0".encode("utf-8"))
+    for adresse in adresses:
+        h.update(adresse.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _meta_valide(chemin_meta, somme, nom_modele, nb):
+    try:
+        with open(chemin_meta, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (meta.get("version") == VERSION_MAGASIN and meta.get("sha256") == somme
+            and meta.get("nom_modele") == nom_modele and meta.get("nb") == nb)
+
+
+def embeddings_references(adresses, encoder, nom_modele, dossier=None):
+    """
+    Embeddings normalisés (float32) de `adresses`, mappés en mémoire depuis le disque.
+    `encoder(adresses)` n'est appelé que si aucune version valide n'existe.
+    Retourne (embeddings, charge_depuis_disque).
+    """
+    dossier = dossier or config.DOSSIER_EMBEDDINGS
+    adresses = list(adresses)
+    somme = empreinte(adresses, nom_modele)
+    chemin = os.path.join(dossier, f"embeddings_{somme[:16]}.npy")
+    chemin_meta = os.path.join(dossier, f"embeddings_{somme[:16]}.json")
+
+    if os.path.exists(chemin) and _meta_valide(chemin_meta, somme, nom_modele, len(adresses)):
+        return np.load(chemin, mmap_mode="r"), True
+
+    embeddings = np.asarray(encoder(adresses), dtype=np.float32)
+    os.makedirs(dossier, exist_ok=True)
+    # Écriture atomique : un process concurrent ne lit jamais un fichier partiel
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    with open(temporaire, "wb") as f:
+        np.save(f, embeddings)
+    os.replace(temporaire, chemin)
+    with open(chemin_meta, "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION_MAGASIN, "sha256": somme, "nom_modele": nom_modele,
+                   "nb": len(adresses), "dimension": int(embeddings.shape[1])}, f, indent=2)
+    return np.load(chemin, mmap_mode="r"), False
@@ -0,0 +1,283 @@
+"""
+Instrumentation des étapes critiques : durées (histogrammes), compteurs et
+erreurs par type d'exception.
+
+Les mesures sont agrégées en mémoire par série (nom + étiquettes), puis vidées
+dans la table `mesures` de la base historique par enregistrer_mesures() : à la
+fin de chaque vérification, à l'affichage de la page Performance et à l'arrêt
+du process. Une ligne par série et par vidage ; les lectures les additionnent.
+
+Désactivées (ELIG_MESURES=0), chronometre() renvoie un contexte neutre partagé
+et les autres fonctions s'arrêtent au premier test : coût quasi nul.
+
+    python mesures.py               # export texte au format Prometheus
+    python mesures.py --depuis 24   # dernières 24 heures seulement
+"""
+import argparse
+import atexit
+import bisect
+import contextlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import config
+
+DUREE = "duree"
+COMPTEUR = "compteur"
+# Bornes supérieures des seaux des histogrammes de durée (secondes), +inf implicite
+SEAUX_S = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+_series = {}
+_debut_series = datetime.now()
+_verrou_mesures = threading.Lock()
+_table_prete = False
+_NEUTRE = contextlib.nullcontext()
+
+
+# ==================== COLLECTE ====================
+def _serie(nom, etiquettes, type_serie):
+    """Série (créée au besoin) ; appelé sous _verrou_mesures."""
+    cle = (nom, tuple(sorted(etiquettes.items())))
+    serie = _series.get(cle)
+    if serie is None:
+        serie = _series[cle] = {"type": type_serie, "nb": 0, "somme": 0.0, "max": 0.0,
+                                "seaux": [0] * (len(SEAUX_S) + 1) if type_serie == DUREE else None}
+    return serie
+
+
+def incrementer(nom, valeur=1, **etiquettes):
+    if not config.MESURES_ACTIVES:
+        return
+    with _verrou_mesures:
+        serie = _serie(nom, etiquettes, COMPTEUR)
+        serie["nb"] += 1
+        serie["somme"] += valeur
+
+
+def observer(nom, duree_s, **etiquettes):
+    """Ajoute une durée (secondes) à l'histogramme de la série."""
+    if not config.MESURES_ACTIVES:
+        return
+    with _verrou_mesures:
+        serie = _serie(nom, etiquettes, DUREE)
+        serie["nb"] += 1
+        serie["somme"] += duree_s
+        serie["max"] = max(serie["max"], duree_s)
+        serie["seaux"][bisect.bisect_left(SEAUX_S, duree_s)] += 1
+
+
+def erreur(etape, exception):
+    """Compte une erreur de l'étape par type d'exception (série « erreurs »)."""
+    incrementer("erreurs", etape=etape, type=type(exception).__name__)
+
+
+class _Chronometre:
+    __slots__ = ("nom", "etiquettes", "debut")
+
+    def __init__(self, nom, etiquettes):
+        self.nom = nom
+        self.etiquettes = etiquettes
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, type_exc, exc, tb):
+        observer(self.nom, time.perf_counter() - self.debut, **self.etiquettes)
+        if exc is not None:
+            erreur(self.nom, exc)
+        return False
+
+
+def chronometre(nom, **etiquettes):
+    """Contexte qui mesure la durée du bloc (et compte l'exception qui en sort, le cas échéant)."""
+    if not config.MESURES_ACTIVES:
+        return _NEUTRE
+    return _Chronometre(nom, etiquettes)
+
+
+# ==================== PERSISTANCE ====================
+def init_mesures():
+    """Crée la table et purge les mesures plus anciennes que MESURES_RETENTION_J jours."""
+    global _table_prete
+    from db import _verrou_db, connexion
+
+    limite = (datetime.now() - timedelta(days=config.MESURES_RETENTION_J)).isoformat()
+    with _verrou_db:
+        conn = connexion()
+        conn.executescript("""
+        CREATE TABLE IF NOT EXISTS mesures (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date_debut TEXT,
+            date_fin TEXT,
+            nom TEXT NOT NULL,
+            etiquettes TEXT NOT NULL,
+            type TEXT NOT NULL,
+            nb INTEGER,
+            somme REAL,
+            max REAL,
+            seaux TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_mesures_date ON mesures (date_fin);
+        """)
+        conn.execute("DELETE FROM mesures WHERE date_fin < ?", (limite,))
+        conn.commit()
+    _table_prete = True
+
+
+def enregistrer_mesures():
+    """
+    Vide les séries en mémoire dans la base (une transaction). Retourne le
+    nombre de séries écrites. Une erreur d'écriture perd ces mesures mais
+    n'interrompt jamais la vérification en cours ; elle est comptée dans la
+    série « erreurs » (étape mesures.enregistrement), écrite au vidage suivant.
+    """
+    global _series, _debut_series
+    with _verrou_mesures:
+        if not _series:
+            return 0
+        series, debut = _series, _debut_series
+        _series, _debut_series = {}, datetime.now()
+    from db import _verrou_db, connexion
+
+    fin = datetime.now().isoformat()
+    lignes = [(debut.isoformat(), fin, nom, json.dumps(dict(etiquettes), ensure_ascii=False), serie["type"],
+               serie["nb"], serie["somme"], serie["max"], json.dumps(serie["seaux"]) if serie["seaux"] else None)
+              for (nom, etiquettes), serie in series.items()]
+    try:
+        if not _table_prete:
+            init_mesures()
+        with _verrou_db:
+            conn = connexion()
+            with conn:
+                conn.executemany("""
+                    INSERT INTO mesures (date_debut, date_fin, nom, etiquettes, type, nb, somme, max, seaux)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, lignes)
+    except sqlite3.Error as e:
+        erreur("mesures.enregistrement", e)
+        return 0
+    return len(lignes)
+
+
+atexit.register(enregistrer_mesures)
+
+
+# ==================== LECTURE ====================
+def quantile_seaux(seaux, q, maximum=None):
+    """Quantile estimé d'un histogramme (interpolation linéaire dans le seau, comme Prometheus)."""
+    total = sum(seaux)
+    if not total:
+        return None
+    rang = q * total
+    cumul = 0
+    for i, nombre in enumerate(seaux):
+        if nombre and cumul + nombre >= rang:
+            borne_basse = SEAUX_S[i - 1] if i > 0 else 0.0
+            borne_haute = SEAUX_S[i] if i < len(SEAUX_S) else (maximum or borne_basse)
+            if maximum is not None:
+                borne_haute = min(borne_haute, maximum)
+            return borne_basse + (borne_haute - borne_basse) * (rang - cumul) / nombre
+        cumul += nombre
+    return maximum
+
+
+def charger_mesures(depuis=None):
+    """
+    Séries agrégées sur la période (depuis : datetime ou None = tout).
+    Retourne un DataFrame : nom, etiquettes (dict), type, nb, somme, max, seaux.
+    """
+    import pandas as pd
+    from db import _verrou_db, connexion
+
+    if not _table_prete:
+        init_mesures()
+    clause, params = "", ()
+    if depuis is not None:
+        clause, params = "WHERE date_fin >= ?", (depuis.isoformat(),)
+    with _verrou_db:
+        lignes = connexion().execute(
+            f"SELECT nom, etiquettes, type, nb, somme, max, seaux FROM mesures {clause}", params).fetchall()
+
+    agregats = {}
+    for nom, etiquettes, type_serie, nb, somme, maximum, seaux in lignes:
+        agregat = agregats.setdefault((nom, etiquettes, type_serie), {
+            "nb": 0, "somme": 0.0, "max": 0.0, "seaux": [0] * (len(SEAUX_S) + 1) if seaux else None})
+        agregat["nb"] += nb
+        agregat["somme"] += somme
+        agregat["max"] = max(agregat["max"], maximum or 0.0)
+        if seaux:
+            agregat["seaux"] = [a + b for a, b in zip(agregat["seaux"], json.loads(seaux))]
+    return pd.DataFrame([{"nom": nom, "etiquettes": json.loads(etiquettes), "type": type_serie, **agregat}
+                         for (nom, etiquettes, type_serie), agregat in sorted(agregats.items())],
+                        columns=["nom", "etiquettes", "type", "nb", "somme", "max", "seaux"])
+
+
+def tableau_durees(df_mesures):
+    """Une ligne par série de durée : nombre, total, moyenne, p50 / p95 estimés et max (secondes)."""
+    import pandas as pd
+
+    lignes = []
+    for serie in df_mesures[df_mesures["type"] == DUREE].itertuples(index=False):
+        lignes.append({
+            "Étape": serie.nom,
+            "Détail": ", ".join(f"{cle}={valeur}" for cle, valeur in serie.etiquettes.items()),
+            "Nombre": serie.nb,
+            "Total (s)": round(serie.somme, 3),
+            "Moyenne (s)": round(serie.somme / serie.nb, 4) if serie.nb else None,
+            "p50 (s)": round(quantile_seaux(serie.seaux, 0.5, serie.max), 4),
+            "p95 (s)": round(quantile_seaux(serie.seaux, 0.95, serie.max), 4),
+            "Max (s)": round(serie.max, 4),
+        })
+    return pd.DataFrame(lignes, columns=["Étape", "Détail", "Nombre", "Total (s)", "Moyenne (s)",
+                                         "p50 (s)", "p95 (s)", "Max (s)"])
+
+
+# ==================== EXPORT PROMETHEUS ====================
+def _nom_prometheus(nom):
+    return "elig_" + re.sub(r"[^a-zA-Z0-9_]", "_", nom)
+
+
+def _etiquettes_prometheus(etiquettes, **en_plus):
+    paires = {**etiquettes, **en_plus}
+    if not paires:
+        return ""
+    echapper = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{cle}="{echapper(valeur)}"' for cle, valeur in paires.items()) + "}"
+
+
+def texte_prometheus(df_mesures=None):
+    """Mesures cumulées au format texte d'exposition Prometheus."""
+    df_mesures = charger_mesures() if df_mesures is None else df_mesures
+    lignes, types_declares = [], set()
+    for serie in df_mesures.itertuples(index=False):
+        if serie.type == DUREE:
+            nom = _nom_prometheus(serie.nom) + "_seconds"
+            if nom not in types_declares:
+                lignes.append(f"# TYPE {nom} histogram")
+                types_declares.add(nom)
+            cumul = 0
+            for borne, nombre in zip(SEAUX_S + ["+Inf"], serie.seaux):
+                cumul += nombre
+                lignes.append(f"{nom}_bucket{_etiquettes_prometheus(serie.etiquettes, le=borne)} {cumul}")
+            lignes.append(f"{nom}_sum{_etiquettes_prometheus(serie.etiquettes)} {serie.somme}")
+            lignes.append(f"{nom}_count{_etiquettes_prometheus(serie.etiquettes)} {serie.nb}")
+        else:
+            nom = _nom_prometheus(serie.nom) + "_total"
+            if nom not in types_declares:
+                lignes.append(f"# TYPE {nom} counter")
+                types_declares.add(nom)
+            lignes.append(f"{nom}{_etiquettes_prometheus(serie.etiquettes)} {serie.somme:g}")
+    return "\n".join(lignes) + "\n"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export des mesures de performance (format Prometheus)")
+    parser.add_argument("--depuis", type=float, default=None, help="Ne garder que les N dernières heures")
+    args = parser.parse_args()
+    depuis = datetime.now() - timedelta(hours=args.depuis) if args.depuis else None
+    print(texte_prometheus(charger_mesures(depuis)), end="")
@@ -0,0 +1,39 @@
+import re
+import unicodedata
+
+# ==================== NORMALISATION DES ADRESSES ====================
+# Abréviations courantes -> forme longue (après passage en minuscules sans accents)
+ABREVIATIONS = {
+    "av": "avenue",
+    "ave": "avenue",
+    "bd": "boulevard",
+    "bld": "boulevard",
+    "blvd": "boulevard",
+    "r": "rue",
+    "pl": "place",
+    "ch": "chemin",
+    "imp": "impasse",
+    "all": "allee",
+    "rte": "route",
+    "sq": "square",
+    "fbg": "faubourg",
+    "st": "saint",
+    "ste": "sainte",
+}
+
+_RE_NON_ALPHANUM = re.compile(r"[^a-z0-9]+")
+
+
+def sans_accents(texte):
+    return "".join(c for c in unicodedata.normalize("NFKD", texte) if not unicodedata.combining(c))
+
+
+def normaliser_adresse(adresse):
+    """
+    Forme canonique d'une adresse pour les comparaisons et les clés de cache :
+    minuscules, sans accents ni ponctuation, abréviations développées,
+    espaces simples. "5 Av. des Champs-Élysées,  Paris" -> "5 avenue des champs elysees paris"
+    """
+    texte = sans_accents(str(adresse)).lower()
+    mots = _RE_NON_ALPHANUM.sub(" ", texte).split()
+    return " ".join(ABREVIATIONS.get(mot, mot) for mot in mots)
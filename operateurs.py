@@ -0,0 +1,479 @@
+"""
+Vérification multi-opérateurs, au format de la base Tunisie
+(table `historique_eligibilite` : fibre / 4G / 5G par opérateur).
+
+Chaque source d'éligibilité (site Orange, API, zones de couverture déclarées
+d'un opérateur...) est un backend enregistré sous un nom dans le registre.
+Pour chaque adresse, tous les backends applicables sont interrogés en même
+temps : la latence d'une adresse est celle du backend le plus lent, pas la
+somme. Chaque backend a sa propre limite de concurrence et son timeout ; un
+backend en échec ou hors délai laisse ses technologies « inconnues » (NULL)
+sans bloquer les autres ; un opérateur sans aucune réponse n'est pas
+historisé. Les résultats sont écrits en une transaction.
+"""
+import asyncio
+import functools
+import os
+import queue
+import sqlite3
+import time
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+import config
+from mesures import erreur, incrementer, observer
+
+TECHNOLOGIES = ("fibre", "g4", "g5")
+COLONNES_OPERATEURS = ["gouvernorat", "ville", "adresse", "latitude", "longitude",
+                       "fibre_eligible", "g4_eligible", "g5_eligible", "operateur", "date_verif"]
+
+
+@functools.lru_cache(maxsize=1024)
+def _fibre_orange(statut):
+    """Statut texte Orange -> True / False / None (non vérifiable) ; peu de statuts distincts, d'où le cache."""
+    from classification import ELIGIBLE, NON_ELIGIBLE, classifier_statuts
+
+    classe = classifier_statuts(pd.Series([statut])).iloc[0]
+    if classe["Éligible ?"] == ELIGIBLE:
+        return classe["Technologie"] in ("FTTH", "FTTO")
+    if classe["Éligible ?"] == NON_ELIGIBLE:
+        return False
+    return None
+
+
+def _technologies_orange(statut):
+    return {"fibre": _fibre_orange(statut)}
+
+
+# ==================== BACKENDS ====================
+class BackendOperateur:
+    """
+    Source d'éligibilité d'un opérateur pour une ou plusieurs technologies.
+    verifier(entree) est une coroutine qui retourne {technologie: bool ou None}
+    ou None si l'adresse est inconnue de la source ; `entree` est un dict
+    (adresse, et si connus latitude, longitude, gouvernorat, ville).
+    """
+
+    nom = "abstrait"
+    operateur = None
+    technologies = ()
+    concurrence = 4
+    timeout_s = None
+    # Ne répond qu'aux entrées avec latitude / longitude
+    geolocalise = False
+
+    def s_applique(self, entree):
+        return True
+
+    async def ouvrir(self):
+        pass
+
+    async def fermer(self):
+        pass
+
+    async def verifier(self, entree):
+        raise NotImplementedError
+
+
+class BackendHTTPOrange(BackendOperateur):
+    """API d'éligibilité Orange (client du backend HTTP, session aiohttp partagée)."""
+
+    nom = "orange_http"
+    operateur = "Orange"
+    technologies = ("fibre",)
+
+    def __init__(self, **options_http):
+        from http_orange import FournisseurHTTPOrange
+
+        self.client = FournisseurHTTPOrange(**options_http)
+        self.concurrence = self.client.concurrence
+        self._session = None
+
+    async def ouvrir(self):
+        import aiohttp
+
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrence, keepalive_timeout=30),
+            timeout=aiohttp.ClientTimeout(total=self.client.timeout_s))
+
+    async def fermer(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def verifier(self, entree):
+        from http_orange import texte_statut
+
+        candidats = await self.client._get_json(self._session, self.client.url_adresses, {"q": entree["adresse"]})
+        if isinstance(candidats, dict):
+            candidats = candidats.get("adresses", [])
+        if not candidats:
+            return None
+        reponse = await self.client._get_json(self._session, self.client.url_eligibilite, {"id": candidats[0]["id"]})
+        return _technologies_orange(texte_statut(reponse))
+
+
+class BackendSeleniumOrange(BackendOperateur):
+    """
+    Site Orange piloté par Chrome headless. Les sessions sont réutilisées d'une
+    adresse à l'autre. Les appels passent par un pool de `concurrence` threads :
+    un appel hors délai garde sa place jusqu'à la fin réelle de son thread, donc
+    jamais plus de `concurrence` navigateurs ouverts, même après des timeouts.
+    """
+
+    nom = "orange_selenium"
+    operateur = "Orange"
+    technologies = ("fibre",)
+
+    def __init__(self, nb_workers=None):
+        from scraping import nb_workers_par_defaut
+
+        self.concurrence = nb_workers or nb_workers_par_defaut()
+        self._sessions = queue.LifoQueue()
+        self._ferme = False
+        self._executeur = None
+
+    async def ouvrir(self):
+        self._ferme = False
+        self._executeur = ThreadPoolExecutor(max_workers=self.concurrence, thread_name_prefix=self.nom)
+
+    def _verifier_sync(self, adresse):
+        from scraping import _fermer_session, _ouvrir_session, _verifier_adresse
+
+        try:
+            driver, wait = self._sessions.get_nowait()
+        except queue.Empty:
+            driver, wait = _ouvrir_session()
+        try:
+            statut = _verifier_adresse(driver, wait, adresse)
+        except Exception:
+            _fermer_session(driver)
+            raise
+        # Appel terminé après fermer() (timeout dépassé) : la session ne doit pas survivre
+        if self._ferme:
+            _fermer_session(driver)
+        else:
+            self._sessions.put((driver, wait))
+        return statut
+
+    async def verifier(self, entree):
+        # Timeout avant démarrage : l'appel est retiré de la file du pool sans ouvrir de navigateur
+        statut = await asyncio.get_running_loop().run_in_executor(self._executeur, self._verifier_sync,
+                                                                  entree["adresse"])
+        return _technologies_orange(statut)
+
+    async def fermer(self):
+        from scraping import _fermer_session
+
+        self._ferme = True
+        if self._executeur is not None:
+            # Sans attendre les appels hors délai encore en cours : ils ferment leur session en sortant
+            self._executeur.shutdown(wait=False, cancel_futures=True)
+            self._executeur = None
+        while not self._sessions.empty():
+            _fermer_session(self._sessions.get_nowait()[0])
+
+
+class BackendZonesCouverture(BackendOperateur):
+    """Couverture déclarée d'un opérateur (table zones_couverture), pour les adresses géolocalisées."""
+
+    technologies = TECHNOLOGIES
+    concurrence = 1
+    geolocalise = True
+
+    def __init__(self, operateur):
+        self.operateur = operateur
+        self.nom = f"zones_couverture:{operateur}"
+
+    def s_applique(self, entree):
+        return entree.get("latitude") is not None and entree.get("longitude") is not None
+
+    async def verifier(self, entree):
+        from couverture import moteur_couverture
+
+        couverture = moteur_couverture().couverture_a(entree["latitude"], entree["longitude"], operateur=self.operateur)
+        return {techno: couverture[techno] for techno in TECHNOLOGIES}
+
+
+def _backends_zones():
+    from couverture import moteur_couverture
+
+    operateurs = sorted(set(moteur_couverture().operateurs) - {""})
+    return [BackendZonesCouverture(operateur) for operateur in operateurs]
+
+
+# ==================== REGISTRE ====================
+# nom -> fabrique retournant une liste de backends (une source peut couvrir plusieurs opérateurs)
+_registre = {}
+
+def enregistrer_backend(nom, fabrique):
+    """Ajoute (ou remplace) une source d'éligibilité, sélectionnable par config.BACKENDS_OPERATEURS."""
+    _registre[nom] = fabrique
+
+def backends_disponibles():
+    return sorted(_registre)
+
+def construire_backends(noms=None):
+    """Instancie les backends demandés (par défaut : config.BACKENDS_OPERATEURS)."""
+    if noms is None:
+        noms = config.BACKENDS_OPERATEURS
+    if isinstance(noms, str):
+        noms = [nom.strip() for nom in noms.split(",") if nom.strip()]
+    inconnus = [nom for nom in noms if nom not in _registre]
+    if inconnus:
+        raise ValueError(f"Backend(s) opérateur inconnu(s) : {', '.join(inconnus)} "
+                         f"(disponibles : {', '.join(backends_disponibles())})")
+    return [backend for nom in noms for backend in _registre[nom]()]
+
+enregistrer_backend("orange_http", lambda: [BackendHTTPOrange()])
+enregistrer_backend("orange_selenium", lambda: [BackendSeleniumOrange()])
+enregistrer_backend("zones_couverture", _backends_zones)
+
+
+# ==================== ORDONNANCEUR ====================
+def _entree(valeur):
+    return {"adresse": valeur} if isinstance(valeur, str) else dict(valeur)
+
+
+async def _appeler(backend, semaphore, entree, stats):
+    async with semaphore:
+        debut = time.perf_counter()
+        resultat, etat = None, "succes"
+        try:
+            resultat = await asyncio.wait_for(backend.verifier(entree), backend.timeout_s or config.TIMEOUT_OPERATEUR_S)
+        except asyncio.TimeoutError:
+            etat = "timeout"
+            incrementer("erreurs", etape=f"operateur:{backend.nom}", type="Timeout")
+        except Exception as e:
+            etat = "echec"
+            erreur(f"operateur:{backend.nom}", e)
+        duree = time.perf_counter() - debut
+        stats[etat] += 1
+        stats["duree_s"] += duree
+        observer("operateurs.appel", duree, backend=backend.nom, resultat=etat)
+        return resultat
+
+
+async def _verifier_entree(backends, semaphores, entree, stats):
+    applicables = [b for b in backends if b.s_applique(entree)]
+    debut = time.perf_counter()
+    # Tous les backends en même temps : la latence de l'adresse est celle du plus lent
+    resultats = await asyncio.gather(*(_appeler(b, semaphores[b.nom], entree, stats[b.nom]) for b in applicables))
+    observer("operateurs.adresse", time.perf_counter() - debut)
+    return list(zip(applicables, resultats))
+
+
+async def _verifier_tout(entrees, backends, stats):
+    semaphores = {b.nom: asyncio.Semaphore(b.concurrence) for b in backends}
+    for backend in backends:
+        await backend.ouvrir()
+    try:
+        return await asyncio.gather(*(_verifier_entree(backends, semaphores, e, stats) for e in entrees))
+    finally:
+        for backend in backends:
+            await backend.fermer()
+
+
+def _lignes_operateurs(entree, reponses, date_verif):
+    """Une ligne par opérateur ; plusieurs sources d'un même opérateur sont fusionnées (éligible si l'une l'affirme)."""
+    par_operateur = {}
+    for backend, resultat in reponses:
+        ligne = par_operateur.setdefault(backend.operateur, {
+            "gouvernorat": entree.get("gouvernorat"), "ville": entree.get("ville"), "adresse": entree["adresse"],
+            "latitude": entree.get("latitude"), "longitude": entree.get("longitude"),
+            "fibre_eligible": None, "g4_eligible": None, "g5_eligible": None,
+            "operateur": backend.operateur, "date_verif": date_verif,
+        })
+        for techno in backend.technologies:
+            valeur = (resultat or {}).get(techno)
+            if valeur is not None:
+                colonne = f"{techno}_eligible"
+                ligne[colonne] = max(ligne[colonne] or 0, int(bool(valeur)))
+    # Aucune technologie connue (adresse inconnue, échec, timeout) : rien à historiser
+    return [ligne for ligne in par_operateur.values()
+            if any(ligne[f"{techno}_eligible"] is not None for techno in TECHNOLOGIES)]
+
+
+def verifier_operateurs(entrees, backends=None):
+    """
+    Interroge tous les backends applicables pour chaque entrée (adresse ou dict
+    adresse / latitude / longitude / gouvernorat / ville).
+    Retourne (df au format historique_eligibilite, stats par backend).
+    """
+    entrees = [_entree(e) for e in entrees]
+    backends = construire_backends() if backends is None else backends
+    stats = {b.nom: {"backend": b.nom, "operateur": b.operateur, "succes": 0, "echec": 0, "timeout": 0, "duree_s": 0.0}
+             for b in backends}
+    if not entrees or not backends:
+        return pd.DataFrame(columns=COLONNES_OPERATEURS), list(stats.values())
+
+    debut = time.perf_counter()
+    reponses = asyncio.run(_verifier_tout(entrees, backends, stats))
+    date_verif = datetime.now().isoformat()
+    lignes = [ligne for entree, reponses_entree in zip(entrees, reponses)
+              for ligne in _lignes_operateurs(entree, reponses_entree, date_verif)]
+    duree = time.perf_counter() - debut
+    for s in stats.values():
+        s["duree_s"] = round(s["duree_s"], 2)
+        s["adresses_par_s"] = round(len(entrees) / duree, 3) if duree > 0 else 0.0
+    return pd.DataFrame(lignes, columns=COLONNES_OPERATEURS), list(stats.values())
+
+
+def resultats_orange(df_resultats):
+    """
+    Lignes Orange (fibre) au format historique_eligibilite, tirées des statuts
+    déjà obtenus par le vérificateur principal : aucune nouvelle requête Orange.
+    Les statuts non vérifiables ne donnent pas de ligne.
+    """
+    connus = df_resultats.drop_duplicates("Adresse corrigée")
+    fibre = [_fibre_orange(statut) for statut in connus["Statut éligibilité"].astype(str)]
+    date_verif = datetime.now().isoformat()
+    lignes = [{"adresse": adresse, "fibre_eligible": int(valeur), "operateur": "Orange", "date_verif": date_verif}
+              for adresse, valeur in zip(connus["Adresse corrigée"], fibre) if valeur is not None]
+    return pd.DataFrame(lignes, columns=COLONNES_OPERATEURS)
+
+
+# ==================== PERSISTANCE ====================
+def init_operateurs():
+    """Table historique_eligibilite de la base Tunisie (si absente), son index de lecture et ses agrégats."""
+    from db import _verrou_db, connexion
+
+    with _verrou_db:
+        conn = connexion(config.CHEMIN_DB_TUNISIE)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS historique_eligibilite (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            gouvernorat TEXT,
+            ville TEXT,
+            adresse TEXT,
+            latitude REAL,
+            longitude REAL,
+            fibre_eligible INTEGER,
+            g4_eligible INTEGER,
+            g5_eligible INTEGER,
+            operateur TEXT,
+            date_verif TEXT
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_hist_elig_adresse ON historique_eligibilite (adresse, operateur, date_verif)")
+        _init_agregats(conn)
+        conn.commit()
+
+
+def _init_agregats(conn):
+    """
+    Agrégat matérialisé de historique_eligibilite : éligibles / non éligibles par
+    jour, gouvernorat, ville, opérateur et technologie (NULL -> '' dans la clé).
+    Tenu à jour à chaque sauvegarde, jamais décrémenté par l'archivage.
+    """
+    existe = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'agregats_eligibilite'").fetchone()
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS agregats_eligibilite (
+        jour TEXT,
+        gouvernorat TEXT,
+        ville TEXT,
+        operateur TEXT,
+        technologie TEXT,
+        eligibles INTEGER NOT NULL,
+        non_eligibles INTEGER NOT NULL,
+        PRIMARY KEY (jour, gouvernorat, ville, operateur, technologie)
+    ) WITHOUT ROWID
+    """)
+    if not existe:
+        # Première création : agréger l'historique déjà présent
+        for techno in TECHNOLOGIES:
+            conn.execute(f"""
+                INSERT INTO agregats_eligibilite
+                SELECT substr(date_verif, 1, 10), COALESCE(gouvernorat, ''), COALESCE(ville, ''),
+                       COALESCE(operateur, ''), '{techno}',
+                       SUM({techno}_eligible = 1), SUM({techno}_eligible = 0)
+                FROM historique_eligibilite WHERE {techno}_eligible IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+            """)
+
+
+def _lignes_agregats(df):
+    """(jour, gouvernorat, ville, operateur, technologie, eligibles, non_eligibles) pour un lot de résultats."""
+    cles = ["jour", "gouvernorat", "ville", "operateur"]
+    df = df.assign(jour=df["date_verif"].astype(str).str[:10])
+    df[cles] = df[cles].fillna("").astype(str)
+    lignes = []
+    for techno in TECHNOLOGIES:
+        valeurs = pd.to_numeric(df[f"{techno}_eligible"], errors="coerce")
+        connus = df[valeurs.notna()].assign(eligibles=valeurs.dropna().astype(int))
+        if len(connus) == 0:
+            continue
+        groupes = connus.groupby(cles)["eligibles"].agg(["sum", "count"]).reset_index()
+        lignes += [(*cle, techno, int(somme), int(nombre - somme))
+                   for *cle, somme, nombre in groupes.itertuples(index=False, name=None)]
+    return lignes
+
+
+def sauvegarder_resultats_operateurs(df):
+    """Insère les résultats multi-opérateurs dans historique_eligibilite, en une seule transaction."""
+    if len(df) == 0:
+        return
+    from db import _verrou_db, connexion
+
+    # NaN / NA -> NULL (technologie inconnue, adresse non géolocalisée)
+    lignes = df[COLONNES_OPERATEURS].astype(object).where(df[COLONNES_OPERATEURS].notna(), None)
+    with _verrou_db:
+        conn = connexion(config.CHEMIN_DB_TUNISIE)
+        with conn:
+            conn.executemany(
+                f"INSERT INTO historique_eligibilite ({', '.join(COLONNES_OPERATEURS)}) "
+                f"VALUES ({', '.join('?' * len(COLONNES_OPERATEURS))})",
+                lignes.itertuples(index=False, name=None))
+            conn.executemany("""
+                INSERT INTO agregats_eligibilite VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (jour, gouvernorat, ville, operateur, technologie) DO UPDATE SET
+                    eligibles = eligibles + excluded.eligibles, non_eligibles = non_eligibles + excluded.non_eligibles
+            """, _lignes_agregats(df))
+    incrementer("operateurs.lignes_sauvegardees", len(df))
+
+
+def agregats_presents():
+    """
+    Les agrégats de la base Tunisie existent-ils ? Sonde en lecture seule : une
+    simple consultation (interface) ne crée ni ne migre rien dans la base.
+    """
+    if not os.path.exists(config.CHEMIN_DB_TUNISIE):
+        return False
+    with closing(sqlite3.connect(f"file:{config.CHEMIN_DB_TUNISIE}?mode=ro", uri=True)) as conn:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'agregats_eligibilite'").fetchone() is not None
+
+
+def couverture_agregee(date_debut=None, date_fin=None, par=("gouvernorat", "operateur", "technologie")):
+    """
+    Éligibles / non éligibles regroupés selon `par` (colonnes de agregats_eligibilite),
+    lus dans les agrégats : instantané quelle que soit la taille de l'historique.
+    Vide tant que init_operateurs n'a pas créé les agrégats (premier enregistrement
+    par opérateur ou archivage).
+    """
+    from db import _verrou_db, connexion
+
+    par = list(par)
+    inconnues = set(par) - {"jour", "gouvernorat", "ville", "operateur", "technologie"}
+    if inconnues:
+        raise ValueError(f"Regroupement inconnu : {', '.join(sorted(inconnues))}")
+    if not agregats_presents():
+        return pd.DataFrame(columns=par + ["eligibles", "non_eligibles", "taux_eligibilite"])
+    clauses, params = [], []
+    if date_debut:
+        clauses.append("jour >= ?")
+        params.append(str(date_debut)[:10])
+    if date_fin:
+        clauses.append("jour <= ?")
+        params.append(str(date_fin)[:10])
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    colonnes = ", ".join(par)
+    with _verrou_db:
+        df = pd.read_sql_query(f"""
+            SELECT {colonnes}, SUM(eligibles) AS eligibles, SUM(non_eligibles) AS non_eligibles
+            FROM agregats_eligibilite {where} GROUP BY {colonnes} ORDER BY {colonnes}
+        """, connexion(config.CHEMIN_DB_TUNISIE), params=params)
+    df["taux_eligibilite"] = (df["eligibles"] / (df["eligibles"] + df["non_eligibles"])).round(3)
+    return df
@@ -0,0 +1,215 @@
+"""
+Enchaînement correction NLP -> vérification d'éligibilité, partagé par
+l'interface Streamlit, le worker de la file de jobs et la ligne de commande
+(cli.py) : traiter_fichier() enchaîne lecture en flux, correction,
+vérification, sauvegarde dans l'historique et écriture du fichier de sortie.
+"""
+import time
+
+import pandas as pd
+
+from cache_eligibilite import FournisseurAvecCache
+from correctionIA import corriger_adresses_detail
+from db import COLONNES_RESULTATS
+from fournisseurs import obtenir_fournisseur
+from mesures import enregistrer_mesures, incrementer, observer
+from normalisation import normaliser_adresse
+from reprise import cloturer_lot, enregistrer_resultat, identifiant_lot, ouvrir_lot
+
+
+# ==================== PIPELINE CORRECTION -> VÉRIFICATION ====================
+def construire_verificateur(nom_fournisseur=None, nb_workers=None, forcer=False):
+    """Fournisseur configuré, précédé du cache des résultats."""
+    return FournisseurAvecCache(obtenir_fournisseur(nom_fournisseur, nb_workers), forcer=forcer)
+
+
+def verifier_adresses(liste_adresses, verificateur, reprise=False, connues=None, lot_id=None, cloturer=True):
+    """
+    Corrige puis vérifie une liste d'adresses.
+
+    Les doublons ne sont traités qu'une fois : dédoublonnage sur la forme
+    normalisée avant la correction, puis sur l'adresse corrigée avant la
+    vérification ; chaque résultat est ensuite redistribué à toutes les lignes
+    d'origine, dans l'ordre. `connues` (forme normalisée -> (adresse corrigée,
+    statut)), partagé entre plusieurs appels, évite de retraiter une adresse
+    déjà vue dans un bloc précédent ; il est complété au passage.
+
+    Avec reprise=True, chaque statut est committé dès réception dans un lot
+    identifié par le contenu de la liste (ou `lot_id`) : relancer la même
+    liste après un crash ne revérifie que ce qui manque. Avec cloturer=False,
+    le lot reste ouvert : l'appelant l'enregistre (reprise.sauvegarder_lot)
+    puis le clôture lui-même, pour ne jamais enregistrer deux fois un bloc.
+    Retourne (df_resultats, detail_correction, stats_verification).
+    """
+    debut = time.perf_counter()
+    liste_adresses = list(liste_adresses)
+    connues = {} if connues is None else connues
+    cles = [normaliser_adresse(a) for a in liste_adresses]
+    # Première ligne de chaque adresse distincte (sert aussi de position de reprise)
+    premieres = {}
+    for i, cle in enumerate(cles):
+        premieres.setdefault(cle, i)
+
+    nb_reprises = 0
+    if reprise:
+        lot_id = lot_id or identifiant_lot(liste_adresses)
+        deja_verifiees = ouvrir_lot(lot_id, len(liste_adresses))
+        for cle, i in premieres.items():
+            if i in deja_verifiees and cle not in connues:
+                connues[cle] = deja_verifiees[i]
+                nb_reprises += 1
+
+    # 1. Correction : une fois par forme normalisée inconnue
+    a_corriger = [cle for cle in premieres if cle not in connues]
+    detail_correction = corriger_adresses_detail([liste_adresses[premieres[cle]] for cle in a_corriger])
+
+    # 2. Vérification : une fois par adresse corrigée distincte
+    groupes = {}
+    a_verifier = []
+    for cle, adresse_corrigee in zip(a_corriger, detail_correction["corrigees"]):
+        cle_corrigee = normaliser_adresse(adresse_corrigee)
+        if cle_corrigee not in groupes:
+            groupes[cle_corrigee] = []
+            a_verifier.append(adresse_corrigee)
+        groupes[cle_corrigee].append(cle)
+    groupes = list(groupes.values())
+
+    def enregistrer_reprise(j, adresse_corrigee, statut):
+        enregistrer_resultat(lot_id, [premieres[cle] for cle in groupes[j]], adresse_corrigee, statut)
+
+    debut_verification = time.perf_counter()
+    resultats, stats = verificateur.verifier(a_verifier, enregistrer_reprise if reprise else None)
+    if a_verifier:
+        observer("pipeline.verification", time.perf_counter() - debut_verification)
+    for cles_groupe, resultat in zip(groupes, resultats):
+        for cle in cles_groupe:
+            connues[cle] = tuple(resultat)
+
+    # 3. Redistribution aux lignes d'origine
+    df_resultats = pd.DataFrame({
+        "Adresse saisie": liste_adresses,
+        "Adresse corrigée": [connues[cle][0] for cle in cles],
+        "Statut éligibilité": [connues[cle][1] for cle in cles],
+    }, columns=COLONNES_RESULTATS)
+
+    stats = stats + [{"fournisseur": "dedoublonnage", "adresses": len(liste_adresses),
+                      "corrigees": len(a_corriger), "verifiees": len(a_verifier)}]
+    if reprise:
+        if cloturer:
+            cloturer_lot(lot_id)
+        stats = stats + [{"fournisseur": "reprise", "lot": lot_id, "adresses": len(liste_adresses),
+                          "deja_verifiees": nb_reprises}]
+
+    observer("pipeline.lot", time.perf_counter() - debut)
+    incrementer("pipeline.adresses", len(liste_adresses), traitement="recues")
+    incrementer("pipeline.adresses", len(a_corriger), traitement="corrigees")
+    incrementer("pipeline.adresses", len(a_verifier), traitement="verifiees")
+    # Fin de bloc : les mesures collectées jusqu'ici rejoignent la base
+    enregistrer_mesures()
+    return df_resultats, detail_correction, stats
+
+
+def taux_dedoublonnage(stats):
+    """Part des lignes qui n'ont pas eu besoin d'être vérifiées (doublons), sur un ou plusieurs appels."""
+    lignes = [s for s in stats if s.get("fournisseur") == "dedoublonnage"]
+    nb_adresses = sum(s["adresses"] for s in lignes)
+    nb_verifiees = sum(s["verifiees"] for s in lignes)
+    return nb_adresses, nb_verifiees, (1 - nb_verifiees / nb_adresses) if nb_adresses else 0.0
+
+
+# ==================== TRAITEMENT D'UN FICHIER ====================
+def traiter_fichier(fichier, verificateur, nom_fichier=None, sortie=None, taille_bloc=None, reprise=True,
+                    sur_bloc=None, operateurs=None):
+    """
+    Corrige, vérifie et enregistre dans l'historique les adresses d'un fichier
+    CSV / Excel (chemin ou fichier ouvert), bloc par bloc : la mémoire utilisée
+    ne dépend pas de la taille du fichier. Chaque bloc est aussi écrit dans
+    `sortie` (.csv, .parquet ou .xlsx) s'il est fourni, avec la classification.
+    sur_bloc(df_bloc, bilan) est appelé après chaque bloc (progression).
+    Avec reprise, un bloc n'est clôturé qu'en fin de fichier : après un crash,
+    relancer le même fichier rejoue les blocs déjà enregistrés (sortie
+    complète) sans les revérifier ni les réinsérer dans l'historique.
+    operateurs (noms de backends, voir operateurs.py) : les résultats de chaque
+    bloc sont aussi enregistrés par opérateur dans la base Tunisie. Les statuts
+    Orange déjà obtenus sont réutilisés (pas de seconde requête) ; les autres
+    backends sont interrogés pour chaque adresse corrigée distincte. Les
+    fichiers importés n'ayant pas de coordonnées, les backends géolocalisés
+    (zones_couverture) sont refusés.
+    Retourne le bilan : lignes, blocs (dont blocs_repris), adresses vérifiées,
+    durée, débit, statuts, stats.
+    """
+    from classification import classifier_statuts
+    from db import sauvegarder_resultats
+    from export_resultats import EcrivainResultats
+    from ingestion import adresses_nettoyees, lire_blocs_adresses, reblocs, verifier_flux
+    from reprise import lot_sauvegarde, sauvegarder_lot
+
+    if isinstance(fichier, str):
+        nom_fichier = nom_fichier or fichier
+        with open(fichier, "rb") as f:
+            return traiter_fichier(f, verificateur, nom_fichier, sortie, taille_bloc, reprise, sur_bloc, operateurs)
+
+    if operateurs:
+        from operateurs import (construire_backends, init_operateurs, resultats_orange,
+                                sauvegarder_resultats_operateurs, verifier_operateurs)
+        backends = construire_backends(operateurs)
+        geolocalises = sorted({b.nom for b in backends if b.geolocalise})
+        if geolocalises:
+            raise ValueError(f"Backend(s) {', '.join(geolocalises)} : adresses géolocalisées nécessaires "
+                             "(latitude / longitude), absentes des fichiers importés")
+        avec_orange = any(b.operateur == "Orange" for b in backends)
+        backends = [b for b in backends if b.operateur != "Orange"]
+        init_operateurs()
+
+    blocs = reblocs(adresses_nettoyees(lire_blocs_adresses(fichier, nom_fichier, taille_bloc)), taille_bloc)
+    bilan = {"lignes": 0, "blocs": 0, "blocs_repris": 0, "statuts": {}, "stats": []}
+    lots = []
+    debut = time.perf_counter()
+    ecrivain = EcrivainResultats(sortie) if sortie else None
+    try:
+        for df_bloc, _, stats_bloc in verifier_flux(blocs, verificateur, reprise=reprise, nom_flux=nom_fichier or ""):
+            classes = classifier_statuts(df_bloc["Statut éligibilité"])
+            df_bloc["Éligible ?"] = classes["Éligible ?"]
+            df_bloc["Technologie"] = classes["Technologie"]
+            lot_id = next((s["lot"] for s in stats_bloc if s.get("fournisseur") == "reprise"), None)
+            deja_enregistre = lot_id is not None and lot_sauvegarde(lot_id)
+            if lot_id is None:
+                sauvegarder_resultats(df_bloc)
+            elif deja_enregistre:
+                bilan["blocs_repris"] += 1
+            else:
+                sauvegarder_lot(lot_id, df_bloc)
+            if lot_id is not None:
+                lots.append(lot_id)
+            # Sortie réécrite en entier à chaque exécution : les blocs repris y figurent aussi
+            if ecrivain is not None:
+                ecrivain.ecrire(df_bloc)
+            if operateurs and not deja_enregistre:
+                df_operateurs, stats_operateurs = verifier_operateurs(df_bloc["Adresse corrigée"].unique().tolist(), backends)
+                if avec_orange:
+                    # Statuts Orange du bloc déjà connus : réutilisés tels quels
+                    df_operateurs = pd.concat([resultats_orange(df_bloc), df_operateurs], ignore_index=True)
+                sauvegarder_resultats_operateurs(df_operateurs)
+                bilan["lignes_operateurs"] = bilan.get("lignes_operateurs", 0) + len(df_operateurs)
+                bilan["stats"] += [{"fournisseur": "operateurs", **s} for s in stats_operateurs]
+
+            bilan["lignes"] += len(df_bloc)
+            bilan["blocs"] += 1
+            bilan["stats"] += stats_bloc
+            for statut, nombre in df_bloc["Éligible ?"].value_counts().items():
+                bilan["statuts"][str(statut)] = bilan["statuts"].get(str(statut), 0) + int(nombre)
+            bilan["duree_s"] = round(time.perf_counter() - debut, 2)
+            bilan["lignes_par_s"] = round(bilan["lignes"] / bilan["duree_s"], 2) if bilan["duree_s"] else 0.0
+            if sur_bloc is not None:
+                sur_bloc(df_bloc, bilan)
+    finally:
+        if ecrivain is not None:
+            ecrivain.fermer()
+    # Fichier traité jusqu'au bout : les points de reprise ne servent plus
+    for lot_id in lots:
+        cloturer_lot(lot_id)
+
+    _, bilan["adresses_verifiees"], bilan["taux_dedoublonnage"] = taux_dedoublonnage(bilan["stats"])
+    bilan["duree_s"] = round(time.perf_counter() - debut, 2)
+    bilan["lignes_par_s"] = round(bilan["lignes"] / bilan["duree_s"], 2) if bilan["duree_s"] else 0.0
+    return bilan
@@ -0,0 +1,89 @@
+"""
+Premier étage de la correction d'adresses, sans modèle NLP :
+1. correspondance exacte sur la forme normalisée (table de hachage) ;
+2. index de trigrammes de caractères -> candidats, départagés par distance d'édition.
+Seuls les cas ambigus sont transmis à l'étage BERT. Une correction lexicale
+n'est retenue que si les nombres (numéro de rue, code postal) sont identiques :
+« 13 rue X » n'est jamais ramené sur « 12 rue X ».
+"""
+import re
+from collections import Counter
+
+import config
+from normalisation import normaliser_adresse
+
+
+def trigrammes(texte):
+    texte = f"  {texte} "
+    return {texte[i:i + 3] for i in range(len(texte) - 2)}
+
+
+def distance_edition(a, b):
+    """Distance de Levenshtein (programmation dynamique sur deux lignes)."""
+    if len(a) < len(b):
+        a, b = b, a
+    precedente = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        courante = [i]
+        for j, cb in enumerate(b, 1):
+            courante.append(min(precedente[j] + 1, courante[j - 1] + 1, precedente[j - 1] + (ca != cb)))
+        precedente = courante
+    return precedente[-1]
+
+
+def nombres(texte):
+    return re.findall(r"\d+", texte)
+
+
+def similarite_edition(a, b):
+    if not a and not b:
+        return 1.0
+    return 1.0 - distance_edition(a, b) / max(len(a), len(b))
+
+
+class IndexLexical:
+    """
+    avec_trigrammes=False : correspondance exacte seulement (grande base, où les
+    listes de trigrammes en Python coûteraient des Go et des minutes à construire).
+    """
+
+    def __init__(self, adresses, avec_trigrammes=True):
+        self.adresses = list(adresses)
+        self.normalisees = [normaliser_adresse(a) for a in self.adresses]
+        self.exactes = {}
+        self.postings = {}
+        for i, norm in enumerate(self.normalisees):
+            self.exactes.setdefault(norm, i)
+            if avec_trigrammes:
+                for tri in trigrammes(norm):
+                    self.postings.setdefault(tri, []).append(i)
+        # Trigrammes trop fréquents ("rue", " de"...) : peu discriminants et coûteux,
+        # retirés de l'index (plafond absolu : le coût d'une requête ne croît pas avec la base)
+        self.max_postings = min(config.MAX_POSTINGS_TRIGRAMME,
+                                max(100, int(len(self.adresses) * config.PART_MAX_TRIGRAMME)))
+        self.postings = {tri: liste for tri, liste in self.postings.items() if len(liste) <= self.max_postings}
+
+    def rechercher(self, adresse):
+        """
+        Retourne (indice, score, confiant) de la meilleure référence,
+        ou (None, 0.0, False) si aucune candidate.
+        """
+        norm = normaliser_adresse(adresse)
+        if norm in self.exactes:
+            return self.exactes[norm], 1.0, True
+
+        compte = Counter()
+        for tri in trigrammes(norm):
+            compte.update(self.postings.get(tri, ()))
+        if not compte:
+            return None, 0.0, False
+
+        # Distance d'édition uniquement sur les meilleures candidates par trigrammes
+        scores = sorted(((similarite_edition(norm, self.normalisees[i]), i)
+                         for i, _ in compte.most_common(config.NB_CANDIDATS_LEXICAUX)), reverse=True)
+        meilleur_score, meilleur = scores[0]
+        second = scores[1][0] if len(scores) > 1 else 0.0
+        confiant = (meilleur_score >= config.SEUIL_LEXICAL
+                    and meilleur_score - second >= config.MARGE_LEXICALE
+                    and nombres(norm) == nombres(self.normalisees[meilleur]))
+        return meilleur, meilleur_score, confiant
@@ -0,0 +1,182 @@
+"""
+Rapport PDF d'éligibilité.
+
+- le graphique n'est rendu par kaleido qu'une fois par contenu (cache par empreinte) ;
+- les colonnes du détail sont tronquées / nettoyées en une opération pandas
+  par colonne, puis écrites page par page (en-tête répété, pas de test de saut
+  de page à chaque cellule) ;
+- mode « résumé » sans détail, et génération possible en arrière-plan.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from fpdf import FPDF
+
+import config
+from classification import ELIGIBLE, NON_ELIGIBLE
+from mesures import chronometre, erreur
+
+# (colonne, titre, largeur mm, nb max de caractères)
+COLONNES_DETAIL = [
+    ("Adresse saisie", "Adresse saisie", 60, 35),
+    ("Adresse corrigée", "Adresse corrigée", 60, 35),
+    ("Statut éligibilité", "Statut", 70, 40),
+]
+HAUTEUR_LIGNE = 8
+
+_verrou_graphiques = threading.Lock()
+_executeur = None
+_verrou_executeur = threading.Lock()
+
+
+def _texte_pdf(texte):
+    """Les polices standard de FPDF ne couvrent que latin-1 (pas d'emoji)."""
+    return str(texte).encode("latin-1", "ignore").decode("latin-1").strip()
+
+
+def _colonne_pdf(serie, nb_caracteres):
+    """Troncature et nettoyage d'une colonne entière, sans boucle Python par ligne."""
+    return (serie.fillna("").astype(str).str.slice(0, nb_caracteres)
+            .str.encode("latin-1", "ignore").str.decode("latin-1").tolist())
+
+
+def image_graphique(fig):
+    """PNG du graphique, rendu une seule fois par contenu. Retourne le chemin ou None."""
+    dossier = os.path.join(config.DOSSIER_CACHE_RAPPORTS, "graphiques")
+    empreinte = hashlib.sha1(fig.to_json().encode("utf-8")).hexdigest()
+    chemin = os.path.join(dossier, f"{empreinte}.png")
+    with _verrou_graphiques:
+        if not os.path.exists(chemin):
+            os.makedirs(dossier, exist_ok=True)
+            try:
+                # Écriture atomique : un rendu interrompu ne laisse pas d'image tronquée en cache
+                provisoire = f"{chemin}.{os.getpid()}.tmp"
+                with chronometre("rapport.graphique"):
+                    fig.write_image(provisoire, format="png")
+                os.replace(provisoire, chemin)
+            except Exception as e:
+                erreur("rapport.graphique", e)
+                if os.path.exists(provisoire):
+                    os.remove(provisoire)
+                return None
+    return chemin
+
+
+def _entete_detail(pdf, titre):
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, _texte_pdf(titre), ln=True)
+    pdf.ln(5)
+    pdf.set_font("Arial", "B", 10)
+    for _, titre_colonne, largeur, _ in COLONNES_DETAIL:
+        pdf.cell(largeur, HAUTEUR_LIGNE, _texte_pdf(titre_colonne), 1)
+    pdf.ln(HAUTEUR_LIGNE)
+    pdf.set_font("Arial", "", 9)
+
+
+def _ajouter_detail(pdf, df, lignes_par_section):
+    colonnes = [_colonne_pdf(df[nom], nb_car) if nom in df.columns else [""] * len(df)
+                for nom, _, _, nb_car in COLONNES_DETAIL]
+    largeurs = [largeur for _, _, largeur, _ in COLONNES_DETAIL]
+    # Lignes par page : hauteur utile moins le titre (15) et l'en-tête du tableau
+    lignes_par_page = int((pdf.h - pdf.t_margin - pdf.b_margin - 15 - HAUTEUR_LIGNE) // HAUTEUR_LIGNE)
+    nb_lignes = len(df)
+    pdf.set_auto_page_break(auto=False)
+    for debut_section in range(0, nb_lignes, lignes_par_section):
+        fin_section = min(debut_section + lignes_par_section, nb_lignes)
+        for debut_page in range(debut_section, fin_section, lignes_par_page):
+            pdf.add_page()
+            _entete_detail(pdf, f"Détail des résultats ({debut_section + 1} à {fin_section} sur {nb_lignes})")
+            for i in range(debut_page, min(debut_page + lignes_par_page, fin_section)):
+                for colonne, largeur in zip(colonnes, largeurs):
+                    pdf.cell(largeur, HAUTEUR_LIGNE, colonne[i], 1)
+                pdf.ln(HAUTEUR_LIGNE)
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+
+def exporter_pdf(df, fig_pie, nom_pdf=None, auteur="Entreprise XYZ", logo_path="logo_orange.png",
+                 resume_seul=False, lignes_par_section=None):
+    """
+    Génère le rapport dans nom_pdf et retourne ce chemin ; sans nom_pdf,
+    retourne les octets du PDF (le fichier temporaire est supprimé aussitôt lu).
+    resume_seul=True : page de synthèse uniquement ; sinon le détail est
+    découpé en sections de lignes_par_section lignes.
+    """
+    with chronometre("export", format="PDF"):
+        if nom_pdf is not None:
+            return _exporter_pdf(df, fig_pie, nom_pdf, auteur, logo_path, resume_seul, lignes_par_section)
+        fd, chemin = tempfile.mkstemp(prefix="rapport_eligibilite_", suffix=".pdf")
+        os.close(fd)
+        try:
+            _exporter_pdf(df, fig_pie, chemin, auteur, logo_path, resume_seul, lignes_par_section)
+            with open(chemin, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(chemin)
+
+
+def _exporter_pdf(df, fig_pie, nom_pdf, auteur, logo_path, resume_seul, lignes_par_section):
+    lignes_par_section = lignes_par_section or config.LIGNES_PAR_SECTION_PDF
+    graph_path = image_graphique(fig_pie)
+
+    total = len(df)
+    nb_eligibles = int((df['Éligible ?'] == ELIGIBLE).sum())
+    nb_non = int((df['Éligible ?'] == NON_ELIGIBLE).sum())
+    nb_indetermines = total - nb_eligibles - nb_non
+    date_rapport = datetime.now().strftime("%d/%m/%Y %H:%M")
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    # ✅ PAGE 1
+    pdf.add_page()
+
+    # ✅ Logo (si disponible)
+    if os.path.exists(logo_path):
+        pdf.image(logo_path, x=10, y=8, w=30)
+
+    pdf.set_font("Arial", "B", 18)
+    pdf.cell(0, 15, _texte_pdf("Rapport d'éligibilité FTTH/FTTO"), ln=True, align="C")
+    pdf.ln(5)
+
+    pdf.set_font("Arial", "I", 10)
+    pdf.cell(0, 10, _texte_pdf(f"Généré par : {auteur}"), ln=True, align="R")
+    pdf.cell(0, 10, _texte_pdf(f"Date du rapport : {date_rapport}"), ln=True, align="R")
+    pdf.ln(10)
+
+    pdf.set_font("Arial", "", 12)
+    pdf.multi_cell(0, 10, _texte_pdf(f"""
+Nombre total d'adresses vérifiées : {total}
+Nombre d'adresses éligibles : {nb_eligibles}
+Nombre d'adresses non éligibles : {nb_non}
+Nombre d'adresses non vérifiables : {nb_indetermines}
+"""))
+
+    pdf.ln(10)
+    if graph_path:
+        pdf.cell(0, 10, "Graphique de répartition :", ln=True)
+        pdf.image(graph_path, x=30, w=150)
+    else:
+        pdf.cell(0, 10, _texte_pdf("Graphique non disponible (problème de génération)."), ln=True)
+
+    # ✅ PAGES SUIVANTES (détails)
+    if not resume_seul and total:
+        _ajouter_detail(pdf, df, lignes_par_section)
+
+    pdf.output(nom_pdf)
+    return nom_pdf
+
+
+def soumettre_rapport(*args, **kwargs):
+    """
+    Génère le rapport dans un thread d'arrière-plan ; retourne un Future dont le
+    résultat est celui d'exporter_pdf (octets du PDF si nom_pdf n'est pas fourni).
+    """
+    global _executeur
+    with _verrou_executeur:
+        if _executeur is None:
+            _executeur = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rapport_pdf")
+    return _executeur.submit(exporter_pdf, *args, **kwargs)
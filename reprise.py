@@ -0,0 +1,123 @@
+"""
+Points de reprise des vérifications synchrones (interface Streamlit).
+
+Chaque liste d'adresses soumise forme un lot identifié par l'empreinte de son
+contenu. Le statut de chaque adresse est committé dès qu'il est connu : si le
+process ou le navigateur tombe au milieu d'une longue liste, relancer la même
+liste ne revérifie que les adresses manquantes (ou en échec).
+
+Un lot n'est clôturé (point de reprise supprimé) qu'une fois ses résultats
+enregistrés : un lot marqué « sauvegarde » par sauvegarder_lot est rejoué à
+l'identique lors d'une reprise, sans revérification ni nouvel enregistrement.
+"""
+import hashlib
+from datetime import datetime, timedelta
+
+import config
+from db import _verrou_db, connexion, inserer_historique
+from mesures import chronometre, incrementer
+from scraping import MESSAGE_ECHEC
+
+
+def init_reprise():
+    with _verrou_db:
+        conn = connexion()
+        conn.executescript("""
+        CREATE TABLE IF NOT EXISTS lots (
+            id TEXT PRIMARY KEY,
+            nb_total INTEGER NOT NULL,
+            date_creation TEXT
+        );
+        CREATE TABLE IF NOT EXISTS lot_resultats (
+            lot_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            adresse_corrigee TEXT,
+            statut TEXT,
+            date_verif TEXT,
+            PRIMARY KEY (lot_id, position)
+        );
+        """)
+        # Migration : lots dont les résultats sont déjà dans l'historique
+        colonnes = [ligne[1] for ligne in conn.execute("PRAGMA table_info(lots)")]
+        if "sauvegarde" not in colonnes:
+            conn.execute("ALTER TABLE lots ADD COLUMN sauvegarde INTEGER NOT NULL DEFAULT 0")
+        conn.commit()
+
+
+def identifiant_lot(adresses):
+    """Même liste d'adresses (dans le même ordre) -> même identifiant de lot."""
+    h = hashlib.sha1()
+    for adresse in adresses:
+        h.update(str(adresse).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()[:16]
+
+
+def _supprimer_lots(conn, condition, params):
+    conn.execute(f"DELETE FROM lot_resultats WHERE lot_id IN (SELECT id FROM lots WHERE {condition})", params)
+    conn.execute(f"DELETE FROM lots WHERE {condition}", params)
+
+
+def ouvrir_lot(lot_id, nb_total):
+    """
+    Ouvre (ou rouvre) un lot. Retourne {position: (adresse_corrigee, statut)} des
+    adresses déjà vérifiées avec succès lors d'une exécution interrompue (échecs
+    compris si le lot est déjà enregistré : il est rejoué tel quel).
+    Les lots abandonnés depuis plus de REPRISE_TTL_S sont purgés.
+    """
+    maintenant = datetime.now()
+    limite = (maintenant - timedelta(seconds=config.REPRISE_TTL_S)).isoformat()
+    with _verrou_db:
+        conn = connexion()
+        with conn:
+            _supprimer_lots(conn, "date_creation < ?", (limite,))
+            lot = conn.execute("SELECT sauvegarde FROM lots WHERE id = ?", (lot_id,)).fetchone()
+            if lot is None:
+                conn.execute("INSERT INTO lots (id, nb_total, date_creation) VALUES (?, ?, ?)",
+                             (lot_id, nb_total, maintenant.isoformat()))
+                return {}
+            lignes = conn.execute("""
+                SELECT position, adresse_corrigee, statut FROM lot_resultats
+                WHERE lot_id = ? AND (? OR statut != ?)
+            """, (lot_id, lot[0], MESSAGE_ECHEC)).fetchall()
+    return {position: (adresse_corrigee, statut) for position, adresse_corrigee, statut in lignes}
+
+
+def enregistrer_resultat(lot_id, positions, adresse_corrigee, statut):
+    """Committe immédiatement le résultat d'une adresse, pour toutes ses positions (appelé depuis les workers)."""
+    date_verif = datetime.now().isoformat()
+    with _verrou_db:
+        conn = connexion()
+        with conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO lot_resultats (lot_id, position, adresse_corrigee, statut, date_verif)
+                VALUES (?, ?, ?, ?, ?)
+            """, ((lot_id, position, adresse_corrigee, statut, date_verif) for position in positions))
+
+
+def lot_sauvegarde(lot_id):
+    """Les résultats du lot sont-ils déjà dans l'historique ?"""
+    with _verrou_db:
+        lot = connexion().execute("SELECT sauvegarde FROM lots WHERE id = ?", (lot_id,)).fetchone()
+    return bool(lot and lot[0])
+
+
+def sauvegarder_lot(lot_id, df):
+    """
+    Enregistre les résultats du lot dans l'historique et le marque « sauvegarde »,
+    dans la même transaction : après un crash, soit les deux ont eu lieu, soit aucun.
+    """
+    with chronometre("db.sauvegarde"), _verrou_db:
+        conn = connexion()
+        with conn:
+            inserer_historique(conn, df)
+            conn.execute("UPDATE lots SET sauvegarde = 1 WHERE id = ?", (lot_id,))
+    incrementer("db.lignes_sauvegardees", len(df))
+
+
+def cloturer_lot(lot_id):
+    """Supprime le point de reprise d'un lot terminé (vérifié et, le cas échéant, enregistré)."""
+    with _verrou_db:
+        conn = connexion()
+        with conn:
+            _supprimer_lots(conn, "id = ?", (lot_id,))
@@ -1,69 +1,234 @@
-def verifier_liste_eligibilite_orange(liste_adresses):
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from limiteur import LimiteurAdaptatif
+from mesures import erreur, incrementer, observer
+
+MESSAGE_ECHEC = "❌ Impossible de vérifier"
+
+
+# ==================== SESSION SELENIUM ====================
+def _ouvrir_session():
     """
-    Vérifie plusieurs adresses d'un coup en réutilisant UNE seule session Selenium.
-    Retourne une liste [(adresse, resultat), ...]
+    Lance un Chrome headless, ouvre la page d'éligibilité et accepte les cookies.
+    Retourne (driver, wait).
     """
     from selenium import webdriver
     from selenium.webdriver.common.by import By
-    from selenium.webdriver.common.keys import Keys
     from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
-    import time
-    
+
     # Options Chrome headless (sans interface)
     options = Options()
     options.add_argument("--headless")
     options.add_argument("--disable-gpu")
     options.add_argument("--no-sandbox")
-    
+
     driver = webdriver.Chrome(options=options)
-    wait = WebDriverWait(driver, 10)
-    
-    results = []
-    
+    # Chrome est lancé : toute erreur avant de rendre la session doit le fermer
     try:
-        # Ouvre la page une seule fois
-        driver.get("https://boutique.orange.fr/internet/eligibilite")
-        time.sleep(3)
-        
-        # Accepter les cookies si présent
+        wait = WebDriverWait(driver, config.DELAI_ATTENTE)
+
+        # Ouvre la page une seule fois par session
+        driver.get(config.URL_ELIGIBILITE_ORANGE)
+
+        # Accepter les cookies si le bandeau apparaît (attente courte : il peut être absent)
         try:
-            btn_cookie = wait.until(EC.element_to_be_clickable((By.ID, "didomi-notice-agree-button")))
+            btn_cookie = WebDriverWait(driver, config.DELAI_COOKIES).until(
+                EC.element_to_be_clickable((By.ID, "didomi-notice-agree-button"))
+            )
             btn_cookie.click()
-            time.sleep(1)
-        except:
+            wait.until(EC.invisibility_of_element_located((By.ID, "didomi-notice-agree-button")))
+        except Exception:
             pass
-        
-        # Boucle sur toutes les adresses
-        for adresse in liste_adresses:
+
+        # Page prête dès que le champ adresse est utilisable
+        wait.until(EC.element_to_be_clickable((By.NAME, "elig_address")))
+    except BaseException:
+        _fermer_session(driver)
+        raise
+    return driver, wait
+
+
+def _fermer_session(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def _session_vivante(driver):
+    """Vrai si le navigateur répond encore (sinon il faut le relancer)."""
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def _verifier_adresse(driver, wait, adresse):
+    """Saisit une adresse, lit le résultat puis revient à la page d'accueil."""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.support import expected_conditions as EC
+
+    # Attendre que le champ adresse soit (ré)activé
+    champ = wait.until(EC.element_to_be_clickable((By.NAME, "elig_address")))
+    champ.clear()
+    champ.send_keys(adresse)
+    # La saisie est prise en compte quand le champ contient bien l'adresse
+    wait.until(EC.text_to_be_present_in_element_value((By.NAME, "elig_address"), adresse))
+    champ.send_keys(Keys.RETURN)
+
+    # Attendre le résultat
+    resultat_elem = wait.until(
+        EC.visibility_of_element_located((By.CSS_SELECTOR, "div.eligibility-result"))
+    )
+    texte_resultat = resultat_elem.text.strip()
+
+    # Retour à la page d'accueil : driver.get rend la main une fois la page chargée,
+    # l'attente du champ se fait au début de l'adresse suivante
+    driver.get(config.URL_ELIGIBILITE_ORANGE)
+    return texte_resultat
+
+
+# ==================== POOL DE WORKERS ====================
+def nb_workers_par_defaut():
+    """
+    Nombre de sessions Chrome adapté à la machine : au plus une par cœur,
+    et pas plus que ce que la RAM disponible peut héberger.
+    """
+    if config.NB_WORKERS > 0:
+        return config.NB_WORKERS
+    nb_coeurs = os.cpu_count() or 1
+    try:
+        ram_dispo = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        par_ram = int(ram_dispo // (config.RAM_PAR_SESSION_MO * 1024 * 1024))
+    except (ValueError, OSError, AttributeError):
+        par_ram = nb_coeurs
+    return max(1, min(nb_coeurs, par_ram, config.NB_WORKERS_MAX))
+
+
+def _worker(num_worker, file_adresses, resultats, limiteur, sur_resultat=None):
+    """
+    Consomme la file (index, adresse) avec UNE session Chrome réutilisée.
+    Chaque requête passe par le limiteur de débit partagé.
+    Si Chrome plante, la session est relancée et l'adresse retentée.
+    sur_resultat(index, adresse, statut) est appelé dès qu'une adresse est traitée.
+    Retourne les statistiques du worker.
+    """
+    driver = wait = None
+    nb_adresses = nb_erreurs = nb_redemarrages = 0
+    debut = time.perf_counter()
+
+    try:
+        while True:
             try:
-                # Trouver le champ adresse
-                champ = wait.until(EC.presence_of_element_located((By.NAME, "elig_address")))
-                champ.clear()
-                champ.send_keys(adresse)
-                time.sleep(1)
-                champ.send_keys(Keys.RETURN)
-                
-                # Attendre le résultat
-                resultat_elem = wait.until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.eligibility-result"))
-                )
-                texte_resultat = resultat_elem.text.strip()
-                
-                results.append((adresse, texte_resultat))
-                
-                # Retour à la page d'accueil pour saisir une nouvelle adresse
-                driver.get("https://boutique.orange.fr/internet/eligibilite")
-                time.sleep(2)
-            
-            except Exception as e:
-                print(f"Erreur pour {adresse} :", e)
-                results.append((adresse, "❌ Impossible de vérifier"))
-                driver.get("https://boutique.orange.fr/internet/eligibilite")
-                time.sleep(2)
-        
-        return results
-    
+                index, adresse = file_adresses.get_nowait()
+            except queue.Empty:
+                break
+
+            texte_resultat = MESSAGE_ECHEC
+            for _ in range(1 + config.NB_REESSAIS_APRES_CRASH):
+                debut_requete = None
+                try:
+                    if driver is None:
+                        debut_session = time.perf_counter()
+                        driver, wait = _ouvrir_session()
+                        observer("selenium.demarrage", time.perf_counter() - debut_session)
+                    limiteur.acquerir()
+                    debut_requete = time.perf_counter()
+                    texte_resultat = _verifier_adresse(driver, wait, adresse)
+                    duree_requete = time.perf_counter() - debut_requete
+                    limiteur.signaler(duree_requete, succes=True)
+                    observer("verification.adresse", duree_requete, fournisseur="selenium", resultat="succes")
+                    break
+                except Exception as e:
+                    if debut_requete is not None:
+                        duree_requete = time.perf_counter() - debut_requete
+                        limiteur.signaler(duree_requete, succes=False)
+                        observer("verification.adresse", duree_requete, fournisseur="selenium", resultat="echec")
+                    erreur("selenium", e)
+                    if driver is not None and _session_vivante(driver):
+                        # Erreur de page : on recharge et on passe à l'adresse suivante
+                        try:
+                            driver.get(config.URL_ELIGIBILITE_ORANGE)
+                        except Exception:
+                            pass
+                        break
+                    # Session morte : on relance Chrome et on retente la même adresse
+                    if driver is not None:
+                        _fermer_session(driver)
+                        nb_redemarrages += 1
+                        incrementer("selenium.redemarrages")
+                    driver = wait = None
+
+            if texte_resultat == MESSAGE_ECHEC:
+                nb_erreurs += 1
+            resultats[index] = (adresse, texte_resultat)
+            nb_adresses += 1
+            if sur_resultat is not None:
+                sur_resultat(index, adresse, texte_resultat)
     finally:
-        driver.quit()
+        if driver is not None:
+            _fermer_session(driver)
+
+    duree = time.perf_counter() - debut
+    return {
+        "worker": num_worker,
+        "adresses": nb_adresses,
+        "erreurs": nb_erreurs,
+        "redemarrages": nb_redemarrages,
+        "duree_s": round(duree, 2),
+        "adresses_par_s": round(nb_adresses / duree, 3) if duree > 0 else 0.0,
+    }
+
+
+def verifier_avec_pool(liste_adresses, nb_workers=None, limiteur=None, sur_resultat=None):
+    """
+    Vérifie les adresses avec N sessions Chrome en parallèle.
+    Les adresses sont distribuées via une file partagée (un worker libre prend
+    la suivante), et les résultats sont rangés dans l'ordre d'entrée.
+    Le débit global est piloté par un LimiteurAdaptatif commun aux workers.
+    sur_resultat(index, adresse, statut), si fourni, reçoit chaque résultat au
+    fil de l'eau (depuis le thread du worker) : il sert à persister sans attendre la fin.
+    Retourne (resultats, stats_workers).
+    """
+    liste_adresses = list(liste_adresses)
+    if not liste_adresses:
+        return [], []
+
+    nb_workers = nb_workers or nb_workers_par_defaut()
+    nb_workers = max(1, min(nb_workers, len(liste_adresses)))
+
+    file_adresses = queue.Queue()
+    for index, adresse in enumerate(liste_adresses):
+        file_adresses.put((index, adresse))
+    resultats = [None] * len(liste_adresses)
+    limiteur = limiteur or LimiteurAdaptatif()
+
+    with ThreadPoolExecutor(max_workers=nb_workers) as executor:
+        futures = [executor.submit(_worker, num, file_adresses, resultats, limiteur, sur_resultat) for num in range(nb_workers)]
+        stats_workers = [f.result() for f in futures]
+
+    etat_limiteur = limiteur.etat()
+    for stats in stats_workers:
+        stats["debit_final_req_s"] = etat_limiteur["debit_req_s"]
+
+    return resultats, stats_workers
+
+
+def verifier_liste_eligibilite_orange(liste_adresses, nb_workers=None):
+    """
+    Vérifie plusieurs adresses en réutilisant un pool de sessions Selenium.
+    Retourne une liste [(adresse, resultat), ...] dans l'ordre d'entrée.
+    """
+    resultats, stats_workers = verifier_avec_pool(liste_adresses, nb_workers)
+    for stats in stats_workers:
+        print(f"[worker {stats['worker']}] {stats['adresses']} adresses en {stats['duree_s']}s "
+              f"({stats['adresses_par_s']} adr/s, {stats['redemarrages']} redémarrage(s))")
+    return resultats
@@ -0,0 +1,120 @@
+"""
+Serveur local qui rejoue des réponses enregistrées de l'API d'éligibilité Orange.
+Permet de tester le backend HTTP hors ligne :
+
+    python stub_orange.py --port 8765
+    ELIG_FOURNISSEUR=http \
+    ELIG_URL_API_ADRESSES=http://127.0.0.1:8765/api/eligibilite/adresses \
+    ELIG_URL_API_ELIGIBILITE=http://127.0.0.1:8765/api/eligibilite/test \
+    streamlit run elligibilite.py
+
+Il sert aussi une page d'éligibilité minimale (/eligibilite) pour le backend
+Selenium, construite à partir des mêmes enregistrements :
+
+    ELIG_URL_ORANGE=http://127.0.0.1:8765/eligibilite streamlit run elligibilite.py
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from html import escape
+from urllib.parse import parse_qsl, urlsplit
+
+FICHIER_ENREGISTREMENTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "enregistrements", "orange_api.json")
+CHEMIN_PAGE = "/eligibilite"
+
+# Mêmes sélecteurs que la page réelle : champ name="elig_address", résultat div.eligibility-result
+PAGE_ELIGIBILITE = """<!DOCTYPE html>
+<html lang="fr"><head><meta charset="utf-8"><title>Éligibilité (stub)</title></head>
+<body>
+<form method="get" action="{chemin}"><input type="text" name="elig_address" autocomplete="off"></form>
+{resultat}
+</body></html>"""
+
+
+def charger_enregistrements(fichier=FICHIER_ENREGISTREMENTS):
+    with open(fichier, encoding="utf-8") as f:
+        return json.load(f)["enregistrements"]
+
+
+def trouver_reponse(enregistrements, chemin, params):
+    """Premier enregistrement dont le chemin correspond et dont les paramètres sont présents."""
+    for enr in enregistrements:
+        if enr["chemin"] != chemin:
+            continue
+        if all(params.get(cle) == valeur for cle, valeur in enr.get("params", {}).items()):
+            return enr
+    return None
+
+
+def statut_page(enregistrements, adresse):
+    """Texte affiché par la page pour `adresse`, reconstruit à partir des réponses de l'API enregistrées."""
+    from http_orange import texte_statut
+
+    candidats = trouver_reponse(enregistrements, "/api/eligibilite/adresses", {"q": adresse})
+    candidats = candidats and candidats.get("corps")
+    if isinstance(candidats, dict):
+        candidats = candidats.get("adresses", [])
+    if not candidats:
+        return None, 0
+    reponse = trouver_reponse(enregistrements, "/api/eligibilite/test", {"id": candidats[0]["id"]}) or {}
+    return texte_statut(reponse.get("corps") or {}), reponse.get("latence_s", 0)
+
+
+def creer_handler(enregistrements):
+    class HandlerStub(BaseHTTPRequestHandler):
+        def _repondre(self, status, corps, type_contenu):
+            self.send_response(status)
+            self.send_header("Content-Type", type_contenu)
+            self.send_header("Content-Length", str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def _page(self, params):
+            resultat = ""
+            if "elig_address" in params:
+                texte, latence_s = statut_page(enregistrements, params["elig_address"])
+                if latence_s:
+                    time.sleep(latence_s)
+                texte = texte or "Adresse introuvable"
+                resultat = f'<div class="eligibility-result">{escape(texte)}</div>'
+            page = PAGE_ELIGIBILITE.format(chemin=CHEMIN_PAGE, resultat=resultat)
+            self._repondre(200, page.encode("utf-8"), "text/html; charset=utf-8")
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == CHEMIN_PAGE:
+                return self._page(dict(parse_qsl(url.query)))
+            enr = trouver_reponse(enregistrements, url.path, dict(parse_qsl(url.query)))
+            if enr is None:
+                enr = {"status": 404, "corps": {"erreur": "requête non enregistrée"}}
+            if enr.get("latence_s"):
+                time.sleep(enr["latence_s"])
+            corps = json.dumps(enr.get("corps"), ensure_ascii=False).encode("utf-8")
+            self._repondre(enr.get("status", 200), corps, "application/json; charset=utf-8")
+
+        def log_message(self, format, *args):
+            pass
+
+    return HandlerStub
+
+
+def demarrer_stub(port=0, fichier=FICHIER_ENREGISTREMENTS):
+    """Démarre le stub dans un thread. Retourne (serveur, url_base)."""
+    serveur = ThreadingHTTPServer(("127.0.0.1", port), creer_handler(charger_enregistrements(fichier)))
+    serveur.daemon_threads = True
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur, f"http://127.0.0.1:{serveur.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub local de l'API d'éligibilité Orange")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fichier", default=FICHIER_ENREGISTREMENTS)
+    args = parser.parse_args()
+
+    serveur = ThreadingHTTPServer(("127.0.0.1", args.port), creer_handler(charger_enregistrements(args.fichier)))
+    print(f"Stub Orange sur http://127.0.0.1:{args.port}")
+    serveur.serve_forever()
@@ -0,0 +1,95 @@
+"""
+Fixtures communes : bases SQLite temporaires, mesures désactivées, encodeur
+factice, API Orange rejouée. Aucun accès réseau ni téléchargement de modèle.
+"""
+import hashlib
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+# Avant tout import de config : les bases suivies par git ne doivent jamais être ouvertes
+_DOSSIER_SESSION = tempfile.mkdtemp(prefix="elig_tests_")
+os.environ["ELIG_MESURES"] = "0"
+os.environ["ELIG_DB_HISTORIQUE"] = os.path.join(_DOSSIER_SESSION, "historique.db")
+os.environ["ELIG_DB_TUNISIE"] = os.path.join(_DOSSIER_SESSION, "tunisie.db")
+os.environ["ELIG_DOSSIER_EMBEDDINGS"] = os.path.join(_DOSSIER_SESSION, "embeddings")
+os.environ["ELIG_DOSSIER_ARCHIVES"] = os.path.join(_DOSSIER_SESSION, "archives")
+os.environ["ELIG_DOSSIER_INDEX_ADRESSES"] = os.path.join(_DOSSIER_SESSION, "index_adresses")
+
+import config  # noqa: E402
+
+
+@pytest.fixture
+def bases(tmp_path, monkeypatch):
+    """Bases historique et Tunisie vides dans tmp_path, tables créées."""
+    import cache_eligibilite
+    import db
+    from jobs import init_jobs
+    from reprise import init_reprise
+
+    monkeypatch.setattr(config, "CHEMIN_DB_HISTORIQUE", str(tmp_path / "historique.db"))
+    monkeypatch.setattr(config, "CHEMIN_DB_TUNISIE", str(tmp_path / "tunisie.db"))
+    monkeypatch.setattr(config, "DOSSIER_ARCHIVES", str(tmp_path / "archives"))
+    monkeypatch.setattr(config, "DOSSIER_EMBEDDINGS", str(tmp_path / "embeddings"))
+    monkeypatch.setattr(cache_eligibilite, "_cache_partage", None)
+    db.init_db()
+    init_jobs()
+    init_reprise()
+    yield tmp_path
+    with db._verrou_db:
+        for chemin in (config.CHEMIN_DB_HISTORIQUE, config.CHEMIN_DB_TUNISIE):
+            conn = db._connexions.pop(chemin, None)
+            if conn is not None:
+                conn.close()
+
+
+class _EncodeurFactice:
+    """Sac de trigrammes de caractères haché : deux adresses proches ont des vecteurs proches."""
+
+    max_seq_length = 128
+    dimension = 256
+
+    def encode(self, textes, batch_size=None, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        vecteurs = np.zeros((len(textes), self.dimension), dtype=np.float32)
+        for i, texte in enumerate(textes):
+            texte = f"  {str(texte).lower()} "
+            for j in range(len(texte) - 2):
+                h = int(hashlib.md5(texte[j:j + 3].encode("utf-8")).hexdigest()[:8], 16)
+                vecteurs[i, h % self.dimension] += 1.0
+        if normalize_embeddings:
+            vecteurs /= np.maximum(np.linalg.norm(vecteurs, axis=1, keepdims=True), 1e-12)
+        return vecteurs
+
+
+@pytest.fixture
+def encodeur_factice(monkeypatch):
+    """Remplace le modèle NLP par l'encodeur factice et réinitialise les ressources de référence."""
+    import correctionIA
+
+    encodeur = _EncodeurFactice()
+    monkeypatch.setattr(correctionIA, "obtenir_modele", lambda nom_modele=None, backend=None: encodeur)
+    monkeypatch.setattr(correctionIA, "_embeddings_base", None)
+    monkeypatch.setattr(correctionIA, "_index_adresses", None)
+    monkeypatch.setattr(correctionIA, "_index_cherche", True)
+    monkeypatch.setattr(correctionIA, "_index_lexical", None)
+    return encodeur
+
+
+@pytest.fixture
+def stub_orange(monkeypatch):
+    """API Orange rejouée en local : le fournisseur HTTP ne sort pas de la machine."""
+    from stub_orange import demarrer_stub
+
+    serveur, url_base = demarrer_stub()
+    monkeypatch.setattr(config, "URL_API_ADRESSES", f"{url_base}/api/eligibilite/adresses")
+    monkeypatch.setattr(config, "URL_API_ELIGIBILITE", f"{url_base}/api/eligibilite/test")
+    monkeypatch.setattr(config, "HTTP_BACKOFF_S", 0.01)
+    yield url_base
+    serveur.shutdown()
+    serveur.server_close()
@@ -0,0 +1,90 @@
+"""Archivage Parquet : les lignes archivées quittent la base mais restent comptées dans les agrégats."""
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import db
+from archivage import archiver_historique, charger_archives
+from operateurs import COLONNES_OPERATEURS, couverture_agregee, init_operateurs, sauvegarder_resultats_operateurs
+
+IL_Y_A_DEUX_ANS = datetime.now() - timedelta(days=730)
+
+
+class _DateFixe(datetime):
+    """datetime dont now() rend IL_Y_A_DEUX_ANS : lignes vérifiées (et agrégées) à cette date."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return IL_Y_A_DEUX_ANS
+
+
+def _sauvegarder(adresses, statut, monkeypatch=None):
+    """Enregistre les adresses dans l'historique ; datées d'il y a deux ans si `monkeypatch` est fourni."""
+    df = pd.DataFrame({"Adresse saisie": adresses, "Adresse corrigée": adresses,
+                       "Statut éligibilité": [statut] * len(adresses)})
+    if monkeypatch is None:
+        db.sauvegarder_resultats(df)
+        return
+    with monkeypatch.context() as m:
+        m.setattr(db, "datetime", _DateFixe)
+        db.sauvegarder_resultats(df)
+
+
+def _totaux(df):
+    return dict(zip(df["Statut"], df["Nombre"]))
+
+
+def test_historique_archive_reste_compte(bases, monkeypatch):
+    _sauvegarder(["1 Rue A, Paris", "2 Rue B, Paris"], "Éligible", monkeypatch)
+    _sauvegarder(["3 Rue C, Paris"], "Non éligible", monkeypatch)
+    _sauvegarder(["4 Rue D, Paris"], "Éligible")
+
+    assert archiver_historique(jours=365)["historique"] == 3
+
+    page, _ = db.charger_page_historique()
+    assert page["adresse_saisie"].tolist() == ["4 Rue D, Paris"]
+    archives = charger_archives("historique")
+    assert archives["adresse_saisie"].tolist() == ["1 Rue A, Paris", "2 Rue B, Paris", "3 Rue C, Paris"]
+    assert _totaux(db.compter_historique()) == {"Éligible": 3, "Non éligible": 1}
+    evolution = db.evolution_historique(date_fin=(IL_Y_A_DEUX_ANS + timedelta(days=1)).date().isoformat())
+    assert evolution["Nombre"].sum() == 3
+    # Recherche par adresse : seules les lignes encore en base sont comptées
+    assert _totaux(db.compter_historique(recherche="Rue A")) == {}
+
+
+def test_archivage_relance_sans_doublon(bases, monkeypatch):
+    _sauvegarder(["1 Rue A, Paris"], "Éligible", monkeypatch)
+    archiver_historique(jours=365)
+    assert archiver_historique(jours=365) == {"historique": 0, "historique_eligibilite": 0}
+    assert len(charger_archives("historique")) == 1
+    assert _totaux(db.compter_historique()) == {"Éligible": 1}
+
+
+def test_agregats_crees_depuis_le_detail_avant_archivage(bases, monkeypatch):
+    # Base antérieure aux agrégats : ils sont construits à partir des lignes avant toute suppression
+    _sauvegarder(["1 Rue A, Paris", "2 Rue B, Paris"], "Éligible", monkeypatch)
+    with db._verrou_db, db.connexion() as conn:
+        conn.execute("DROP TABLE agregats_historique")
+    archiver_historique(jours=365)
+    assert _totaux(db.compter_historique()) == {"Éligible": 2}
+
+
+def test_couverture_archivee_reste_comptee(bases):
+    assert couverture_agregee().empty
+
+    df = pd.DataFrame([
+        {"gouvernorat": "Tunis", "adresse": "Rue 1", "fibre_eligible": 1, "operateur": "Orange",
+         "date_verif": IL_Y_A_DEUX_ANS.isoformat()},
+        {"gouvernorat": "Tunis", "adresse": "Rue 2", "fibre_eligible": 0, "operateur": "Orange",
+         "date_verif": IL_Y_A_DEUX_ANS.isoformat()},
+        {"gouvernorat": "Tunis", "adresse": "Rue 3", "fibre_eligible": 1, "operateur": "Orange",
+         "date_verif": datetime.now().isoformat()},
+    ], columns=COLONNES_OPERATEURS)
+    init_operateurs()
+    sauvegarder_resultats_operateurs(df)
+
+    assert archiver_historique(jours=365)["historique_eligibilite"] == 2
+    assert len(charger_archives("historique_eligibilite")) == 2
+    couverture = couverture_agregee(par=("gouvernorat", "operateur", "technologie"))
+    assert couverture[["eligibles", "non_eligibles"]].values.tolist() == [[2, 1]]
+    assert couverture["taux_eligibilite"].tolist() == [0.667]
@@ -0,0 +1,57 @@
+"""Banc d'essai : mesures cohérentes, sans division par zéro, contre le stub local."""
+import argparse
+
+import pytest
+
+import benchmark
+import config
+import http_orange
+import scraping
+from http_orange import FournisseurHTTPOrange
+from stub_orange import charger_enregistrements, demarrer_stub
+
+
+@pytest.fixture
+def url_stub():
+    serveur, url_base = demarrer_stub()
+    yield url_base
+    serveur.shutdown()
+    serveur.server_close()
+
+
+def test_debit_et_percentiles_sans_duree():
+    assert benchmark.debit(10, 0) is None
+    assert benchmark.debit(10, 4) == 2.5
+    assert benchmark.percentiles([]) == {}
+    assert benchmark.percentiles([1.0, 2.0, 3.0])["p50_s"] == 2.0
+
+
+def test_latence_par_requete(url_stub):
+    adresses = [enr["params"]["q"] for enr in charger_enregistrements()
+                if enr["chemin"] == "/api/eligibilite/adresses" and enr.get("params", {}).get("q")] * 2
+    observer_http, observer_scraping = http_orange.observer, scraping.observer
+    fournisseur = FournisseurHTTPOrange(url_adresses=f"{url_stub}/api/eligibilite/adresses",
+                                        url_eligibilite=f"{url_stub}/api/eligibilite/test", concurrence=1)
+    mesures = benchmark._mesurer_fournisseur(fournisseur, adresses)
+
+    assert mesures["nb"] == len(adresses) and mesures["echecs"] == 0
+    # Une requête à la fois : chaque latence est une part de la durée totale, pas un écart entre résultats
+    assert 0 < mesures["p50_s"] <= mesures["max_s"] <= mesures["duree_s"]
+    assert mesures["p50_s"] * len(adresses) <= mesures["duree_s"] * 1.5
+    assert 0 < mesures["premier_resultat_s"] <= mesures["duree_s"]
+    assert (http_orange.observer, scraping.observer) == (observer_http, observer_scraping)
+
+
+def test_persistance_dans_le_dossier_temporaire(tmp_path):
+    chemin_initial = config.CHEMIN_DB_HISTORIQUE
+    resultats = benchmark.suite_persistance(argparse.Namespace(tailles=[1, 200]), str(tmp_path))
+    assert config.CHEMIN_DB_HISTORIQUE == chemin_initial
+    assert set(resultats) == {"lignes_1", "lignes_200"}
+    assert (tmp_path / "historique_200.db").exists()
+
+
+def test_comparer_signale_les_regressions(capsys):
+    ancien = {"suites": {"export": {"lignes_10": {"csv_s": 1.0, "excel_s": 0.0, "csv_mo": 1.0}}}}
+    nouveau = {"suites": {"export": {"lignes_10": {"csv_s": 1.5, "excel_s": 0.2, "csv_mo": 3.0}}}}
+    assert benchmark.comparer(nouveau, ancien) == 1
+    assert "export.lignes_10.csv_s" in capsys.readouterr().out
@@ -0,0 +1,80 @@
+"""Cache des résultats : éviction LRU, TTL, lecture en base, échecs jamais servis."""
+import time
+
+import pandas as pd
+
+from cache_eligibilite import CacheEligibilite, FournisseurAvecCache
+from db import sauvegarder_resultats
+from scraping import MESSAGE_ECHEC
+
+ELIGIBLE_FTTH = "Éligible à la fibre (FTTH)"
+
+
+class FournisseurFactice:
+    nom = "factice"
+
+    def __init__(self, statut=ELIGIBLE_FTTH):
+        self.statut = statut
+        self.adresses = []
+
+    def verifier(self, liste_adresses, sur_resultat=None):
+        self.adresses += liste_adresses
+        resultats = [(adresse, self.statut) for adresse in liste_adresses]
+        if sur_resultat is not None:
+            for i, (adresse, statut) in enumerate(resultats):
+                sur_resultat(i, adresse, statut)
+        return resultats, []
+
+
+def _sauvegarder(adresses, statut):
+    sauvegarder_resultats(pd.DataFrame({"Adresse saisie": adresses, "Adresse corrigée": adresses,
+                                        "Statut éligibilité": [statut] * len(adresses)}))
+
+
+def test_lru_evince_la_plus_ancienne_entree(bases):
+    cache = CacheEligibilite(taille_lru=2)
+    cache.ecrire([("1 Rue A", "A"), ("2 Rue B", "B")])
+    assert cache.lire(["1 Rue A"]) == {0: "A"}
+    cache.ecrire([("3 Rue C", "C")])
+    # « 2 Rue B », la moins récemment lue, est évincée
+    assert cache.lire(["1 Rue A", "2 Rue B", "3 Rue C"]) == {0: "A", 2: "C"}
+    assert cache.compteurs()["entrees_lru"] == 2
+
+
+def test_entree_expiree_ignoree(bases):
+    cache = CacheEligibilite(ttl_s=60)
+    cache._ecrire_lru("1 rue a", "A", time.time() - 120)
+    assert cache.lire(["1 Rue A"]) == {}
+    assert cache.compteurs()["misses"] == 1
+
+
+def test_echecs_jamais_mis_en_cache(bases):
+    cache = CacheEligibilite()
+    cache.ecrire([("1 Rue A", MESSAGE_ECHEC), ("2 Rue B", ELIGIBLE_FTTH)])
+    assert cache.lire(["1 Rue A", "2 Rue B"]) == {1: ELIGIBLE_FTTH}
+
+
+def test_lecture_en_base_hors_echecs(bases):
+    _sauvegarder(["1 Rue A, Paris"], ELIGIBLE_FTTH)
+    _sauvegarder(["2 Rue B, Paris"], MESSAGE_ECHEC)
+    cache = CacheEligibilite()
+    assert cache.lire(["1 rue a paris", "2 Rue B, Paris"]) == {0: ELIGIBLE_FTTH}
+    compteurs = cache.compteurs()
+    assert (compteurs["hits_sqlite"], compteurs["misses"]) == (1, 1)
+
+
+def test_fournisseur_ne_reverifie_que_les_absents(bases):
+    _sauvegarder(["1 Rue A, Paris"], ELIGIBLE_FTTH)
+    fournisseur = FournisseurFactice(statut=MESSAGE_ECHEC)
+    verificateur = FournisseurAvecCache(fournisseur, cache=CacheEligibilite())
+    rappels = {}
+    resultats, stats = verificateur.verifier(["1 Rue A, Paris", "2 Rue B, Paris"],
+                                             lambda i, adresse, statut: rappels.__setitem__(i, statut))
+    assert fournisseur.adresses == ["2 Rue B, Paris"]
+    assert resultats == [("1 Rue A, Paris", ELIGIBLE_FTTH), ("2 Rue B, Paris", MESSAGE_ECHEC)]
+    assert rappels == {0: ELIGIBLE_FTTH, 1: MESSAGE_ECHEC}
+    assert stats[-1]["servies_par_cache"] == 1
+
+    # L'échec n'a pas été mis en cache : l'adresse est revérifiée
+    verificateur.verifier(["2 Rue B, Paris"])
+    assert fournisseur.adresses == ["2 Rue B, Paris", "2 Rue B, Paris"]
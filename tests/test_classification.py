@@ -0,0 +1,50 @@
+"""Classification des statuts bruts : les variantes négatives ne sont jamais « Éligible »."""
+import pandas as pd
+import pytest
+
+from classification import ELIGIBLE, INDETERMINE, NON_ELIGIBLE, classifier_statuts, statistiques
+from scraping import MESSAGE_ECHEC
+
+
+@pytest.mark.parametrize("statut", [
+    "Non éligible",
+    "NON ÉLIGIBLE à la fibre",
+    "non-eligible",
+    "Adresse inéligible",
+    "Vous n'êtes pas éligible",
+    "Ce logement n'est pas éligible à la fibre (FTTH)",
+    "Non raccordable",
+])
+def test_variantes_negatives(statut):
+    classes = classifier_statuts(pd.Series([statut]))
+    assert classes["Éligible ?"].iloc[0] == NON_ELIGIBLE
+    # Une adresse non éligible n'a pas de technologie, même citée dans le texte
+    assert classes["Technologie"].iloc[0] == "Inconnue"
+
+
+@pytest.mark.parametrize("statut, technologie", [
+    ("Éligible à la fibre (FTTH)", "FTTH"),
+    ("eligible FTTO", "FTTO"),
+    ("Éligible VDSL2", "xDSL"),
+    ("Raccordable 4G", "4G/5G"),
+    ("Éligible", "Inconnue"),
+])
+def test_variantes_positives(statut, technologie):
+    classes = classifier_statuts(pd.Series([statut]))
+    assert classes["Éligible ?"].iloc[0] == ELIGIBLE
+    assert classes["Technologie"].iloc[0] == technologie
+
+
+@pytest.mark.parametrize("statut", [MESSAGE_ECHEC, "Erreur : non éligible ?", "Adresse introuvable", "", None, "???"])
+def test_echecs_et_inconnus_indetermines(statut):
+    assert classifier_statuts(pd.Series([statut]))["Éligible ?"].iloc[0] == INDETERMINE
+
+
+def test_redistribution_aux_lignes_et_statistiques():
+    statuts = pd.Series(["Éligible à la fibre (FTTH)", "Non éligible", "Éligible à la fibre (FTTH)", MESSAGE_ECHEC],
+                        index=[10, 11, 12, 13])
+    classes = classifier_statuts(statuts)
+    assert classes.index.tolist() == [10, 11, 12, 13]
+    assert classes["Éligible ?"].tolist() == [ELIGIBLE, NON_ELIGIBLE, ELIGIBLE, INDETERMINE]
+    stats = statistiques(classes)
+    assert dict(zip(stats["Statut"], stats["Nombre"])) == {ELIGIBLE: 2, NON_ELIGIBLE: 1, INDETERMINE: 1}
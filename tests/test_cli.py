@@ -0,0 +1,64 @@
+"""Ligne de commande : fichier vérifié de bout en bout contre le stub Orange, sans Streamlit."""
+import json
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import cli
+import config
+import db
+from correctionIA import BASE_ADRESSES
+
+
+@pytest.fixture
+def fichier_adresses(tmp_path):
+    chemin = tmp_path / "adresses.csv"
+    adresses = BASE_ADRESSES + [BASE_ADRESSES[0].lower(), BASE_ADRESSES[2]]
+    pd.DataFrame({"adresse": adresses}).to_csv(chemin, index=False)
+    return chemin, adresses
+
+
+def test_fichier_traite_enregistre_et_exporte(bases, encodeur_factice, stub_orange, fichier_adresses,
+                                             tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(config, "HTTP_CONCURRENCE", config.HTTP_CONCURRENCE)
+    entree, adresses = fichier_adresses
+    sortie, chemin_bilan = tmp_path / "resultats.csv", tmp_path / "bilan.json"
+    code = cli.main([str(entree), "-o", str(sortie), "--fournisseur", "http", "--concurrence-http", "3",
+                     "--taille-bloc", "3", "--bilan", str(chemin_bilan)])
+    assert code == 0 and config.HTTP_CONCURRENCE == 3
+
+    bilan = json.loads(chemin_bilan.read_text(encoding="utf-8"))
+    assert bilan["lignes"] == len(adresses) and bilan["blocs"] == 3
+    assert bilan["adresses_verifiees"] == len(BASE_ADRESSES)
+    resultats = pd.read_csv(sortie)
+    assert len(resultats) == len(adresses)
+    # ADR1, 2 et 4 sont éligibles dans les enregistrements du stub ; la saisie en minuscules est corrigée en ADR1
+    assert resultats["Adresse corrigée"].tolist() == adresses[:5] + [BASE_ADRESSES[0], BASE_ADRESSES[2]]
+    assert bilan["statuts"] == {"Éligible": 4, "Non éligible": 3, "Indéterminé": 0}
+    assert resultats["Éligible ?"].value_counts().to_dict() == {"Éligible": 4, "Non éligible": 3}
+    with db._verrou_db:
+        assert db.connexion().execute("SELECT COUNT(*) FROM historique").fetchone()[0] == len(adresses)
+    sorties = capsys.readouterr().out
+    assert f"{len(adresses)} lignes traitées" in sorties and f"Résultats écrits dans {sortie}" in sorties
+
+
+def test_colonne_manquante(bases, encodeur_factice, stub_orange, tmp_path, capsys):
+    entree = tmp_path / "sans_adresse.csv"
+    pd.DataFrame({"rue": BASE_ADRESSES}).to_csv(entree, index=False)
+    assert cli.main([str(entree), "--fournisseur", "http"]) == 2
+    assert capsys.readouterr().err.startswith("Erreur : ")
+    with db._verrou_db:
+        assert db.connexion().execute("SELECT COUNT(*) FROM historique").fetchone()[0] == 0
+
+
+def test_resultats_par_operateur(bases, encodeur_factice, stub_orange, fichier_adresses, capsys):
+    entree, adresses = fichier_adresses
+    assert cli.main([str(entree), "--fournisseur", "http", "--operateurs", "orange_http"]) == 0
+    with sqlite3.connect(config.CHEMIN_DB_TUNISIE) as conn:
+        nb_operateur = conn.execute("SELECT COUNT(*) FROM historique_eligibilite").fetchone()[0]
+    conn.close()
+    assert nb_operateur == len(BASE_ADRESSES)  # une ligne par adresse corrigée distincte
+    assert f"{nb_operateur} résultats opérateur enregistrés dans {config.CHEMIN_DB_TUNISIE}" in capsys.readouterr().out
+    with db._verrou_db:
+        assert db.connexion().execute("SELECT COUNT(*) FROM historique").fetchone()[0] == len(adresses)
@@ -0,0 +1,77 @@
+"""Correction des adresses par lots, avec l'encodeur factice (aucun modèle téléchargé)."""
+import os
+
+import pytest
+
+import config
+import correctionIA
+from correctionIA import BASE_ADRESSES, corriger_adresse_ia, corriger_adresses_detail, corriger_adresses_ia
+
+SAISIES = ["12 rue de la republique paris", "8 Rue Victor Hugo Lyon", "Tour Eiffel", "12 rue de la republique paris"]
+
+
+def test_lot_identique_a_l_unitaire(encodeur_factice):
+    corrigees, scores = corriger_adresses_ia(SAISIES)
+    for adresse, corrigee, score in zip(SAISIES, corrigees, scores):
+        assert corriger_adresse_ia(adresse) == (corrigee, score)
+
+
+def test_bert_sous_le_seuil_garde_la_saisie(encodeur_factice):
+    detail = corriger_adresses_detail(SAISIES, prefiltre=False)
+    assert detail["corrigees"].tolist() == [BASE_ADRESSES[0], BASE_ADRESSES[2], "Tour Eiffel", BASE_ADRESSES[0]]
+    assert (detail["etapes"] == "bert").all()
+    assert detail["scores"][2] < config.SEUIL_CORRECTION < detail["scores"][0]
+
+
+def test_lot_par_petits_paquets(encodeur_factice, monkeypatch):
+    monkeypatch.setattr(correctionIA.config, "TAILLE_BLOC_SIMILARITE", 1)
+    attendu = corriger_adresses_detail(SAISIES, prefiltre=False)["corrigees"].tolist()
+    assert corriger_adresses_detail(SAISIES, taille_lot=1, prefiltre=False)["corrigees"].tolist() == attendu
+
+
+def test_lot_vide(encodeur_factice):
+    corrigees, scores = corriger_adresses_ia([])
+    assert len(corrigees) == 0 and len(scores) == 0
+
+
+# ==================== BACKENDS D'INFÉRENCE ====================
+
+def test_identifiant_modele(monkeypatch):
+    monkeypatch.setattr(config, "LONGUEUR_MAX_NLP", 64)
+    assert correctionIA.identifiant_modele("torch") == config.NOM_MODELE_NLP
+    assert correctionIA.identifiant_modele("onnx-int8") == f"{config.NOM_MODELE_NLP}@onnx-int8:64"
+    monkeypatch.setattr(config, "LONGUEUR_MAX_NLP", 0)
+    assert correctionIA.identifiant_modele("int8") == f"{config.NOM_MODELE_NLP}@int8"
+
+
+def test_validation_enregistree_puis_verifiee(encodeur_factice, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DOSSIER_EMBEDDINGS", str(tmp_path))
+    with pytest.raises(RuntimeError):
+        correctionIA._verifier_validation("int8")
+    rapport = correctionIA.comparer_backends(SAISIES, "int8")
+    assert rapport["nb"] == len(SAISIES) and rapport["accord"] == 1.0 and rapport["ecarts"] == []
+    correctionIA._verifier_validation("int8")
+    # Une autre troncature change l'identifiant du modèle : la validation ne vaut plus
+    monkeypatch.setattr(config, "LONGUEUR_MAX_NLP", config.LONGUEUR_MAX_NLP + 1)
+    with pytest.raises(RuntimeError):
+        correctionIA._verifier_validation("int8")
+
+
+def test_accord_insuffisant_non_enregistre(encodeur_factice, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DOSSIER_EMBEDDINGS", str(tmp_path))
+    with pytest.raises(ValueError):
+        correctionIA.comparer_backends(SAISIES, "onnx", accord_min=1.01)
+    assert not os.path.exists(correctionIA._chemin_validation("onnx"))
+
+
+def test_backend_configure_non_valide_refuse(tmp_path, monkeypatch):
+    charges = []
+    monkeypatch.setattr(config, "DOSSIER_EMBEDDINGS", str(tmp_path))
+    monkeypatch.setattr(config, "BACKEND_NLP", "int8")
+    monkeypatch.setattr(correctionIA, "_modeles", {})
+    monkeypatch.setattr(correctionIA, "_charger_modele", lambda nom, backend: charges.append(backend) or backend)
+    with pytest.raises(RuntimeError):
+        correctionIA.obtenir_modele()
+    # Un backend explicite (validation en cours) n'est pas contrôlé
+    assert correctionIA.obtenir_modele(backend="int8") == "int8"
+    assert charges == ["int8"]
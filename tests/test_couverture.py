@@ -0,0 +1,82 @@
+"""Moteur de couverture : la grille spatiale donne les mêmes réponses qu'un parcours exhaustif."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from couverture import TECHNOLOGIES, MoteurCouverture, distance_km
+
+
+@pytest.fixture(scope="module")
+def zones():
+    rng = np.random.default_rng(0)
+    n = 400
+    return pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "latitude": rng.uniform(33.0, 37.0, n),
+        "longitude": rng.uniform(8.0, 11.0, n),
+        "fibre_coverage": rng.random(n) < 0.3,
+        "g4_coverage": rng.random(n) < 0.8,
+        "g5_coverage": rng.random(n) < 0.1,
+        "operateur": rng.choice(["Orange", "Ooredoo", "Tunisie Telecom"], n),
+    })
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = np.random.default_rng(1)
+    # Quelques points hors de la zone couverte : la zone la plus proche est loin
+    return pd.DataFrame({"latitude": np.r_[rng.uniform(33.0, 37.0, 200), 30.0, np.nan],
+                         "longitude": np.r_[rng.uniform(8.0, 11.0, 200), 5.0, 10.0]})
+
+
+def _exhaustif(zones, lat, lon, masque):
+    d = distance_km(lat, lon, zones["latitude"].to_numpy(), zones["longitude"].to_numpy())
+    d = np.where(masque, d, np.inf)
+    return int(zones["id"].iloc[d.argmin()]), float(d.min())
+
+
+@pytest.mark.parametrize("operateur, technologie", [(None, None), ("Orange", None), (None, "fibre"),
+                                                    ("Ooredoo", "g5")])
+def test_zone_la_plus_proche(zones, points, operateur, technologie):
+    moteur = MoteurCouverture(zones)
+    masque = np.ones(len(zones), dtype=bool)
+    if operateur:
+        masque &= zones["operateur"].to_numpy() == operateur
+    if technologie:
+        masque &= zones[f"{technologie}_coverage"].to_numpy()
+    for lat, lon in points.dropna().itertuples(index=False):
+        zone = moteur.zone_la_plus_proche(lat, lon, operateur=operateur, technologie=technologie)
+        attendu_id, attendu_distance = _exhaustif(zones, lat, lon, masque)
+        assert zone["distance_km"] == pytest.approx(attendu_distance)
+        assert zone["id"] == attendu_id
+
+
+def test_rayon_max(zones):
+    moteur = MoteurCouverture(zones)
+    assert moteur.zone_la_plus_proche(30.0, 5.0, rayon_max_km=50) is None
+    assert moteur.couverture_a(30.0, 5.0)["fibre"] is False
+
+
+def test_couverture_dataframe_identique_au_point_par_point(zones, points):
+    moteur = MoteurCouverture(zones)
+    rayon_km = 15.0
+    resultat = moteur.couverture_dataframe(points, rayon_km=rayon_km)
+    for i, (lat, lon) in enumerate(points.itertuples(index=False)):
+        ligne = resultat.iloc[i]
+        if np.isnan(lat):
+            assert ligne["zone_id"] == -1 and np.isnan(ligne["distance_km"])
+            continue
+        zone = moteur.zone_la_plus_proche(lat, lon)
+        assert ligne["zone_id"] == zone["id"]
+        assert ligne["distance_km"] == pytest.approx(zone["distance_km"])
+        couverture = moteur.couverture_a(lat, lon, rayon_km=rayon_km)
+        for techno in TECHNOLOGIES:
+            assert bool(ligne[f"{techno}_couvert"]) == couverture[techno]
+
+
+def test_sans_zone():
+    moteur = MoteurCouverture(pd.DataFrame(columns=["id", "latitude", "longitude", "fibre_coverage",
+                                                    "g4_coverage", "g5_coverage", "operateur"]))
+    assert moteur.zone_la_plus_proche(36.8, 10.2) is None
+    resultat = moteur.couverture_dataframe(pd.DataFrame({"latitude": [36.8], "longitude": [10.2]}))
+    assert resultat["zone_id"].tolist() == [-1] and not resultat["fibre_couvert"].any()
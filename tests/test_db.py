@@ -0,0 +1,96 @@
+"""Historique : écriture en masse, pagination keyset et filtres SQL."""
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import db
+
+
+def _sauvegarder(adresses, statut):
+    db.sauvegarder_resultats(pd.DataFrame({"Adresse saisie": adresses, "Adresse corrigée": adresses,
+                                           "Statut éligibilité": [statut] * len(adresses)}))
+
+
+def test_sauvegarde_en_masse(bases):
+    _sauvegarder(["12 Rue de la République, Paris", "8 Rue Victor Hugo, Lyon"], "Éligible")
+    _sauvegarder([], "Éligible")
+    with db._verrou_db:
+        lignes = db.connexion().execute("SELECT adresse_normalisee, statut FROM historique ORDER BY id").fetchall()
+    assert [statut for _, statut in lignes] == ["Éligible", "Éligible"]
+    assert all(cle for cle, _ in lignes)
+    assert _totaux(db.compter_historique()) == {"Éligible": 2}
+    assert db.charger_page_historique(recherche="Victor")[0]["id"].tolist() == [2]
+
+
+def test_sauvegarde_annulee_en_bloc(bases, monkeypatch):
+    _sauvegarder(["1 Rue A, Paris"], "Éligible")
+
+    def echec(conn, apres_id):
+        raise RuntimeError("disque plein")
+    monkeypatch.setattr(db, "_indexer_fts", echec)
+    with pytest.raises(RuntimeError):
+        _sauvegarder(["2 Rue B, Paris", "3 Rue C, Paris"], "Non éligible")
+    # Ni lignes, ni agrégats partiels
+    assert len(db.charger_historique()) == 1
+    assert _totaux(db.compter_historique()) == {"Éligible": 1}
+
+
+def _totaux(df):
+    return dict(zip(df["Statut"], df["Nombre"]))
+
+
+def _parcourir(limite, **filtres):
+    """Toutes les pages, dans l'ordre, en suivant le curseur."""
+    pages, curseur = [], None
+    while True:
+        df_page, curseur = db.charger_page_historique(limite=limite, curseur=curseur, **filtres)
+        pages.append(df_page)
+        if curseur is None:
+            return pages
+
+
+def test_pages_sans_doublon_ni_trou_a_date_egale(bases):
+    # Un même enregistrement partage la même date_verif : l'id départage les lignes
+    _sauvegarder([f"{i} Rue A, Paris" for i in range(10)], "Éligible")
+    pages = _parcourir(3)
+    assert [len(p) for p in pages] == [3, 3, 3, 1]
+    ids = pd.concat(pages)["id"].tolist()
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 10
+
+
+def test_derniere_page_pleine_sans_curseur(bases):
+    _sauvegarder([f"{i} Rue A, Paris" for i in range(6)], "Éligible")
+    pages = _parcourir(3)
+    assert [len(p) for p in pages] == [3, 3]
+
+
+def test_ordre_chronologique_decroissant(bases):
+    _sauvegarder(["1 Rue A, Paris"], "Éligible")
+    with db._verrou_db, db.connexion() as conn:
+        conn.execute("UPDATE historique SET date_verif = ? WHERE id = 1", (datetime(2030, 1, 1).isoformat(),))
+    _sauvegarder(["2 Rue B, Paris", "3 Rue C, Paris"], "Éligible")
+    ids = pd.concat(_parcourir(1))["id"].tolist()
+    assert ids == [1, 3, 2]
+
+
+def test_pagination_avec_filtres(bases):
+    _sauvegarder([f"{i} Rue Victor Hugo, Lyon" for i in range(5)], "Éligible")
+    _sauvegarder([f"{i} Rue Nationale, Lille" for i in range(5)], "Non éligible")
+    _sauvegarder([f"{i} Rue Victor Hugo, Lyon" for i in range(5, 8)], "Non éligible")
+
+    df = pd.concat(_parcourir(2, statuts=["Non éligible"]))
+    assert len(df) == 8 and set(df["statut"]) == {"Non éligible"}
+
+    df = pd.concat(_parcourir(2, statuts=["Non éligible"], recherche="Victor Hugo"))
+    assert df["adresse_saisie"].tolist() == [f"{i} Rue Victor Hugo, Lyon" for i in range(7, 4, -1)]
+
+    aujourd_hui = datetime.now().date().isoformat()
+    assert len(pd.concat(_parcourir(4, date_debut=aujourd_hui, date_fin=aujourd_hui))) == 13
+    assert pd.concat(_parcourir(4, date_fin="2000-01-01")).empty
+
+
+def test_compter_historique_filtre_par_adresse(bases):
+    _sauvegarder(["1 Rue Victor Hugo, Lyon", "2 Rue Victor Hugo, Lyon"], "Éligible")
+    _sauvegarder(["3 Rue Nationale, Lille"], "Non éligible")
+    assert _totaux(db.compter_historique(recherche="Victor")) == {"Éligible": 2}
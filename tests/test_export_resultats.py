@@ -0,0 +1,63 @@
+"""Exports en mémoire et écriture en flux : relecture identique dans chaque format."""
+import io
+
+import pandas as pd
+import pytest
+
+import export_resultats
+from classification import classifier_statuts
+from export_resultats import EcrivainResultats, exporter, formats_disponibles
+
+
+def _resultats(nb=5, decalage=0):
+    df = pd.DataFrame({
+        "Adresse saisie": [f"{i} rue a" for i in range(decalage, decalage + nb)],
+        "Adresse corrigée": [f"{i} Rue A, Paris" for i in range(decalage, decalage + nb)],
+        "Statut éligibilité": ["Éligible à la fibre (FTTH)", "Non éligible"] * (nb // 2) + ["Non éligible"] * (nb % 2),
+    })
+    return pd.concat([df, classifier_statuts(df["Statut éligibilité"])], axis=1)
+
+
+def _relire(octets_ou_chemin, extension):
+    source = io.BytesIO(octets_ou_chemin) if isinstance(octets_ou_chemin, bytes) else octets_ou_chemin
+    if extension == "csv":
+        return pd.read_csv(source, encoding="utf-8-sig")
+    if extension == "parquet":
+        return pd.read_parquet(source)
+    return pd.read_excel(source)
+
+
+@pytest.mark.parametrize("format_export", ["Excel", "CSV", "Parquet"])
+def test_export_relu_a_l_identique(format_export):
+    df = _resultats()
+    octets, extension, _ = exporter(df, format_export)
+    relu = _relire(octets, extension)
+    assert relu.columns.tolist() == df.columns.tolist()
+    assert relu.astype(str).values.tolist() == df.astype(str).values.tolist()
+
+
+def test_excel_refuse_au_dela_de_la_limite(monkeypatch):
+    monkeypatch.setattr(export_resultats, "NB_LIGNES_MAX_EXCEL", 5)
+    assert "Excel" in formats_disponibles(4)
+    assert "Excel" not in formats_disponibles(5)
+    with pytest.raises(ValueError):
+        exporter(_resultats(5), "Excel")
+
+
+@pytest.mark.parametrize("extension", ["csv", "parquet", "xlsx"])
+def test_ecriture_par_blocs(tmp_path, extension):
+    chemin = str(tmp_path / f"resultats.{extension}")
+    blocs = [_resultats(4), _resultats(3, decalage=4)]
+    with EcrivainResultats(chemin) as ecrivain:
+        for bloc in blocs:
+            ecrivain.ecrire(bloc)
+    assert ecrivain.nb_lignes == 7
+    attendu = pd.concat(blocs, ignore_index=True)
+    relu = _relire(chemin, extension)
+    assert relu["Adresse saisie"].tolist() == attendu["Adresse saisie"].tolist()
+    assert relu["Éligible ?"].astype(str).tolist() == attendu["Éligible ?"].astype(str).tolist()
+
+
+def test_ecriture_format_inconnu(tmp_path):
+    with pytest.raises(ValueError):
+        EcrivainResultats(str(tmp_path / "resultats.json"))
@@ -0,0 +1,85 @@
+"""Backend HTTP contre le stub Orange (réponses enregistrées), et repli sur les seuls échecs."""
+import json
+
+import pytest
+
+from correctionIA import BASE_ADRESSES
+from fournisseurs import FournisseurAvecRepli
+from http_orange import FournisseurHTTPOrange, texte_statut
+from scraping import MESSAGE_ECHEC
+from stub_orange import demarrer_stub
+
+
+def _fournisseur(url_base, **options):
+    return FournisseurHTTPOrange(url_adresses=f"{url_base}/api/eligibilite/adresses",
+                                 url_eligibilite=f"{url_base}/api/eligibilite/test", backoff_s=0.01, **options)
+
+
+@pytest.fixture
+def url_stub():
+    serveur, url_base = demarrer_stub()
+    yield url_base
+    serveur.shutdown()
+    serveur.server_close()
+
+
+def test_texte_statut():
+    assert texte_statut({"eligible": True, "technologie": "FTTO"}) == "Éligible à la fibre (FTTO)"
+    assert texte_statut({"eligible": True}) == "Éligible à la fibre (FTTH)"
+    assert texte_statut({"eligible": False}) == "Non éligible à la fibre"
+    assert texte_statut({"message": " Travaux en cours "}) == "Travaux en cours"
+
+
+def test_verification_dans_l_ordre(url_stub):
+    rappels = {}
+    resultats, stats = _fournisseur(url_stub, concurrence=3).verifier(
+        BASE_ADRESSES + ["1 Rue Inconnue, Nulle Part"], lambda i, adresse, statut: rappels.__setitem__(i, statut))
+    assert [adresse for adresse, _ in resultats] == BASE_ADRESSES + ["1 Rue Inconnue, Nulle Part"]
+    assert [statut for _, statut in resultats] == [
+        "Éligible à la fibre (FTTH)", "Éligible à la fibre (FTTH)", "Non éligible à la fibre",
+        "Éligible à la fibre (FTTH)", "Non éligible à la fibre", MESSAGE_ECHEC]
+    assert rappels == dict(enumerate(statut for _, statut in resultats))
+    assert stats[0]["erreurs"] == 1
+
+
+def test_erreur_transitoire_persistante_en_echec(tmp_path):
+    fichier = tmp_path / "enregistrements.json"
+    fichier.write_text(json.dumps({"enregistrements": [
+        {"chemin": "/api/eligibilite/adresses", "params": {"q": "1 Rue A"}, "corps": [{"id": "A"}]},
+        {"chemin": "/api/eligibilite/test", "params": {"id": "A"}, "status": 503, "corps": {}},
+    ]}), encoding="utf-8")
+    serveur, url_base = demarrer_stub(fichier=str(fichier))
+    try:
+        resultats, stats = _fournisseur(url_base, nb_essais=2).verifier(["1 Rue A"])
+    finally:
+        serveur.shutdown()
+        serveur.server_close()
+    assert resultats == [("1 Rue A", MESSAGE_ECHEC)] and stats[0]["erreurs"] == 1
+
+
+class FournisseurFixe:
+    def __init__(self, nom, statuts):
+        self.nom = nom
+        self.statuts = statuts
+        self.adresses = []
+
+    def verifier(self, liste_adresses, sur_resultat=None):
+        self.adresses += liste_adresses
+        resultats = [(adresse, self.statuts.get(adresse, MESSAGE_ECHEC)) for adresse in liste_adresses]
+        if sur_resultat is not None:
+            for i, (adresse, statut) in enumerate(resultats):
+                sur_resultat(i, adresse, statut)
+        return resultats, [{"fournisseur": self.nom}]
+
+
+def test_repli_sur_les_seuls_echecs():
+    principal = FournisseurFixe("http", {"a": "Éligible", "c": "Non éligible"})
+    repli = FournisseurFixe("selenium", {"b": "Éligible"})
+    rappels = []
+    resultats, stats = FournisseurAvecRepli(principal, repli).verifier(
+        ["a", "b", "c", "d"], lambda i, adresse, statut: rappels.append((i, statut)))
+    assert repli.adresses == ["b", "d"]
+    assert resultats == [("a", "Éligible"), ("b", "Éligible"), ("c", "Non éligible"), ("d", MESSAGE_ECHEC)]
+    # Un échec du principal n'est signalé qu'une fois, par le repli
+    assert sorted(rappels) == [(0, "Éligible"), (1, "Éligible"), (2, "Non éligible"), (3, MESSAGE_ECHEC)]
+    assert [s["fournisseur"] for s in stats] == ["http", "selenium"]
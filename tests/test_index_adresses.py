@@ -0,0 +1,49 @@
+"""Index IVF sur disque : recherche, rechargement sans réencodage, ajout par segment."""
+import numpy as np
+import pytest
+
+import correctionIA
+from index_adresses import IndexAdresses, charger_index_si_present, encoder
+
+REFERENCES = [f"{i} {voie}, {ville}" for i in range(1, 41)
+              for voie in ("Rue de la République", "Avenue Habib Bourguiba", "Rue Victor Hugo")
+              for ville in ("Paris", "Tunis")]
+
+
+@pytest.fixture
+def index(encodeur_factice, tmp_path):
+    return IndexAdresses.construire(REFERENCES, encodeur_factice, str(tmp_path / "index"), nb_listes=8)
+
+
+def test_recherche_exhaustive_retrouve_chaque_reference(index, encodeur_factice):
+    requetes = REFERENCES[::7]
+    ids, scores = index.rechercher(encoder(encodeur_factice, requetes), k=3, nprobe=index.nb_listes)
+    assert [index.adresse(i) for i in ids[:, 0]] == requetes
+    assert np.all(scores[:, 0] >= scores[:, 1])
+
+
+def test_rappel_avec_sondage_partiel(index, encodeur_factice):
+    ids, _ = index.rechercher(encoder(encodeur_factice, REFERENCES), k=1, nprobe=2)
+    trouves = sum(index.adresse(i) == reference for i, reference in zip(ids[:, 0], REFERENCES) if i >= 0)
+    assert trouves / len(REFERENCES) >= 0.9
+
+
+def test_rechargement_et_ajout(index, encodeur_factice):
+    nouvelles = ["1 Rue de Carthage, Sfax", "2 Rue de Carthage, Sfax"]
+    index.ajouter(nouvelles, encodeur_factice)
+    recharge = IndexAdresses.charger(index.dossier)
+    assert len(recharge) == len(REFERENCES) + 2 and len(recharge.segments) == 2
+    ids, _ = recharge.rechercher(encoder(encodeur_factice, nouvelles), k=1, nprobe=recharge.nb_listes)
+    assert [recharge.adresse(i) for i in ids[:, 0]] == nouvelles
+
+
+def test_index_d_un_autre_modele_refuse(index):
+    assert charger_index_si_present(index.dossier).dossier == index.dossier
+    with pytest.raises(ValueError):
+        charger_index_si_present(index.dossier, nom_modele="autre-modele")
+
+
+def test_correction_via_l_index(index, encodeur_factice):
+    correctionIA.definir_index_adresses(index)
+    corrigees, _ = correctionIA.corriger_adresses_ia(["7 rue victor hugo tunis"])
+    assert corrigees.tolist() == ["7 Rue Victor Hugo, Tunis"]
@@ -0,0 +1,72 @@
+"""Import en flux : lecture par blocs (CSV, Excel), nettoyage, mémoire des adresses bornée."""
+import io
+
+import pandas as pd
+import pytest
+
+import config
+from ingestion import adresses_nettoyees, lire_blocs_adresses, reblocs, verifier_flux
+
+
+class VerificateurCompte:
+    nom = "factice"
+
+    def __init__(self):
+        self.adresses = []
+
+    def verifier(self, liste_adresses, sur_resultat=None):
+        self.adresses += liste_adresses
+        return [(adresse, "Éligible") for adresse in liste_adresses], []
+
+
+def _csv(lignes, encodage="utf-8", entete="Adresse"):
+    return io.BytesIO(("id," + entete + "\n" + "".join(f"{i},{a}\n" for i, a in enumerate(lignes))).encode(encodage))
+
+
+def test_csv_par_blocs_colonne_seule():
+    blocs = list(lire_blocs_adresses(_csv([f"{i} Rue A" for i in range(7)]), "a.csv", taille_bloc=3))
+    assert [len(b) for b in blocs] == [3, 3, 1]
+    assert blocs[0].tolist() == ["0 Rue A", "1 Rue A", "2 Rue A"]
+
+
+def test_csv_encodage_detecte():
+    blocs = list(lire_blocs_adresses(_csv(["5 Avenue des Champs-Élysées", "Rue de Carthage"] * 20, "cp1252"), "a.csv"))
+    assert blocs[0].iloc[0] == "5 Avenue des Champs-Élysées"
+
+
+def test_colonne_adresse_absente():
+    with pytest.raises(ValueError):
+        list(lire_blocs_adresses(_csv(["x"], entete="rue"), "a.csv"))
+
+
+def test_excel_par_blocs(tmp_path):
+    chemin = tmp_path / "adresses.xlsx"
+    pd.DataFrame({"ID": range(5), " ADRESSE ": [f"{i} Rue A" for i in range(5)]}).to_excel(chemin, index=False)
+    with open(chemin, "rb") as f:
+        blocs = list(lire_blocs_adresses(f, "adresses.xlsx", taille_bloc=2))
+    assert [b.tolist() for b in blocs] == [["0 Rue A", "1 Rue A"], ["2 Rue A", "3 Rue A"], ["4 Rue A"]]
+
+
+def test_nettoyage_et_reblocs():
+    stats = {}
+    blocs = [pd.Series(["  1 Rue A ", None, "", "2 Rue B"]), pd.Series([None]), pd.Series(["3 Rue C"])]
+    listes = list(adresses_nettoyees(blocs, stats))
+    assert listes == [["1 Rue A", "2 Rue B"], ["3 Rue C"]] and stats["lignes"] == 3
+    assert list(reblocs(iter([[1, 2, 3], [4], [5, 6, 7, 8]]), 3)) == [[1, 2, 3], [4, 5, 6], [7, 8]]
+
+
+def test_doublons_entre_blocs_verifies_une_fois(encodeur_factice):
+    verificateur = VerificateurCompte()
+    blocs = [["1 Rue A", "2 Rue B"], ["1 rue a", "3 Rue C"], ["2 Rue B"]]
+    resultats = [df for df, _, _ in verifier_flux(blocs, verificateur, reprise=False)]
+    assert sorted(verificateur.adresses) == ["1 Rue A", "2 Rue B", "3 Rue C"]
+    assert [len(df) for df in resultats] == [2, 2, 1]
+
+
+def test_memoire_des_adresses_bornee(encodeur_factice, monkeypatch):
+    monkeypatch.setattr(config, "MAX_ADRESSES_CONNUES_FLUX", 2)
+    verificateur = VerificateurCompte()
+    blocs = [["1 Rue A", "2 Rue B"], ["3 Rue C"], ["2 Rue B", "1 Rue A"]]
+    list(verifier_flux(blocs, verificateur, reprise=False))
+    # « 1 Rue A », la plus ancienne, est oubliée : elle est revérifiée ; « 2 Rue B » ne l'est pas
+    assert verificateur.adresses == ["1 Rue A", "2 Rue B", "3 Rue C", "1 Rue A"]
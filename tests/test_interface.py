@@ -0,0 +1,62 @@
+"""Démarrage de l'interface Streamlit (AppTest, dans un process séparé) : imports paresseux, base Tunisie intacte."""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from conftest import RACINE
+
+pytest.importorskip("streamlit")
+
+MODULES_LOURDS = ["sentence_transformers", "torch", "onnxruntime", "fpdf", "selenium", "openpyxl", "xlsxwriter"]
+
+SCRIPT = """
+import json, sys
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+for page in sys.argv[2:]:
+    at.sidebar.radio[0].set_value(page).run()
+print(json.dumps({"exceptions": [e.value for e in at.exception], "modules": sorted(sys.modules)}))
+"""
+
+
+def demarrer_interface(tmp_path, *pages):
+    """Lance l'application puis visite `pages` ; retourne (exceptions, modules importés)."""
+    env = dict(os.environ, ELIG_MESURES="0", ELIG_DB_HISTORIQUE=str(tmp_path / "historique.db"),
+               ELIG_DB_TUNISIE=str(tmp_path / "tunisie.db"), ELIG_DOSSIER_EMBEDDINGS=str(tmp_path / "embeddings"))
+    sortie = subprocess.run([sys.executable, "-c", SCRIPT, os.path.join(RACINE, "elligibilite.py"), *pages],
+                            capture_output=True, text=True, env=env, cwd=str(tmp_path), timeout=300)
+    assert sortie.returncode == 0, sortie.stderr
+    resultat = json.loads(sortie.stdout.strip().splitlines()[-1])
+    return resultat["exceptions"], set(resultat["modules"])
+
+
+def test_demarrage_sans_modules_lourds(tmp_path):
+    exceptions, modules = demarrer_interface(tmp_path)
+    assert exceptions == []
+    assert not modules & set(MODULES_LOURDS)
+
+
+def _empreinte(chemin):
+    with open(chemin, "rb") as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def test_consultation_sans_ecriture_dans_la_base_tunisie(tmp_path):
+    # Base Tunisie au schéma d'origine (sans agrégats) : la page Historique ne doit ni la créer ni la migrer
+    chemin = tmp_path / "tunisie.db"
+    shutil.copyfile(os.path.join(RACINE, "eligibilite_tunisie.db"), chemin)
+    avant = _empreinte(chemin)
+    exceptions, _ = demarrer_interface(tmp_path, "Historique")
+    assert exceptions == []
+    assert _empreinte(chemin) == avant
+    assert not os.path.exists(f"{chemin}-wal") and not os.path.exists(f"{chemin}-journal")
+
+    chemin.unlink()
+    exceptions, _ = demarrer_interface(tmp_path, "Historique")
+    assert exceptions == [] and not chemin.exists()
@@ -0,0 +1,100 @@
+"""File de jobs : traitement par lots contre le stub Orange, annulation, reprise, récupération."""
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+import db
+import jobs
+from correctionIA import BASE_ADRESSES
+
+
+def _compter_historique():
+    with db._verrou_db:
+        return db.connexion().execute("SELECT COUNT(*) FROM historique").fetchone()[0]
+
+
+def _pid_termine():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_job_traite_par_lots_jusqu_au_bout(bases, encodeur_factice, stub_orange):
+    adresses = BASE_ADRESSES + [BASE_ADRESSES[0]]
+    job_id = jobs.soumettre_job(iter(adresses), fournisseur="http")
+    assert jobs.etat_job(job_id)["statut"] == jobs.EN_ATTENTE
+    assert jobs.etat_job(job_id)["nb_total"] == len(adresses)
+
+    job = jobs.reserver_job()
+    assert job["id"] == job_id and jobs.reserver_job() is None
+    assert jobs.traiter_job(job, taille_lot=2) == jobs.TERMINE
+
+    df = jobs.resultats_job(job_id)
+    assert df["Adresse saisie"].tolist() == adresses
+    assert df["Statut éligibilité"].str.contains("Éligible").sum() == 4
+    assert df["Statut éligibilité"].str.contains("Non éligible").sum() == 2
+    assert jobs.etat_job(job_id)["nb_traites"] == len(adresses)
+    assert _compter_historique() == len(adresses)
+
+
+def test_job_annule_puis_repris_ne_reverifie_rien(bases, encodeur_factice, stub_orange, monkeypatch):
+    job_id = jobs.soumettre_job(BASE_ADRESSES, fournisseur="http")
+    job = jobs.reserver_job()
+
+    # Annulation demandée pendant le premier lot : le worker s'arrête à la fin de ce lot
+    enregistrer_lot = jobs._enregistrer_lot
+    def enregistrer_puis_annuler(*args):
+        enregistrer_lot(*args)
+        jobs.annuler_job(job_id)
+    monkeypatch.setattr(jobs, "_enregistrer_lot", enregistrer_puis_annuler)
+    assert jobs.traiter_job(job, taille_lot=2) == jobs.ANNULE
+    assert len(jobs.resultats_job(job_id)) == 2
+    monkeypatch.setattr(jobs, "_enregistrer_lot", enregistrer_lot)
+
+    assert jobs.reprendre_job(job_id)
+    assert jobs.traiter_job(jobs.reserver_job(), taille_lot=2) == jobs.TERMINE
+    assert len(jobs.resultats_job(job_id)) == len(BASE_ADRESSES)
+    assert _compter_historique() == len(BASE_ADRESSES)
+
+
+def test_job_orphelin_remis_en_attente(bases):
+    job_id = jobs.soumettre_job(["1 Rue A, Paris"])
+    jobs.reserver_job()
+    with db._verrou_db, db.connexion() as conn:
+        conn.execute("UPDATE jobs SET worker_pid = ? WHERE id = ?", (_pid_termine(), job_id))
+    assert jobs.liberer_jobs_orphelins() == [job_id]
+    assert jobs.etat_job(job_id)["statut"] == jobs.EN_ATTENTE
+
+
+def test_soumission_abandonnee_supprimee_apres_delai(bases):
+    ancien = (datetime.now() - timedelta(hours=2)).isoformat()
+    with db._verrou_db, db.connexion() as conn:
+        abandonne = conn.execute("""
+            INSERT INTO jobs (statut, nb_total, date_creation, date_maj) VALUES (?, 0, ?, ?)
+        """, (jobs.CREATION, ancien, ancien)).lastrowid
+        conn.execute("INSERT INTO job_adresses (job_id, position, adresse_saisie) VALUES (?, 0, 'x')", (abandonne,))
+        recent = conn.execute("""
+            INSERT INTO jobs (statut, nb_total, date_creation, date_maj) VALUES (?, 0, ?, ?)
+        """, (jobs.CREATION, ancien, datetime.now().isoformat())).lastrowid
+
+    assert jobs.supprimer_soumissions_abandonnees(delai_s=3600) == [abandonne]
+    assert jobs.etat_job(abandonne) is None and jobs.etat_job(recent) is not None
+    with db._verrou_db:
+        assert db.connexion().execute("SELECT COUNT(*) FROM job_adresses").fetchone()[0] == 0
+
+
+def test_soumission_supprimee_en_cours_interrompt_la_lecture(bases, monkeypatch):
+    monkeypatch.setattr(config, "TAILLE_BLOC_IMPORT", 2)
+
+    def adresses():
+        yield from ["a", "b"]
+        # Un worker juge la soumission abandonnée entre deux blocs
+        jobs.supprimer_soumissions_abandonnees(delai_s=-60)
+        yield from ["c", "d"]
+
+    with pytest.raises(RuntimeError):
+        jobs.soumettre_job(adresses())
+    assert jobs.lister_jobs().empty
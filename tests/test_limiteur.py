@@ -0,0 +1,38 @@
+"""Limiteur de débit adaptatif : rafale, attente, hausse additive et baisses."""
+import time
+
+import pytest
+
+import config
+from limiteur import LimiteurAdaptatif
+
+
+def test_rafale_puis_attente_au_debit_courant():
+    limiteur = LimiteurAdaptatif(debit_initial=20, debit_max=20, capacite=2)
+    debut = time.monotonic()
+    limiteur.acquerir()
+    limiteur.acquerir()
+    assert time.monotonic() - debut < 0.04
+    limiteur.acquerir()
+    assert time.monotonic() - debut >= 0.04
+
+
+def test_hausse_additive_bornee(monkeypatch):
+    monkeypatch.setattr(config, "PAS_DEBIT", 0.5)
+    limiteur = LimiteurAdaptatif(debit_initial=1.0, debit_max=2.0, latence_cible=1.0)
+    for _ in range(5):
+        limiteur.signaler(0.1)
+    assert limiteur.debit == 2.0
+    assert limiteur.etat()["succes"] == 5
+
+
+def test_baisse_si_lent_et_division_si_erreur():
+    limiteur = LimiteurAdaptatif(debit_initial=4.0, debit_min=0.5, latence_cible=1.0)
+    limiteur.signaler(5.0)
+    assert limiteur.debit == pytest.approx(3.2)
+    limiteur.signaler(0.1, succes=False)
+    assert limiteur.debit == pytest.approx(1.6)
+    for _ in range(5):
+        limiteur.signaler(0.1, succes=False)
+    assert limiteur.debit == 0.5
+    assert limiteur.etat()["erreurs"] == 6
@@ -0,0 +1,40 @@
+"""Magasin d'embeddings : calculés une fois, relus ensuite, recalculés si le modèle ou la base change."""
+import numpy as np
+
+from magasin_embeddings import embeddings_references
+
+
+class EncodeurCompte:
+    def __init__(self):
+        self.appels = 0
+
+    def __call__(self, adresses):
+        self.appels += 1
+        return np.eye(len(adresses), 4, dtype=np.float32)
+
+
+def test_relu_depuis_le_disque(tmp_path):
+    encoder = EncodeurCompte()
+    adresses = ["1 Rue A", "2 Rue B"]
+    premiers, depuis_disque = embeddings_references(adresses, encoder, "modele", str(tmp_path))
+    assert not depuis_disque
+    relus, depuis_disque = embeddings_references(adresses, encoder, "modele", str(tmp_path))
+    assert depuis_disque and encoder.appels == 1
+    assert isinstance(relus, np.memmap) and np.array_equal(relus, premiers)
+
+
+def test_recalcul_si_modele_ou_base_change(tmp_path):
+    encoder = EncodeurCompte()
+    embeddings_references(["1 Rue A"], encoder, "modele", str(tmp_path))
+    embeddings_references(["1 Rue A"], encoder, "modele@onnx:64", str(tmp_path))
+    embeddings_references(["1 Rue A", "2 Rue B"], encoder, "modele", str(tmp_path))
+    assert encoder.appels == 3
+
+
+def test_meta_invalide_recalcule(tmp_path):
+    encoder = EncodeurCompte()
+    embeddings_references(["1 Rue A"], encoder, "modele", str(tmp_path))
+    for meta in tmp_path.glob("*.json"):
+        meta.write_text("{", encoding="utf-8")
+    _, depuis_disque = embeddings_references(["1 Rue A"], encoder, "modele", str(tmp_path))
+    assert not depuis_disque and encoder.appels == 2
@@ -0,0 +1,76 @@
+"""Instrumentation : séries en mémoire, vidage en base, lecture agrégée et export Prometheus."""
+import sqlite3
+
+import pytest
+
+import config
+import db
+import mesures
+
+
+@pytest.fixture
+def mesures_actives(bases, monkeypatch):
+    monkeypatch.setattr(config, "MESURES_ACTIVES", True)
+    monkeypatch.setattr(mesures, "_series", {})
+    monkeypatch.setattr(mesures, "_table_prete", False)
+
+
+def test_desactivees_rien_n_est_collecte(bases, monkeypatch):
+    monkeypatch.setattr(mesures, "_series", {})
+    with mesures.chronometre("etape"):
+        mesures.incrementer("compteur")
+    assert mesures.chronometre("etape") is mesures._NEUTRE
+    assert mesures.enregistrer_mesures() == 0
+
+
+def test_chronometre_duree_et_exception(mesures_actives):
+    with mesures.chronometre("etape", source="test"):
+        pass
+    with pytest.raises(KeyError):
+        with mesures.chronometre("etape", source="test"):
+            raise KeyError("x")
+    assert mesures.enregistrer_mesures() == 2
+    df = mesures.charger_mesures()
+    duree = df[df["nom"] == "etape"].iloc[0]
+    assert duree["etiquettes"] == {"source": "test"} and duree["nb"] == 2 and sum(duree["seaux"]) == 2
+    erreurs = df[df["nom"] == "erreurs"].iloc[0]
+    assert erreurs["etiquettes"] == {"etape": "etape", "type": "KeyError"} and erreurs["somme"] == 1
+
+
+def test_vidages_successifs_additionnes(mesures_actives):
+    mesures.incrementer("lignes", 3)
+    mesures.enregistrer_mesures()
+    mesures.incrementer("lignes", 4)
+    mesures.enregistrer_mesures()
+    df = mesures.charger_mesures()
+    assert df.loc[df["nom"] == "lignes", "somme"].tolist() == [7.0]
+    assert mesures.enregistrer_mesures() == 0
+
+
+def test_echec_d_ecriture_compte_sans_affichage(mesures_actives, monkeypatch, capsys):
+    mesures.observer("etape", 0.2)
+
+    def connexion_en_panne(chemin=None):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(db, "connexion", connexion_en_panne)
+    assert mesures.enregistrer_mesures() == 0
+    assert capsys.readouterr().out == ""
+    cle = ("erreurs", (("etape", "mesures.enregistrement"), ("type", "OperationalError")))
+    assert mesures._series[cle]["somme"] == 1
+
+
+def test_quantiles_et_export_prometheus(mesures_actives):
+    for duree in (0.002, 0.003, 0.2, 3.0):
+        mesures.observer("verification.adresse", duree, fournisseur="http")
+    mesures.incrementer("cache.adresses", 5, resultat="present")
+    mesures.enregistrer_mesures()
+    df = mesures.charger_mesures()
+
+    durees = mesures.tableau_durees(df).iloc[0]
+    assert durees["Nombre"] == 4 and durees["Max (s)"] == 3.0
+    assert 0.001 <= durees["p50 (s)"] <= 0.25 and durees["p95 (s)"] <= 3.0
+
+    texte = mesures.texte_prometheus(df)
+    assert "# TYPE elig_verification_adresse_seconds histogram" in texte
+    assert 'elig_verification_adresse_seconds_bucket{fournisseur="http",le="+Inf"} 4' in texte
+    assert 'elig_cache_adresses_total{resultat="present"} 5' in texte
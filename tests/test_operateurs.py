@@ -0,0 +1,112 @@
+"""Vérification multi-opérateurs : appels simultanés, limites par backend, fusion et persistance."""
+import asyncio
+import sqlite3
+import time
+
+import pandas as pd
+import pytest
+
+import config
+import operateurs
+from correctionIA import BASE_ADRESSES
+from operateurs import BackendOperateur, construire_backends, verifier_operateurs
+
+
+class BackendFactice(BackendOperateur):
+    """Répond après `attente_s` ; compte les appels simultanés."""
+
+    def __init__(self, nom, operateur, reponse, attente_s=0.0, concurrence=4, timeout_s=None, echec=False):
+        self.nom, self.operateur, self.reponse = nom, operateur, reponse
+        self.technologies = tuple(reponse) if reponse else ("fibre",)
+        self.attente_s, self.concurrence, self.timeout_s, self.echec = attente_s, concurrence, timeout_s, echec
+        self.en_cours = self.max_en_cours = 0
+
+    async def verifier(self, entree):
+        self.en_cours += 1
+        self.max_en_cours = max(self.max_en_cours, self.en_cours)
+        try:
+            await asyncio.sleep(self.attente_s)
+            if self.echec:
+                raise ConnectionError("source indisponible")
+            return self.reponse
+        finally:
+            self.en_cours -= 1
+
+
+def test_latence_du_backend_le_plus_lent():
+    backends = [BackendFactice("a", "Orange", {"fibre": True}, attente_s=0.2),
+                BackendFactice("b", "Ooredoo", {"g4": True, "g5": False}, attente_s=0.2)]
+    debut = time.perf_counter()
+    df, stats = verifier_operateurs([BASE_ADRESSES[0]], backends)
+    assert time.perf_counter() - debut < 0.35
+    assert sorted(df["operateur"]) == ["Ooredoo", "Orange"]
+    ooredoo = df[df["operateur"] == "Ooredoo"].iloc[0]
+    assert (ooredoo["g4_eligible"], ooredoo["g5_eligible"]) == (1, 0) and pd.isna(ooredoo["fibre_eligible"])
+    assert [s["succes"] for s in stats] == [1, 1]
+
+
+def test_concurrence_limitee_par_backend():
+    lent = BackendFactice("lent", "Orange", {"fibre": True}, attente_s=0.02, concurrence=2)
+    df, _ = verifier_operateurs(BASE_ADRESSES, [lent])
+    assert lent.max_en_cours == 2 and len(df) == len(BASE_ADRESSES)
+
+
+def test_timeout_et_echec_n_bloquent_pas_les_autres():
+    backends = [BackendFactice("rapide", "Orange", {"fibre": False}),
+                BackendFactice("hors_delai", "Ooredoo", {"g4": True}, attente_s=1.0, timeout_s=0.05),
+                BackendFactice("en_panne", "Tunisie Telecom", {"g4": True}, echec=True)]
+    df, stats = verifier_operateurs([BASE_ADRESSES[0]], backends)
+    # Un opérateur sans aucune réponse n'est pas historisé
+    assert df["operateur"].tolist() == ["Orange"] and df["fibre_eligible"].tolist() == [0]
+    stats = {s["backend"]: s for s in stats}
+    assert stats["hors_delai"]["timeout"] == 1 and stats["en_panne"]["echec"] == 1
+
+
+def test_sources_d_un_meme_operateur_fusionnees():
+    backends = [BackendFactice("site", "Orange", {"fibre": False}),
+                BackendFactice("api", "Orange", {"fibre": True}),
+                BackendFactice("inconnue", "Orange", None)]
+    df, _ = verifier_operateurs([BASE_ADRESSES[0]], backends)
+    assert len(df) == 1 and df["fibre_eligible"].tolist() == [1]
+
+
+def test_registre():
+    assert {"orange_http", "orange_selenium", "zones_couverture"} <= set(operateurs.backends_disponibles())
+    assert [b.nom for b in construire_backends(" orange_http, ")] == ["orange_http"]
+    with pytest.raises(ValueError, match="inconnu"):
+        construire_backends(["orange_http", "pigeon_voyageur"])
+
+
+def test_orange_http_contre_le_stub(stub_orange):
+    df, stats = verifier_operateurs(BASE_ADRESSES, construire_backends("orange_http"))
+    # ADR1, 2 et 4 éligibles FTTH dans les enregistrements du stub, ADR3 et 5 non
+    assert dict(zip(df["adresse"], df["fibre_eligible"])) == dict(zip(BASE_ADRESSES, [1, 1, 0, 1, 0]))
+    assert stats[0]["succes"] == len(BASE_ADRESSES)
+
+
+def test_resultats_orange_sans_requete():
+    df_resultats = pd.DataFrame({
+        "Adresse corrigée": ["A", "A", "B", "C"],
+        "Statut éligibilité": ["Éligible à la fibre (FTTH)", "Éligible à la fibre (FTTH)",
+                               "Non éligible à la fibre", "Erreur : délai dépassé"],
+    })
+    df = operateurs.resultats_orange(df_resultats)
+    assert dict(zip(df["adresse"], df["fibre_eligible"])) == {"A": 1, "B": 0}
+
+
+def test_sauvegarde_en_une_transaction_et_agregats(bases):
+    assert not operateurs.agregats_presents()
+    operateurs.init_operateurs()
+    df, _ = verifier_operateurs([{"adresse": a, "gouvernorat": "Tunis"} for a in BASE_ADRESSES[:3]],
+                                [BackendFactice("a", "Orange", {"fibre": True}),
+                                 BackendFactice("b", "Ooredoo", {"g4": True, "g5": False})])
+    operateurs.sauvegarder_resultats_operateurs(df)
+    with sqlite3.connect(config.CHEMIN_DB_TUNISIE) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM historique_eligibilite").fetchone()[0] == 6
+    conn.close()
+    agregats = operateurs.couverture_agregee(par=("operateur", "technologie"))
+    assert agregats.to_dict("records") == [
+        {"operateur": "Ooredoo", "technologie": "g4", "eligibles": 3, "non_eligibles": 0, "taux_eligibilite": 1.0},
+        {"operateur": "Ooredoo", "technologie": "g5", "eligibles": 0, "non_eligibles": 3, "taux_eligibilite": 0.0},
+        {"operateur": "Orange", "technologie": "fibre", "eligibles": 3, "non_eligibles": 0, "taux_eligibilite": 1.0},
+    ]
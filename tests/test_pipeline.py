@@ -0,0 +1,41 @@
+"""Dédoublonnage d'un lot : chaque adresse distincte n'est corrigée et vérifiée qu'une fois."""
+import pytest
+
+from correctionIA import BASE_ADRESSES
+from pipeline import taux_dedoublonnage, verifier_adresses
+
+
+class VerificateurCompte:
+    nom = "factice"
+
+    def __init__(self):
+        self.appels = []
+
+    def verifier(self, liste_adresses, sur_resultat=None):
+        self.appels.append(list(liste_adresses))
+        return [(adresse, f"Statut de {adresse}") for adresse in liste_adresses], []
+
+
+def test_doublons_verifies_une_fois_et_redistribues(encodeur_factice):
+    saisies = ["8 Rue Victor Hugo, Lyon", "8 rue victor hugo lyon", "Tour Eiffel", "8 Rue Victor Hgo, Lyon",
+               "Tour Eiffel"]
+    verificateur = VerificateurCompte()
+    df, detail, stats = verifier_adresses(saisies, verificateur)
+
+    # 3 formes normalisées corrigées, 2 adresses corrigées distinctes vérifiées
+    assert verificateur.appels == [[BASE_ADRESSES[2], "Tour Eiffel"]]
+    assert len(detail["corrigees"]) == 3
+    assert df["Adresse saisie"].tolist() == saisies
+    assert df["Adresse corrigée"].tolist() == [BASE_ADRESSES[2]] * 2 + ["Tour Eiffel", BASE_ADRESSES[2], "Tour Eiffel"]
+    assert df["Statut éligibilité"].tolist() == [f"Statut de {a}" for a in df["Adresse corrigée"]]
+    assert taux_dedoublonnage(stats) == (5, 2, pytest.approx(0.6))
+
+
+def test_connues_partage_entre_appels(encodeur_factice):
+    verificateur = VerificateurCompte()
+    connues = {}
+    verifier_adresses(["1 Rue A", "2 Rue B"], verificateur, connues=connues)
+    df, _, stats = verifier_adresses(["2 rue b", "3 Rue C"], verificateur, connues=connues)
+    assert verificateur.appels == [["1 Rue A", "2 Rue B"], ["3 Rue C"]]
+    assert df["Statut éligibilité"].tolist() == ["Statut de 2 Rue B", "Statut de 3 Rue C"]
+    assert taux_dedoublonnage(stats)[1] == 1
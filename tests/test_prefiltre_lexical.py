@@ -0,0 +1,38 @@
+"""Pré-filtre lexical : cas sûrs réglés sans BERT, cas ambigus transmis."""
+from correctionIA import BASE_ADRESSES, corriger_adresses_detail
+from prefiltre_lexical import IndexLexical, distance_edition
+
+INDEX = IndexLexical(BASE_ADRESSES)
+
+
+def test_distance_edition():
+    assert distance_edition("rue", "rue") == 0
+    assert distance_edition("victor", "vicotr") == 2
+    assert distance_edition("", "abc") == 3
+
+
+def test_forme_normalisee_exacte():
+    assert INDEX.rechercher("12 RUE DE LA REPUBLIQUE PARIS") == (0, 1.0, True)
+
+
+def test_faute_de_frappe_corrigee():
+    indice, score, confiant = INDEX.rechercher("8 Rue Victor Hgo, Lyon")
+    assert (indice, confiant) == (2, True) and score < 1.0
+
+
+def test_numero_different_jamais_corrige():
+    indice, _, confiant = INDEX.rechercher("13 Rue de la République, Paris")
+    assert indice == 0 and not confiant
+
+
+def test_sans_trigrammes_exact_seulement():
+    index = IndexLexical(BASE_ADRESSES, avec_trigrammes=False)
+    assert index.rechercher("8 Rue Victor Hugo, Lyon")[2]
+    assert index.rechercher("8 Rue Victor Hgo, Lyon") == (None, 0.0, False)
+
+
+def test_seuls_les_cas_ambigus_vont_a_bert(encodeur_factice):
+    detail = corriger_adresses_detail(["8 Rue Victor Hugo, Lyon", "8 Rue Victor Hgo, Lyon", "Tour Eiffel"])
+    assert detail["etapes"].tolist() == ["exact", "lexical", "bert"]
+    assert detail["corrigees"].tolist()[:2] == [BASE_ADRESSES[2], BASE_ADRESSES[2]]
+    assert detail["nb_par_etape"] == {"bert": 1, "exact": 1, "lexical": 1}
@@ -0,0 +1,82 @@
+"""Rapport PDF : graphique rendu une fois par contenu, pages de détail, génération en arrière-plan."""
+import re
+
+import pandas as pd
+import pytest
+from PIL import Image
+
+import config
+import rapport_pdf
+from classification import classifier_statuts
+from rapport_pdf import exporter_pdf, image_graphique, soumettre_rapport
+
+
+class GraphiqueFactice:
+    """Remplace une figure plotly : rendu PNG sans kaleido, nombre de rendus compté."""
+
+    def __init__(self, contenu="camembert", en_erreur=False):
+        self.contenu = contenu
+        self.en_erreur = en_erreur
+        self.rendus = 0
+
+    def to_json(self):
+        return self.contenu
+
+    def write_image(self, chemin, format="png"):
+        self.rendus += 1
+        if self.en_erreur:
+            raise RuntimeError("kaleido indisponible")
+        Image.new("RGB", (40, 30), "orange").save(chemin, format="PNG")
+
+
+@pytest.fixture(autouse=True)
+def cache_rapports(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DOSSIER_CACHE_RAPPORTS", str(tmp_path / "cache_rapports"))
+
+
+def _resultats(nb):
+    statuts = pd.Series(["Éligible à la fibre (FTTH)", "Non éligible", "❌ Impossible de vérifier"] * nb)[:nb]
+    df = pd.DataFrame({"Adresse saisie": [f"{i} Rue A" for i in range(nb)],
+                       "Adresse corrigée": [f"{i} Rue A, Paris" for i in range(nb)],
+                       "Statut éligibilité": statuts})
+    return pd.concat([df, classifier_statuts(df["Statut éligibilité"])], axis=1)
+
+
+def _nb_pages(octets):
+    assert octets.startswith(b"%PDF")
+    return len(re.findall(rb"/Type /Page\b(?!s)", octets))
+
+
+def test_graphique_rendu_une_fois_par_contenu():
+    graphique = GraphiqueFactice()
+    chemin = image_graphique(graphique)
+    assert image_graphique(GraphiqueFactice()) == chemin and image_graphique(graphique) == chemin
+    assert graphique.rendus == 1
+    assert image_graphique(GraphiqueFactice("barres")) != chemin
+
+
+def test_graphique_en_erreur_sans_image_en_cache():
+    assert image_graphique(GraphiqueFactice(en_erreur=True)) is None
+    graphique = GraphiqueFactice()
+    assert image_graphique(graphique) is not None and graphique.rendus == 1
+
+
+def test_resume_seul_une_page():
+    assert _nb_pages(exporter_pdf(_resultats(500), GraphiqueFactice(), resume_seul=True)) == 1
+
+
+def test_detail_par_sections():
+    df = _resultats(70)
+    pdf = rapport_pdf.FPDF()
+    lignes_par_page = int((pdf.h - pdf.t_margin - pdf.b_margin - 15 - rapport_pdf.HAUTEUR_LIGNE)
+                          // rapport_pdf.HAUTEUR_LIGNE)
+    # Sections de 30 lignes : chacune commence sur une nouvelle page
+    attendu = 1 + sum(-(-min(30, 70 - debut) // lignes_par_page) for debut in range(0, 70, 30))
+    assert _nb_pages(exporter_pdf(df, GraphiqueFactice(), lignes_par_section=30)) == attendu
+
+
+def test_generation_en_arriere_plan(tmp_path):
+    chemin = str(tmp_path / "rapport.pdf")
+    assert soumettre_rapport(_resultats(5), GraphiqueFactice(), chemin).result(timeout=30) == chemin
+    with open(chemin, "rb") as f:
+        assert _nb_pages(f.read()) == 2
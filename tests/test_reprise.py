@@ -0,0 +1,99 @@
+"""Points de reprise : une liste ou un fichier interrompu n'est ni revérifié ni réenregistré."""
+import pandas as pd
+import pytest
+
+import db
+from pipeline import traiter_fichier, verifier_adresses
+from reprise import cloturer_lot, enregistrer_resultat, identifiant_lot, ouvrir_lot, sauvegarder_lot
+from scraping import MESSAGE_ECHEC
+
+ELIGIBLE_FTTH = "Éligible à la fibre (FTTH)"
+
+
+class VerificateurFactice:
+    """Vérificateur sans réseau ; `crash_a_l_appel` simule un arrêt au milieu de cet appel."""
+
+    nom = "factice"
+
+    def __init__(self, crash_a_l_appel=None, statut=ELIGIBLE_FTTH):
+        self.crash_a_l_appel = crash_a_l_appel
+        self.statut = statut
+        self.nb_appels = 0
+        self.adresses = []
+
+    def verifier(self, liste_adresses, sur_resultat=None):
+        self.nb_appels += 1
+        resultats = [(adresse, self.statut) for adresse in liste_adresses]
+        for i, (adresse, statut) in enumerate(resultats):
+            if self.nb_appels == self.crash_a_l_appel and i == len(resultats) // 2:
+                raise RuntimeError("arrêt simulé")
+            self.adresses.append(adresse)
+            if sur_resultat is not None:
+                sur_resultat(i, adresse, statut)
+        return resultats, []
+
+
+def _adresses(nb):
+    return [f"{i} Rue de la Paix, Ville{i}" for i in range(1, nb + 1)]
+
+
+def _compter(table):
+    with db._verrou_db:
+        return db.connexion().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_ouvrir_lot_ne_rend_que_les_succes(bases):
+    lot_id = identifiant_lot(["a", "b"])
+    assert ouvrir_lot(lot_id, 2) == {}
+    enregistrer_resultat(lot_id, [0], "A", ELIGIBLE_FTTH)
+    enregistrer_resultat(lot_id, [1], "B", MESSAGE_ECHEC)
+    assert ouvrir_lot(lot_id, 2) == {0: ("A", ELIGIBLE_FTTH)}
+
+
+def test_lot_sauvegarde_rejoue_aussi_les_echecs(bases):
+    lot_id = identifiant_lot(["a", "b"])
+    ouvrir_lot(lot_id, 2)
+    enregistrer_resultat(lot_id, [0], "A", ELIGIBLE_FTTH)
+    enregistrer_resultat(lot_id, [1], "B", MESSAGE_ECHEC)
+    df = pd.DataFrame({"Adresse saisie": ["a", "b"], "Adresse corrigée": ["A", "B"],
+                       "Statut éligibilité": [ELIGIBLE_FTTH, MESSAGE_ECHEC]})
+    sauvegarder_lot(lot_id, df)
+    assert ouvrir_lot(lot_id, 2) == {0: ("A", ELIGIBLE_FTTH), 1: ("B", MESSAGE_ECHEC)}
+    cloturer_lot(lot_id)
+    assert _compter("lots") == 0 and _compter("lot_resultats") == 0
+
+
+def test_liste_interrompue_ne_reverifie_que_le_reste(bases, encodeur_factice):
+    adresses = _adresses(10)
+    with pytest.raises(RuntimeError):
+        verifier_adresses(adresses, VerificateurFactice(crash_a_l_appel=1), reprise=True)
+    deja_verifiees = _compter("lot_resultats")
+    assert 0 < deja_verifiees < len(adresses)
+
+    verificateur = VerificateurFactice()
+    df, _, stats = verifier_adresses(adresses, verificateur, reprise=True)
+    assert len(verificateur.adresses) == len(adresses) - deja_verifiees
+    assert (df["Statut éligibilité"] == ELIGIBLE_FTTH).all()
+    assert _compter("lots") == 0
+
+
+def test_fichier_interrompu_enregistre_chaque_ligne_une_fois(bases, encodeur_factice, tmp_path):
+    taille_bloc = 20
+    adresses = _adresses(3 * taille_bloc + 5)
+    entree = tmp_path / "adresses.csv"
+    sortie = tmp_path / "resultats.csv"
+    pd.DataFrame({"adresse": adresses}).to_csv(entree, index=False)
+
+    with pytest.raises(RuntimeError):
+        traiter_fichier(str(entree), VerificateurFactice(crash_a_l_appel=2), sortie=str(sortie), taille_bloc=taille_bloc)
+    assert _compter("historique") == taille_bloc
+
+    verificateur = VerificateurFactice()
+    bilan = traiter_fichier(str(entree), verificateur, sortie=str(sortie), taille_bloc=taille_bloc)
+    assert bilan["blocs_repris"] == 1
+    assert bilan["lignes"] == len(adresses)
+    assert _compter("historique") == len(adresses)
+    assert len(pd.read_csv(sortie)) == len(adresses)
+    assert _compter("lots") == 0
+    # Le bloc enregistré n'est pas revérifié, ni les adresses déjà obtenues du bloc interrompu
+    assert len(verificateur.adresses) < len(adresses) - taille_bloc
@@ -0,0 +1,99 @@
+"""Pool de sessions Selenium, avec un navigateur factice : ordre, réutilisation, redémarrage."""
+import threading
+
+import pytest
+
+import scraping
+from limiteur import LimiteurAdaptatif
+from scraping import MESSAGE_ECHEC
+
+
+class NavigateurFactice:
+    def __init__(self):
+        self.vivant = True
+        self.fermes = 0
+
+    @property
+    def current_url(self):
+        if not self.vivant:
+            raise RuntimeError("session morte")
+        return "about:blank"
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        self.fermes += 1
+
+
+class ChromeFactice:
+    """Sessions ouvertes, et pannes à provoquer : adresse -> "crash" (session morte) ou "page"."""
+
+    def __init__(self):
+        self.sessions = []
+        self.pannes = {}
+        self._verrou = threading.Lock()
+
+    def ouvrir_session(self):
+        with self._verrou:
+            self.sessions.append(NavigateurFactice())
+            return self.sessions[-1], None
+
+    def verifier_adresse(self, driver, wait, adresse):
+        panne = self.pannes.pop(adresse, None)
+        if panne == "crash":
+            driver.vivant = False
+            raise RuntimeError("chrome a planté")
+        if panne == "page":
+            raise TimeoutError("résultat absent")
+        return f"Éligible : {adresse}"
+
+
+@pytest.fixture
+def chrome(monkeypatch):
+    chrome = ChromeFactice()
+    monkeypatch.setattr(scraping, "_ouvrir_session", chrome.ouvrir_session)
+    monkeypatch.setattr(scraping, "_verifier_adresse", chrome.verifier_adresse)
+    return chrome
+
+
+def _limiteur():
+    return LimiteurAdaptatif(debit_initial=1000, debit_max=1000, capacite=1000)
+
+
+def test_resultats_dans_l_ordre_et_sessions_reutilisees(chrome):
+    adresses = [f"{i} Rue A" for i in range(20)]
+    rappels = []
+    resultats, stats = scraping.verifier_avec_pool(adresses, nb_workers=3, limiteur=_limiteur(),
+                                                   sur_resultat=lambda i, a, s: rappels.append(i))
+    assert resultats == [(a, f"Éligible : {a}") for a in adresses]
+    assert sorted(rappels) == list(range(20))
+    # Au plus une session par worker (réutilisée d'une adresse à l'autre), fermée à la fin
+    assert len(stats) == 3 and sum(s["adresses"] for s in stats) == 20
+    assert len(chrome.sessions) == sum(1 for s in stats if s["adresses"])
+    assert all(n.fermes == 1 for n in chrome.sessions)
+
+
+def test_workers_bornes_au_nombre_d_adresses(chrome):
+    resultats, stats = scraping.verifier_avec_pool(["1 Rue A", "2 Rue B"], nb_workers=8, limiteur=_limiteur())
+    assert len(stats) == 2 and len(chrome.sessions) <= 2
+    assert scraping.verifier_avec_pool([], nb_workers=8) == ([], [])
+
+
+def test_session_plantee_relancee_et_adresse_retentee(chrome):
+    chrome.pannes["2 Rue B"] = "crash"
+    resultats, stats = scraping.verifier_avec_pool(["1 Rue A", "2 Rue B", "3 Rue C"], nb_workers=1,
+                                                   limiteur=_limiteur())
+    assert resultats[1] == ("2 Rue B", "Éligible : 2 Rue B")
+    assert stats[0]["redemarrages"] == 1 and stats[0]["erreurs"] == 0
+    assert len(chrome.sessions) == 2
+
+
+def test_erreur_de_page_sans_relance(chrome):
+    chrome.pannes["2 Rue B"] = "page"
+    resultats, stats = scraping.verifier_avec_pool(["1 Rue A", "2 Rue B", "3 Rue C"], nb_workers=1,
+                                                   limiteur=_limiteur())
+    assert resultats[1] == ("2 Rue B", MESSAGE_ECHEC)
+    assert resultats[2] == ("3 Rue C", "Éligible : 3 Rue C")
+    assert stats[0]["redemarrages"] == 0 and stats[0]["erreurs"] == 1
+    assert len(chrome.sessions) == 1
@@ -0,0 +1,63 @@
+"""
+Worker de la file de jobs de vérification, à lancer à côté de l'application :
+
+    python worker.py            # boucle infinie
+    python worker.py --une-fois # traite les jobs en attente puis s'arrête
+
+Plusieurs workers peuvent tourner en parallèle : chaque job n'est réservé que par un seul.
+"""
+import argparse
+import time
+import traceback
+
+import config
+from db import init_db
+from jobs import (init_jobs, liberer_jobs_orphelins, marquer_erreur, reserver_job, supprimer_soumissions_abandonnees,
+                  traiter_job)
+from mesures import erreur, init_mesures
+
+
+def recuperer_jobs():
+    """Remet en file les jobs d'un worker disparu et supprime les soumissions abandonnées."""
+    orphelins = liberer_jobs_orphelins()
+    if orphelins:
+        print(f"Jobs repris après arrêt d'un worker : {orphelins}")
+    abandonnes = supprimer_soumissions_abandonnees()
+    if abandonnes:
+        print(f"Soumissions interrompues supprimées : {abandonnes}")
+
+
+def boucle(une_fois=False):
+    init_db()
+    init_jobs()
+    init_mesures()
+
+    # Vérifié au démarrage puis périodiquement, entre deux jobs : un worker
+    # qui tombe pendant que les autres tournent ne bloque pas son job
+    prochaine_recuperation = 0.0
+    while True:
+        if time.monotonic() >= prochaine_recuperation:
+            recuperer_jobs()
+            prochaine_recuperation = time.monotonic() + config.INTERVALLE_ORPHELINS_S
+        job = reserver_job()
+        if job is None:
+            if une_fois:
+                return
+            time.sleep(config.INTERVALLE_SONDAGE_JOBS_S)
+            continue
+
+        print(f"[job {job['id']}] démarrage ({job['nb_traites']}/{job['nb_total']} déjà traitées)")
+        try:
+            statut = traiter_job(job)
+            print(f"[job {job['id']}] {statut}")
+        except Exception as e:
+            traceback.print_exc()
+            erreur("job", e)
+            marquer_erreur(job["id"], f"{type(e).__name__}: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker de la file de jobs de vérification")
+    parser.add_argument("--une-fois", action="store_true", help="S'arrêter quand la file est vide")
+    args = parser.parse_args()
+    boucle(une_fois=args.une_fois)